@@ -0,0 +1,120 @@
+"""Synthetic question banks and attempt histories for benchmarks"""
+import random
+from datetime import datetime, timedelta
+from database.connection import db
+
+CATEGORIES = ['Python Cơ bản', 'Cấu trúc điều khiển', 'Functions', 'OOP', 'String',
+              'List', 'Dictionary', 'Advanced', 'Modules', 'File Handling']
+WORDS = ['biến', 'hàm', 'vòng lặp', 'danh sách', 'từ điển', 'chuỗi', 'lớp', 'đối tượng',
+         'kế thừa', 'ngoại lệ', 'module', 'tham số', 'giá trị', 'kiểu dữ liệu', 'toán tử',
+         'điều kiện', 'tập hợp', 'bộ', 'generator', 'decorator', 'lambda', 'iterator']
+
+QUESTIONS_PER_ATTEMPT = 30
+OPTIONS_PER_QUESTION = 4
+BATCH_SIZE = 10000
+
+
+def attempts_for_bank(question_count):
+    """Number of synthetic attempts generated for a bank size"""
+    return max(100, question_count // 50)
+
+
+def generate_bank(question_count, seed=0, attempt_count=None):
+    """Fill the current database with questions, options, one quiz and completed attempts
+
+    Rows are inserted with explicit ids in large executemany batches; the
+    triggers (search index, statistics) still run as they would in production.
+    """
+    rng = random.Random(seed)
+    attempt_count = attempts_for_bank(question_count) if attempt_count is None else attempt_count
+
+    db.reset_database()
+    conn = db.get_connection()
+    cursor = conn.cursor()
+
+    # Questions and options
+    questions = []
+    options = []
+    correct_option = {}
+    difficulty_of = {}
+    for question_id in range(1, question_count + 1):
+        difficulty = rng.choice((1, 2, 3))
+        text = f"Câu {question_id}: {' '.join(rng.sample(WORDS, 6))} là gì?"
+        questions.append((question_id, text, difficulty, rng.choice(CATEGORIES)))
+        difficulty_of[question_id] = difficulty
+
+        correct_index = rng.randrange(OPTIONS_PER_QUESTION)
+        for index in range(OPTIONS_PER_QUESTION):
+            option_id = (question_id - 1) * OPTIONS_PER_QUESTION + index + 1
+            options.append((option_id, question_id, ' '.join(rng.sample(WORDS, 3)), index == correct_index))
+            if index == correct_index:
+                correct_option[question_id] = option_id
+
+        if len(questions) >= BATCH_SIZE:
+            _flush_bank(cursor, questions, options)
+    _flush_bank(cursor, questions, options)
+
+    cursor.execute('''
+        INSERT INTO quizzes (id, title, description, time_limit, total_questions)
+        VALUES (1, 'Benchmark Quiz', 'Synthetic benchmark quiz', 2700, ?)
+    ''', (QUESTIONS_PER_ATTEMPT,))
+
+    # Attempts answered with a success rate that depends on difficulty
+    success_rate = {1: 0.8, 2: 0.6, 3: 0.4}
+    attempts = []
+    answers = []
+    answer_id = 0
+    start = datetime(2024, 1, 1)
+    per_attempt = min(QUESTIONS_PER_ATTEMPT, question_count)
+    for attempt_id in range(1, attempt_count + 1):
+        correct_count = 0
+        for question_id in rng.sample(range(1, question_count + 1), per_attempt):
+            is_correct = rng.random() < success_rate[difficulty_of[question_id]]
+            if is_correct:
+                selected = correct_option[question_id]
+            else:
+                wrong = [option_id for option_id in range((question_id - 1) * OPTIONS_PER_QUESTION + 1,
+                                                          question_id * OPTIONS_PER_QUESTION + 1)
+                         if option_id != correct_option[question_id]]
+                selected = rng.choice(wrong)
+            answer_id += 1
+            answers.append((answer_id, attempt_id, question_id, selected, is_correct))
+            correct_count += is_correct
+
+        started = start + timedelta(minutes=attempt_id)
+        attempts.append((attempt_id, f"Student {attempt_id}", correct_count * 10.0 / per_attempt,
+                         per_attempt, correct_count, rng.randint(300, 2700),
+                         started, started + timedelta(minutes=30)))
+
+        if len(answers) >= BATCH_SIZE:
+            _flush_attempts(cursor, attempts, answers)
+    _flush_attempts(cursor, attempts, answers)
+
+    conn.commit()
+    cursor.execute('ANALYZE')
+    return {'questions': question_count, 'attempts': attempt_count, 'answers': answer_id}
+
+
+def _flush_bank(cursor, questions, options):
+    cursor.executemany('''
+        INSERT INTO questions (id, question_text, difficulty, category) VALUES (?, ?, ?, ?)
+    ''', questions)
+    cursor.executemany('''
+        INSERT INTO options (id, question_id, option_text, is_correct) VALUES (?, ?, ?, ?)
+    ''', options)
+    questions.clear()
+    options.clear()
+
+
+def _flush_attempts(cursor, attempts, answers):
+    cursor.executemany('''
+        INSERT INTO attempts (id, quiz_id, student_name, score, total_questions,
+                              correct_answers, time_taken, started_at, completed_at)
+        VALUES (?, 1, ?, ?, ?, ?, ?, ?, ?)
+    ''', attempts)
+    cursor.executemany('''
+        INSERT INTO attempt_answers (id, attempt_id, question_id, selected_option_id, is_correct)
+        VALUES (?, ?, ?, ?, ?)
+    ''', answers)
+    attempts.clear()
+    answers.clear()
@@ -0,0 +1,230 @@
+"""Benchmark suite for model and controller hot paths
+
+Generates synthetic banks (one database file per size, reused between runs)
+and reports p50/p95 latency and SQL statements per call as JSON. Loading the
+whole bank (Question.get_all) also reports the memory held by the result,
+next to the pre-__slots__ mapping (sqlite3.Row + keyword arguments into a
+plain class) for comparison.
+
+Usage:
+    python -m benchmarks.run_benchmarks [--sizes 1k 100k 1m] [--iterations 50]
+                                         [--output results.json] [--regenerate]
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import time
+import tracemalloc
+from datetime import datetime
+from database.connection import db
+from models.question import Question, question_cache
+from models.option import option_cache
+from models.attempt import Attempt
+from controllers.quiz_controller import QuizController
+from controllers.question_bank_controller import QuestionBankController
+from models.exam_generator import difficulty_quotas
+from benchmarks.datagen import generate_bank, attempts_for_bank, WORDS, QUESTIONS_PER_ATTEMPT
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+SIZES = {'1k': 1000, '100k': 100000, '1m': 1000000}
+DIFFICULTY_MATRIX = {'easy': 10, 'medium': 10, 'hard': 10}
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def measure(name, func, iterations, setup=None):
+    """Time `func` over several iterations; returns latency percentiles and queries per call
+
+    Statements are counted by the database instrumentation layer (an
+    executemany batch counts once); the busiest statement shapes are listed.
+    """
+    durations = []
+    recorder = db.recorder
+
+    for _ in range(iterations):
+        args = setup() if setup else ()
+        with recorder.scope(name):
+            started = time.perf_counter()
+            func(*args)
+            elapsed = time.perf_counter() - started
+        durations.append(elapsed * 1000)
+
+    scope = recorder.report()[name]
+    durations.sort()
+    return {
+        'iterations': iterations,
+        'p50_ms': round(percentile(durations, 0.50), 3),
+        'p95_ms': round(percentile(durations, 0.95), 3),
+        'mean_ms': round(sum(durations) / len(durations), 3),
+        'queries_per_call': scope['statements_per_run'],
+        'top_queries': [
+            {'sql': query['sql'], 'per_call': round(query['count'] / iterations, 2),
+             'total_ms': query['total_ms']}
+            for query in scope['queries'][:3]
+        ]
+    }
+
+
+def measure_memory(func):
+    """Memory (KiB) still held by func's result and the peak while building it"""
+    tracemalloc.start()
+    try:
+        result = func()
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {'objects': len(result), 'retained_kib': retained // 1024, 'peak_kib': peak // 1024}
+
+
+class PlainQuestion:
+    """Question as it was built before the slotted records (per-instance __dict__)"""
+
+    def __init__(self, id=None, question_text='', difficulty=1, category='', created_at=None):
+        self.id = id
+        self.question_text = question_text
+        self.difficulty = difficulty
+        self.category = category
+        self.created_at = created_at
+
+
+def plain_get_all():
+    """Question.get_all with the previous row mapping, as a baseline"""
+    cursor = db.get_connection().cursor()
+    cursor.execute('SELECT * FROM questions ORDER BY id ASC')
+    return [PlainQuestion(
+        id=row['id'],
+        question_text=row['question_text'],
+        difficulty=row['difficulty'],
+        category=row['category'],
+        created_at=row['created_at']
+    ) for row in cursor.fetchall()]
+
+
+def prepare_database(label, size, regenerate=False):
+    """Point the app at the benchmark database for a size, generating it if needed"""
+    os.makedirs(DATA_DIR, exist_ok=True)
+    path = os.path.join(DATA_DIR, f'bench_{label}.db')
+    if regenerate and os.path.exists(path):
+        os.remove(path)
+
+    exists = os.path.exists(path)
+    db.set_database_path(path)
+    db.initialize_database()
+    if not exists:
+        print(f"⏳ Generating {label} bank ({size} questions)...")
+        started = time.perf_counter()
+        generate_bank(size)
+        print(f"✅ Generated in {time.perf_counter() - started:.1f}s")
+
+
+def run_size(size, iterations, rng):
+    """Run every benchmark against the current database"""
+    attempt_count = attempts_for_bank(size)
+    quiz_id = 1
+    results = {}
+
+    db.recorder.reset()
+
+    results['get_quiz_with_questions'] = measure(
+        'get_quiz_with_questions',
+        lambda: QuizController.get_quiz_with_questions(quiz_id, DIFFICULTY_MATRIX), iterations)
+
+    results['generate_exam_variants_500'] = measure(
+        'generate_exam_variants_500',
+        lambda: QuizController.generate_exam_variants(quiz_id, difficulty_quotas(DIFFICULTY_MATRIX), 500),
+        max(1, iterations // 10))
+
+    def new_attempt():
+        quiz_data = QuizController.get_quiz_with_questions(quiz_id, DIFFICULTY_MATRIX)
+        attempt_id = QuizController.start_attempt(quiz_id, 'Benchmark')
+        answers = {item['question'].id: rng.choice(item['options']).id
+                   for item in quiz_data['questions']}
+        return attempt_id, answers
+
+    def submit_one_by_one(attempt_id, answers):
+        for question_id, option_id in answers.items():
+            QuizController.submit_answer(attempt_id, question_id, option_id)
+        QuizController.complete_attempt(attempt_id, 600)
+
+    results['submit_answer_and_complete_attempt'] = measure(
+        'submit_answer_and_complete_attempt', submit_one_by_one, iterations, setup=new_attempt)
+    results['submit_answers_bulk'] = measure(
+        'submit_answers_bulk',
+        lambda attempt_id, answers: QuizController.submit_answers_bulk(attempt_id, answers, 600),
+        iterations, setup=new_attempt)
+
+    results['get_attempt_review'] = measure(
+        'get_attempt_review', QuizController.get_attempt_review, iterations,
+        setup=lambda: (rng.randint(1, attempt_count),))
+
+    results['search_questions'] = measure(
+        'search_questions', QuestionBankController.search_questions, iterations,
+        setup=lambda: (rng.choice(WORDS),))
+
+    results['question_analyze_difficulty'] = measure(
+        'question_analyze_difficulty', Question.analyze_difficulty, max(1, iterations // 10))
+    results['analyze_items'] = measure(
+        'analyze_items', QuizController.analyze_items, max(1, iterations // 10))
+
+    results['attempt_get_statistics'] = measure(
+        'attempt_get_statistics', Attempt.get_statistics, iterations, setup=lambda: (quiz_id,))
+
+    load_iterations = max(1, iterations // 10)
+    for name, func in (('question_get_all', Question.get_all), ('question_get_all_plain', plain_get_all)):
+        results[name] = measure(name, func, load_iterations)
+        results[name]['memory'] = measure_memory(func)
+
+    # Counters are cumulative over the sizes run in this process
+    results['record_caches'] = {'questions': question_cache.stats(), 'options': option_cache.stats()}
+    return results
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description='Quiz app hot path benchmarks')
+    parser.add_argument('--sizes', nargs='+', default=['1k'], choices=sorted(SIZES))
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write JSON results to this file instead of stdout')
+    parser.add_argument('--regenerate', action='store_true', help='rebuild the synthetic databases')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    report = {
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'questions_per_attempt': QUESTIONS_PER_ATTEMPT,
+        'sizes': {}
+    }
+
+    original_path = db.database_path
+    db.enable_instrumentation()
+    try:
+        for label in args.sizes:
+            prepare_database(label, SIZES[label], args.regenerate)
+            report['sizes'][label] = run_size(SIZES[label], args.iterations, rng)
+    finally:
+        db.disable_instrumentation()
+        db.set_database_path(original_path)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+        print(f"📄 Results written to {args.output}")
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -5,6 +5,20 @@ import os
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATABASE_PATH = os.path.join(BASE_DIR, 'quiz_app.db')
 
+# SQLite tuning (applied to every connection)
+DB_JOURNAL_MODE = 'WAL'          # WAL lets readers run while a writer commits
+DB_SYNCHRONOUS = 'NORMAL'        # NORMAL is safe with WAL and avoids an fsync per commit
+DB_CACHE_SIZE = -64000           # negative value = size in KiB (64 MB page cache)
+DB_MMAP_SIZE = 256 * 1024 * 1024  # bytes of the database file to memory-map
+DB_TEMP_STORE = 'MEMORY'         # keep temp tables and sort buffers in memory
+DB_BUSY_TIMEOUT = 5.0            # seconds to wait for a lock held by another connection
+DB_FETCH_BATCH_SIZE = 1000       # rows per fetchmany() when model iterators stream a table
+DB_STATEMENT_CACHE_SIZE = 256    # prepared statements kept per connection (the code has ~130 execute() call sites)
+
+# SQL instrumentation (statement counts/timings per operation, printed on exit)
+DB_INSTRUMENTATION = os.environ.get('QUIZ_APP_SQL_PROFILE') == '1'
+DB_INSTRUMENTATION_REPORT = os.path.join(BASE_DIR, 'sql_profile.json')
+
 # Quiz settings
 DEFAULT_QUIZ_TIME = 600  # 10 minutes in seconds
 MIN_QUESTIONS_PER_QUIZ = 5
@@ -17,12 +31,46 @@ DIFFICULTY_LEVELS = {
     'hard': 3
 }
 
+# Bulk question import (python -m utils.import_questions)
+QUESTION_IMPORT_CHUNK_SIZE = 5000  # questions per transaction
+
+# Result exports (python -m utils.export_results)
+EXPORT_BATCH_SIZE = 5000            # rows fetched from SQLite per fetchmany()
+EXPORT_ROW_GROUP_SIZE = 65536       # rows buffered per row group in columnar files
+
+# Item analysis (statistics screen, utils/item_analysis.py)
+ANALYSIS_BATCH_SIZE = 50000         # answer rows converted to arrays per fetchmany()
+DISTRACTOR_MIN_RATE = 0.05          # a wrong option chosen by fewer examinees is a non-functional distractor
+
+# Difficulty recalibration (python -m utils.recalibrate_difficulty)
+RECALIBRATION_MIN_ANSWERS = 30      # answers needed before a level is proposed
+RECALIBRATION_EASY_RATE = 0.70      # success rate from which a question is easy
+RECALIBRATION_HARD_RATE = 0.40      # success rate below which a question is hard
+RECALIBRATION_MARGIN = 0.05         # how far past a threshold a question must be to change level
+
+# In-memory record caches (per process, invalidated by every write)
+QUESTION_CACHE_SIZE = 20000         # questions kept by Question.get_by_id / get_by_ids
+OPTION_CACHE_SIZE = 20000           # questions whose option lists are kept
+
+# Random question sampling (set an integer for reproducible exams)
+QUESTION_SAMPLER_SEED = None
+
 # Scoring settings
 CORRECT_ANSWER_POINTS = 10
 WRONG_ANSWER_PENALTY = 0
 TIME_BONUS_ENABLED = False
 
+# Headless exam server settings (python server.py)
+SERVER_HOST = '127.0.0.1'
+SERVER_PORT = 8080
+SERVER_WORKERS = 8               # threads running database work
+SERVER_MAX_BODY_SIZE = 1024 * 1024
+SERVER_REVIEW_WINDOW = 3600        # seconds a finished attempt stays in memory for its review
+EXAM_DEADLINE_GRACE = 2            # seconds of network slack before late answers are rejected
+
 # GUI settings
+UI_WORKERS = 2                   # background threads running view queries
+UI_POLL_INTERVAL_MS = 50         # how often the Tk loop collects finished tasks
 WINDOW_WIDTH = 1000
 WINDOW_HEIGHT = 700
 FONT_FAMILY = 'Arial'
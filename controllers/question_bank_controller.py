@@ -1,6 +1,10 @@
 """Question Bank Controller"""
 from models.question import Question
 from models.option import Option
+from config import QUESTION_IMPORT_CHUNK_SIZE
+
+# Question ids per IN (...) option lookup (SQLite before 3.32 allows only 999 variables)
+OPTIONS_BATCH_SIZE = 500
 
 
 class QuestionBankController:
@@ -30,6 +34,66 @@ class QuestionBankController:
 
         return question_id
 
+    @staticmethod
+    def validate_question_data(question_text, difficulty, options_data):
+        """Check one question before a bulk insert (raises ValueError)"""
+        if not question_text or not str(question_text).strip():
+            raise ValueError("Question text is required")
+
+        if difficulty not in (1, 2, 3):
+            raise ValueError(f"Invalid difficulty: {difficulty!r} (must be 1, 2 or 3)")
+
+        correct_count = sum(1 for _, is_correct in options_data if is_correct)
+        if correct_count != 1:
+            raise ValueError("Exactly one option must be marked as correct")
+
+        if len(options_data) < 2:
+            raise ValueError("At least 2 options are required")
+
+        if any(not option_text or not str(option_text).strip() for option_text, _ in options_data):
+            raise ValueError("Option text is required")
+
+    @staticmethod
+    def import_questions(records, chunk_size=QUESTION_IMPORT_CHUNK_SIZE, progress=None):
+        """
+        Import many questions using one transaction per chunk
+
+        records: iterable of tuples [(question_text, difficulty, category, options_data), ...]
+        progress: optional callback progress(imported, processed) called after each chunk
+        Invalid records are skipped and reported; chunks already committed are kept
+        if a later chunk fails.
+        """
+        imported = 0
+        processed = 0
+        errors = []
+        chunk = []
+
+        for number, (question_text, difficulty, category, options_data) in enumerate(records, start=1):
+            processed = number
+            try:
+                QuestionBankController.validate_question_data(question_text, difficulty, options_data)
+            except ValueError as e:
+                errors.append({'record': number, 'error': str(e)})
+                continue
+
+            chunk.append((question_text, difficulty, category, options_data))
+            if len(chunk) >= chunk_size:
+                imported += len(Question.bulk_create(chunk))
+                chunk = []
+                if progress:
+                    progress(imported, processed)
+
+        if chunk:
+            imported += len(Question.bulk_create(chunk))
+            if progress:
+                progress(imported, processed)
+
+        return {
+            'imported': imported,
+            'errors': errors,
+            'total_records': processed
+        }
+
     @staticmethod
     def update_question_with_options(question_id, question_text=None, difficulty=None, 
                                      category=None, options_data=None):
@@ -74,52 +138,68 @@ class QuestionBankController:
     @staticmethod
     def get_all_questions_with_options():
         """Get all questions with their options"""
-        questions = Question.get_all()
-        result = []
+        return list(QuestionBankController.iter_questions_with_options())
 
-        for question in questions:
-            options = Option.get_by_question(question.id)
-            result.append({
-                'question': question,
-                'options': options
-            })
-
-        return result
+    @staticmethod
+    def iter_questions_with_options(difficulty=None, batch_size=OPTIONS_BATCH_SIZE):
+        """Stream {'question', 'options'} in id order, loading options one batch at a time"""
+        batch = []
+        for question in Question.iter_all(difficulty):
+            batch.append(question)
+            if len(batch) >= batch_size:
+                yield from QuestionBankController._attach_options(batch)
+                batch = []
+        yield from QuestionBankController._attach_options(batch)
 
     @staticmethod
-    def search_questions(keyword=None, difficulty=None, category=None):
-        """Search questions by various criteria"""
-        questions = Question.get_all()
+    def _attach_options(questions):
+        options_by_question = Option.get_by_questions(q.id for q in questions)
+        return [{
+            'question': question,
+            'options': options_by_question[question.id]
+        } for question in questions]
 
-        # Filter by keyword
-        if keyword:
-            keyword = keyword.lower()
-            questions = [q for q in questions if keyword in q.question_text.lower()]
+    @staticmethod
+    def get_questions_page(offset=0, limit=50, difficulty=None, after_id=None):
+        """Get one page of questions with their options (for list screens)
 
-        # Filter by difficulty
-        if difficulty:
-            questions = [q for q in questions if q.difficulty == difficulty]
+        When the id of the previous page's last question is known, pass it as
+        after_id to seek with the primary key instead of skipping offset rows.
+        """
+        if after_id is not None:
+            questions = Question.get_page_after(after_id, limit, difficulty)
+        else:
+            questions = Question.get_page(offset, limit, difficulty)
+        options_by_question = Option.get_by_questions(q.id for q in questions)
+        return [{
+            'question': question,
+            'options': options_by_question[question.id]
+        } for question in questions]
 
-        # Filter by category
-        if category:
-            questions = [q for q in questions if q.category == category]
+    @staticmethod
+    def count_questions(difficulty=None):
+        """Count questions, optionally only those of one difficulty"""
+        return Question.count(difficulty)
 
-        return questions
+    @staticmethod
+    def search_questions(keyword=None, difficulty=None, category=None):
+        """Search questions by keyword (full-text, ranked), difficulty and category"""
+        return Question.search(keyword, difficulty, category)
 
     @staticmethod
     def get_questions_by_difficulty_range(min_difficulty, max_difficulty):
         """Get questions within a difficulty range"""
-        questions = Question.get_all()
-        return [q for q in questions if min_difficulty <= q.difficulty <= max_difficulty]
+        return [q for q in Question.iter_all() if min_difficulty <= q.difficulty <= max_difficulty]
 
     @staticmethod
     def validate_question_bank():
         """Validate entire question bank for data integrity"""
-        questions = Question.get_all()
         issues = []
+        total_questions = 0
 
-        for question in questions:
-            options = Option.get_by_question(question.id)
+        for item in QuestionBankController.iter_questions_with_options():
+            question, options = item['question'], item['options']
+            total_questions += 1
             
             # Check if question has options
             if not options:
@@ -138,5 +218,5 @@ class QuestionBankController:
         return {
             'is_valid': len(issues) == 0,
             'issues': issues,
-            'total_questions': len(questions)
+            'total_questions': total_questions
         }
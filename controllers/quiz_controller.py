@@ -4,6 +4,9 @@ from models.question import Question
 from models.option import Option
 from models.quiz import Quiz
 from models.attempt import Attempt
+from models.exam_generator import exam_generator, difficulty_quotas
+from models.answer_key import answer_key
+from database.connection import IN_LIST_MAX_PADDED
 from config import CORRECT_ANSWER_POINTS
 
 
@@ -36,39 +39,63 @@ class QuizController:
         return quiz_id
 
     @staticmethod
-    def get_quiz_with_questions(quiz_id, difficulty_matrix={'easy': 10, 'medium': 10, 'hard': 10}):
-        """Get quiz with randomly selected questions each time"""
+    def get_quiz_with_questions(quiz_id, difficulty_matrix={'easy': 10, 'medium': 10, 'hard': 10},
+                                categories=None):
+        """Get quiz with randomly selected questions each time
+
+        A difficulty that runs short is topped up from neighbouring difficulties;
+        quiz_data['missing'] counts the questions the bank could not supply.
+        With categories, each difficulty is spread evenly over them.
+        """
+        exams = QuizController.generate_exam_variants(
+            quiz_id, difficulty_quotas(difficulty_matrix, categories), 1)
+        return exams[0] if exams else None
+
+    @staticmethod
+    def generate_exam_variants(quiz_id, quotas, variants):
+        """Generate several distinct exams at once (e.g. one per student in a room)
+
+        quotas: {(difficulty, category): count}, None meaning any difficulty or category
+        Returns a list of quiz_data dicts like get_quiz_with_questions, or None if the
+        quiz does not exist. Questions and options of every variant are loaded together.
+        """
         quiz = Quiz.get_by_id(quiz_id)
         if not quiz:
             return None
 
-        # Select random questions based on difficulty_matrix
-        selected_questions = []
-        
-        for difficulty_name, count in difficulty_matrix.items():
-            if count > 0:
-                difficulty_level = {'easy': 1, 'medium': 2, 'hard': 3}.get(difficulty_name, 1)
-                questions = Question.get_random_questions(count, difficulty_level)
-                selected_questions.extend(questions)
-        
-        # Shuffle questions to randomize order
-        random.shuffle(selected_questions)
-        
-        quiz_data = {
-            'quiz': quiz,
-            'questions': []
-        }
+        exams = exam_generator.generate(quotas, variants)
+
+        question_ids = list({question_id for exam in exams for question_id in exam['question_ids']})
+        questions = {}
+        options_by_question = {}
+        for start in range(0, len(question_ids), IN_LIST_MAX_PADDED):
+            chunk = question_ids[start:start + IN_LIST_MAX_PADDED]
+            questions.update((question.id, question) for question in Question.get_by_ids(chunk))
+            options_by_question.update(Option.get_by_questions(chunk))
 
-        for question in selected_questions:
-            options = Option.get_by_question(question.id)
-            # Shuffle options for randomization
-            random.shuffle(options)
-            quiz_data['questions'].append({
-                'question': question,
-                'options': options
-            })
+        quiz_data_list = []
+        for exam in exams:
+            quiz_data = {
+                'quiz': quiz,
+                'questions': [],
+                'missing': exam['missing']
+            }
+            for question_id in exam['question_ids']:
+                question = questions.get(question_id)
+                if question is None:
+                    # Deleted since the sampler pools were loaded
+                    quiz_data['missing'] += 1
+                    continue
+                # Shuffle options for randomization (each variant gets its own order)
+                options = list(options_by_question[question_id])
+                random.shuffle(options)
+                quiz_data['questions'].append({
+                    'question': question,
+                    'options': options
+                })
+            quiz_data_list.append(quiz_data)
 
-        return quiz_data
+        return quiz_data_list
 
     @staticmethod
     def start_attempt(quiz_id, student_name):
@@ -83,13 +110,8 @@ class QuizController:
     @staticmethod
     def submit_answer(attempt_id, question_id, selected_option_id):
         """Submit an answer for a question"""
-        # Check if answer is correct
-        correct_option = Option.get_correct_option(question_id)
-        # Handle case when no option is selected (None)
-        if selected_option_id is None:
-            is_correct = False
-        else:
-            is_correct = (correct_option and correct_option.id == selected_option_id)
+        # Graded from the in-memory answer key (no option selected is never correct)
+        is_correct = answer_key.is_correct(question_id, selected_option_id)
 
         # Save answer
         Attempt.save_answer(attempt_id, question_id, selected_option_id, is_correct)
@@ -98,10 +120,8 @@ class QuizController:
     @staticmethod
     def complete_attempt(attempt_id, time_taken):
         """Complete an attempt and calculate score (max 10 points)"""
-        answers = Attempt.get_answers(attempt_id)
-        correct_count = sum(1 for ans in answers if ans['is_correct'])
-        total_questions = len(answers)
-        
+        total_questions, correct_count = Attempt.get_answer_counts(attempt_id)
+
         # Calculate score: max 10 points, distributed evenly across all questions
         # Example: 20 questions = 0.5 points each, 5 questions = 2 points each
         points_per_question = 10.0 / total_questions if total_questions > 0 else 0
@@ -115,6 +135,38 @@ class QuizController:
             'total': total_questions
         }
 
+    @staticmethod
+    def submit_answers_bulk(attempt_id, answers, time_taken):
+        """
+        Grade, save and complete a whole attempt in one transaction
+
+        answers: dict {question_id: selected_option_id or None} covering every question
+        """
+        answer_rows, correct_count = answer_key.grade(answers)
+        total_questions = len(answer_rows)
+        points_per_question = 10.0 / total_questions if total_questions > 0 else 0
+        score = correct_count * points_per_question
+
+        Attempt.save_answers_and_complete(attempt_id, answer_rows, score, correct_count, time_taken)
+
+        return {
+            'score': round(score, 1),
+            'correct': correct_count,
+            'total': total_questions
+        }
+
+    @staticmethod
+    def regrade_attempts(question_ids=None):
+        """Grade saved answers again with the current answer key (after correcting a key)
+
+        question_ids limits the work to answers of those questions (None: every answer).
+        Returns {'answers': answers whose result changed, 'attempts': completed attempts rescored}.
+        """
+        changed = []
+        for rows in Attempt.iter_graded_answer_batches(question_ids):
+            changed += answer_key.regrade(rows)
+        return {'answers': len(changed), 'attempts': Attempt.apply_regrade(changed)}
+
     @staticmethod
     def get_attempt_review(attempt_id):
         """Get detailed review of an attempt"""
@@ -122,34 +174,119 @@ class QuizController:
         if not attempt:
             return None
 
-        answers = Attempt.get_answers(attempt_id)
         review_data = {
             'attempt': attempt,
             'answers': []
         }
 
-        for answer in answers:
-            question = Question.get_by_id(answer['question_id'])
-            all_options = Option.get_by_question(answer['question_id'])
-            correct_option = Option.get_correct_option(answer['question_id'])
+        # One joined query returns a row per (answer, option); group them by answer
+        current = None
+        current_answer_id = None
+        for row in Attempt.get_review_rows(attempt_id):
+            if row['answer_id'] != current_answer_id:
+                current_answer_id = row['answer_id']
+                current = {
+                    'question': Question(
+                        id=row['question_id'],
+                        question_text=row['question_text'],
+                        difficulty=row['difficulty'],
+                        category=row['category'],
+                        created_at=row['question_created_at']
+                    ),
+                    'all_options': [],
+                    'selected_option_id': row['selected_option_id'],
+                    'correct_option_id': None,
+                    'is_correct': row['is_correct']
+                }
+                review_data['answers'].append(current)
 
-            review_data['answers'].append({
-                'question': question,
-                'all_options': all_options,
-                'selected_option_id': answer['selected_option_id'],
-                'correct_option_id': correct_option.id if correct_option else None,
-                'is_correct': answer['is_correct']
-            })
+            if row['option_id'] is None:
+                continue
+            current['all_options'].append(Option(
+                id=row['option_id'],
+                question_id=row['question_id'],
+                option_text=row['option_text'],
+                is_correct=bool(row['option_is_correct']),
+                created_at=row['option_created_at']
+            ))
+            if row['option_is_correct']:
+                current['correct_option_id'] = row['option_id']
 
         return review_data
 
+    @staticmethod
+    def get_quizzes_page(before=None, limit=50):
+        """Get one page of quizzes, newest first, with their statistics
+
+        Returns (quizzes, stats_by_quiz, next_key); pass next_key as `before` for
+        the following page, it is None when there are no more quizzes.
+        """
+        quizzes = Quiz.get_page(before, limit + 1)
+        next_key = Quiz.page_key(quizzes[limit - 1]) if len(quizzes) > limit else None
+        quizzes = quizzes[:limit]
+        return quizzes, Attempt.get_statistics_bulk(quiz.id for quiz in quizzes), next_key
+
+    @staticmethod
+    def get_attempts_page(quiz_id, before=None, limit=50):
+        """Get one page of a quiz's attempts, newest first
+
+        Returns (attempts, next_key); pass next_key as `before` for the following
+        page, it is None when there are no more attempts.
+        """
+        attempts = Attempt.get_page_by_quiz(quiz_id, before, limit + 1)
+        next_key = Attempt.page_key(attempts[limit - 1]) if len(attempts) > limit else None
+        return attempts[:limit], next_key
+
     @staticmethod
     def get_question_statistics(question_id):
         """Get statistics for a specific question"""
         return Question.get_statistics(question_id)
 
+    @staticmethod
+    def get_question_statistics_bulk(question_ids):
+        """Get statistics for several questions at once ({question_id: stats})"""
+        return Question.get_statistics_bulk(question_ids)
+
     @staticmethod
     def analyze_difficulty():
         """Analyze actual difficulty based on answer statistics"""
         return Question.analyze_difficulty()
 
+    @staticmethod
+    def analyze_items(quiz_id=None):
+        """Item analysis of completed attempts (one quiz or all)
+
+        Returns {'questions': [...], 'quizzes': {quiz_id: {...}}}. Question rows carry
+        the fields of analyze_difficulty plus discrimination and distractor_efficiency
+        and are ordered from the lowest success rate; quizzes carry title, attempts and
+        alpha (reliability). Undefined statistics are None.
+        """
+        from utils.item_analysis import ItemAnalysis  # NumPy is only needed for this report
+
+        analysis = ItemAnalysis.load(quiz_id)
+        stats_by_id = {row['question_id']: row for row in analysis.question_report()}
+
+        # Only the analyzed questions are loaded (answers of deleted questions are skipped)
+        analyzed_ids = list(stats_by_id)
+        questions = []
+        for start in range(0, len(analyzed_ids), IN_LIST_MAX_PADDED):
+            for question in Question.get_by_ids(analyzed_ids[start:start + IN_LIST_MAX_PADDED]):
+                stats = stats_by_id[question.id]
+                questions.append({
+                    'id': question.id,
+                    'question_text': question.question_text,
+                    'labeled_difficulty': question.difficulty,
+                    'total_answers': stats['answer_count'],
+                    'success_rate': stats['p_value'] * 100,
+                    'discrimination': stats['discrimination'],
+                    'distractor_efficiency': stats['distractor_efficiency']
+                })
+        questions.sort(key=lambda row: (row['success_rate'], row['id']))
+
+        titles = {quiz.id: quiz.title for quiz in Quiz.iter_all()}
+        quizzes = {
+            quiz_id: dict(stats, title=titles.get(quiz_id, ''))
+            for quiz_id, stats in analysis.quiz_report().items()
+        }
+        return {'questions': questions, 'quizzes': quizzes}
+
@@ -1,32 +1,162 @@
 """Database connection and initialization"""
 import sqlite3
-from config import DATABASE_PATH
+import threading
+from contextlib import nullcontext
+from config import (DATABASE_PATH, DB_JOURNAL_MODE, DB_SYNCHRONOUS, DB_CACHE_SIZE,
+                    DB_MMAP_SIZE, DB_TEMP_STORE, DB_BUSY_TIMEOUT, DB_INSTRUMENTATION,
+                    DB_FETCH_BATCH_SIZE, DB_STATEMENT_CACHE_SIZE)
+from database.instrumentation import QueryRecorder, InstrumentedConnection
+
+IN_LIST_MIN_SIZE = 8      # smallest padded IN (...) list
+IN_LIST_MAX_PADDED = 512  # longer lists are not padded (older SQLite allows 999 variables)
+
+
+def fold_diacritics_sql(expression):
+    """SQL expression mapping the Vietnamese letter đ/Đ to d/D (not covered by remove_diacritics)"""
+    return f"replace(replace({expression}, 'đ', 'd'), 'Đ', 'D')"
+
+
+def in_placeholders(values):
+    """Placeholders and parameters for `IN (...)`, padded to a few fixed sizes
+
+    Lists are padded with NULL (which never matches) up to the next power of
+    two, so a handful of statement texts cover every list length and stay in
+    the connection's statement cache.
+    """
+    values = list(values)
+    size = IN_LIST_MIN_SIZE
+    while size < len(values):
+        size *= 2
+    if size > IN_LIST_MAX_PADDED:
+        size = len(values)
+    return ', '.join('?' * size), values + [None] * (size - len(values))
+
+
+def fold_diacritics(text):
+    """Python counterpart of fold_diacritics_sql, applied to search keywords"""
+    return text.replace('đ', 'd').replace('Đ', 'D')
 
 
 class Database:
-    """Singleton database connection handler"""
+    """Singleton database handler with one connection per thread
+
+    Each thread gets its own sqlite3 connection, so worker threads can read
+    while another thread commits (the database runs in WAL mode).
+    """
     _instance = None
-    _connection = None
 
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(Database, cls).__new__(cls)
+            cls._instance._reset_listeners = []
+            cls._instance._local = threading.local()
+            cls._instance._connections = []
+            cls._instance._lock = threading.Lock()
+            cls._instance.database_path = DATABASE_PATH
+            cls._instance.recorder = QueryRecorder() if DB_INSTRUMENTATION else None
+            cls._instance.data_version = 0
         return cls._instance
 
     def get_connection(self):
-        """Get database connection"""
-        if self._connection is None:
-            conn = sqlite3.connect(DATABASE_PATH)  
-            conn.row_factory = sqlite3.Row
-            conn.execute("PRAGMA foreign_keys = ON")
-            self._connection = conn
-        return self._connection
+        """Get the database connection of the current thread"""
+        conn = getattr(self._local, 'connection', None)
+        if conn is None:
+            conn = self._open_connection()
+            self._local.connection = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def _open_connection(self):
+        """Open a connection and apply the configured pragmas"""
+        if self.recorder is not None:
+            conn = sqlite3.connect(self.database_path, timeout=DB_BUSY_TIMEOUT,
+                                   check_same_thread=False, factory=InstrumentedConnection,
+                                   cached_statements=DB_STATEMENT_CACHE_SIZE)
+        else:
+            conn = sqlite3.connect(self.database_path, timeout=DB_BUSY_TIMEOUT,
+                                   check_same_thread=False, cached_statements=DB_STATEMENT_CACHE_SIZE)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA foreign_keys = ON")
+        conn.execute(f"PRAGMA journal_mode = {DB_JOURNAL_MODE}")
+        conn.execute(f"PRAGMA synchronous = {DB_SYNCHRONOUS}")
+        conn.execute(f"PRAGMA cache_size = {int(DB_CACHE_SIZE)}")
+        conn.execute(f"PRAGMA mmap_size = {int(DB_MMAP_SIZE)}")
+        conn.execute(f"PRAGMA temp_store = {DB_TEMP_STORE}")
+        if self.recorder is not None:
+            # Set after the pragmas so connection setup is not recorded
+            conn.recorder = self.recorder
+        return conn
+
+    def enable_instrumentation(self, recorder=None):
+        """Record every statement (text, shape, duration, caller) into a QueryRecorder
+
+        Open connections are closed so that they reopen instrumented.
+        """
+        self.recorder = recorder or QueryRecorder()
+        self.close_all_connections()
+        return self.recorder
+
+    def disable_instrumentation(self):
+        """Stop recording statements; returns the recorder that was in use"""
+        recorder, self.recorder = self.recorder, None
+        self.close_all_connections()
+        return recorder
+
+    def operation(self, name):
+        """Context manager grouping the statements of one user action (no-op when not instrumented)"""
+        if self.recorder is None:
+            return nullcontext()
+        return self.recorder.scope(name)
+
+    def bump_data_version(self):
+        """Mark cached query results as stale (called after writes that change statistics)"""
+        with self._lock:
+            self.data_version += 1
+
+    def iter_query(self, query, params=(), batch_size=DB_FETCH_BATCH_SIZE):
+        """Run a query and yield its rows while holding at most batch_size of them"""
+        cursor = self.get_connection().cursor()
+        cursor.arraysize = batch_size
+        cursor.execute(query, params)
+
+        while True:
+            rows = cursor.fetchmany()
+            if not rows:
+                break
+            yield from rows
+
+    def add_reset_listener(self, callback):
+        """Register a callback run when the database is reset or switched (for in-memory caches)"""
+        self._reset_listeners.append(callback)
 
     def close_connection(self):
-        """Close database connection"""
-        if self._connection:
-            self._connection.close()
-            self._connection = None
+        """Close the database connection of the current thread"""
+        conn = getattr(self._local, 'connection', None)
+        if conn is not None:
+            with self._lock:
+                if conn in self._connections:
+                    self._connections.remove(conn)
+            conn.close()
+            self._local.connection = None
+
+    def close_all_connections(self):
+        """Close the connections of every thread (on exit or when switching database)"""
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        # Threads holding a closed connection will reopen on next use
+        self._local = threading.local()
+
+    def set_database_path(self, path):
+        """Point the handler at another database file"""
+        self.close_all_connections()
+        self.database_path = path
+        self.bump_data_version()
+
+        for callback in self._reset_listeners:
+            callback()
 
     def initialize_database(self):
         """Create all tables with constraints"""
@@ -114,22 +244,453 @@ class Database:
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_questions_difficulty ON questions(difficulty)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_questions_category ON questions(category)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_options_question ON options(question_id)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_attempts_quiz ON attempts(quiz_id)')
+        # Serves quiz lookups and keyset pages ordered by (started_at, id) within a quiz
+        cursor.execute('DROP INDEX IF EXISTS idx_attempts_quiz')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_attempts_quiz_started ON attempts(quiz_id, started_at, id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_quizzes_created ON quizzes(created_at, id)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_attempt_answers_attempt ON attempt_answers(attempt_id)')
+        # Foreign key children: deleting a question or option must not scan every answer
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_attempt_answers_question ON attempt_answers(question_id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_attempt_answers_option ON attempt_answers(selected_option_id)')
+        # Only unfinished attempts, for cleanup_abandoned_attempts (run on every new attempt)
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_attempts_incomplete ON attempts(started_at)
+            WHERE completed_at IS NULL
+        ''')
+
+        self._create_search_index(cursor)
+        self._create_answer_key_version(cursor)
+        self._create_question_stats(cursor)
+        self._create_quiz_stats(cursor)
+        self._create_recalibration_tables(cursor)
 
         conn.commit()
 
+    def _create_answer_key_version(self, cursor):
+        """Create the counter bumped by every change to the correct options (for in-memory answer keys)"""
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS answer_key_version (
+                id INTEGER PRIMARY KEY CHECK(id = 1),
+                version INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        cursor.execute('INSERT OR IGNORE INTO answer_key_version (id, version) VALUES (1, 0)')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS options_answer_key_insert AFTER INSERT ON options
+            WHEN NEW.is_correct BEGIN
+                UPDATE answer_key_version SET version = version + 1 WHERE id = 1;
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS options_answer_key_update AFTER UPDATE OF is_correct, question_id ON options
+            WHEN (OLD.is_correct OR NEW.is_correct)
+                AND (OLD.is_correct IS NOT NEW.is_correct OR OLD.question_id IS NOT NEW.question_id) BEGIN
+                UPDATE answer_key_version SET version = version + 1 WHERE id = 1;
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS options_answer_key_delete AFTER DELETE ON options
+            WHEN OLD.is_correct BEGIN
+                UPDATE answer_key_version SET version = version + 1 WHERE id = 1;
+            END
+        ''')
+
+    def _create_recalibration_tables(self, cursor):
+        """Create the difficulty proposals under review and the queue of questions to recalibrate"""
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS difficulty_proposals (
+                question_id INTEGER PRIMARY KEY,
+                current_difficulty INTEGER NOT NULL,
+                proposed_difficulty INTEGER NOT NULL CHECK(proposed_difficulty IN (1, 2, 3)),
+                total_answers INTEGER NOT NULL,
+                success_rate REAL NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending'
+                    CHECK(status IN ('pending', 'accepted', 'rejected', 'applied', 'stale')),
+                proposed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                reviewed_at TIMESTAMP,
+                FOREIGN KEY (question_id) REFERENCES questions(id) ON DELETE CASCADE
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_difficulty_proposals_status ON difficulty_proposals(status)')
+
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'recalibration_queue'")
+        queue_exists = cursor.fetchone() is not None
+
+        # Questions whose answer counters changed since the last recalibration run.
+        # No foreign key: a question deleted while queued is dropped by the next run.
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS recalibration_queue (
+                question_id INTEGER PRIMARY KEY
+            )
+        ''')
+        # Every change to the counters queues the question: new answers, answers
+        # deleted with abandoned attempts and regraded answers alike
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS question_stats_recalibration_insert AFTER INSERT ON question_stats BEGIN
+                INSERT INTO recalibration_queue (question_id) VALUES (NEW.question_id)
+                ON CONFLICT(question_id) DO NOTHING;
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS question_stats_recalibration_update AFTER UPDATE ON question_stats BEGIN
+                INSERT INTO recalibration_queue (question_id) VALUES (NEW.question_id)
+                ON CONFLICT(question_id) DO NOTHING;
+            END
+        ''')
+
+        # Queue the questions answered before the queue existed
+        if not queue_exists:
+            cursor.execute('INSERT INTO recalibration_queue (question_id) SELECT question_id FROM question_stats')
+
+    def _create_question_stats(self, cursor):
+        """Create per-question and per-option answer counters maintained by triggers"""
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'question_stats'")
+        stats_exist = cursor.fetchone() is not None
+
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS question_stats (
+                question_id INTEGER PRIMARY KEY,
+                total_answers INTEGER NOT NULL DEFAULT 0,
+                correct_count INTEGER NOT NULL DEFAULT 0,
+                FOREIGN KEY (question_id) REFERENCES questions(id) ON DELETE CASCADE
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS option_stats (
+                option_id INTEGER PRIMARY KEY,
+                question_id INTEGER NOT NULL,
+                selection_count INTEGER NOT NULL DEFAULT 0,
+                FOREIGN KEY (option_id) REFERENCES options(id) ON DELETE CASCADE
+            )
+        ''')
+
+        # Counters are updated in the same transaction as the answer rows
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS attempt_answers_stats_insert AFTER INSERT ON attempt_answers BEGIN
+                INSERT INTO question_stats (question_id, total_answers, correct_count)
+                VALUES (NEW.question_id, 1, CASE WHEN NEW.is_correct THEN 1 ELSE 0 END)
+                ON CONFLICT(question_id) DO UPDATE SET
+                    total_answers = total_answers + 1,
+                    correct_count = correct_count + excluded.correct_count;
+                INSERT INTO option_stats (option_id, question_id, selection_count)
+                SELECT NEW.selected_option_id, NEW.question_id, 1 WHERE NEW.selected_option_id IS NOT NULL
+                ON CONFLICT(option_id) DO UPDATE SET selection_count = selection_count + 1;
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS attempt_answers_stats_delete AFTER DELETE ON attempt_answers BEGIN
+                UPDATE question_stats SET
+                    total_answers = total_answers - 1,
+                    correct_count = correct_count - CASE WHEN OLD.is_correct THEN 1 ELSE 0 END
+                WHERE question_id = OLD.question_id;
+                UPDATE option_stats SET selection_count = selection_count - 1
+                WHERE option_id = OLD.selected_option_id;
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS attempt_answers_stats_update
+            AFTER UPDATE OF is_correct, selected_option_id ON attempt_answers BEGIN
+                UPDATE question_stats SET correct_count = correct_count
+                    - CASE WHEN OLD.is_correct THEN 1 ELSE 0 END
+                    + CASE WHEN NEW.is_correct THEN 1 ELSE 0 END
+                WHERE question_id = NEW.question_id;
+                UPDATE option_stats SET selection_count = selection_count - 1
+                WHERE option_id = OLD.selected_option_id
+                    AND OLD.selected_option_id IS NOT NEW.selected_option_id;
+                INSERT INTO option_stats (option_id, question_id, selection_count)
+                SELECT NEW.selected_option_id, NEW.question_id, 1
+                WHERE NEW.selected_option_id IS NOT NULL
+                    AND OLD.selected_option_id IS NOT NEW.selected_option_id
+                ON CONFLICT(option_id) DO UPDATE SET selection_count = selection_count + 1;
+            END
+        ''')
+
+        # Fill the counters for answers recorded before the tables existed
+        if not stats_exist:
+            self._fill_question_stats(cursor)
+
+    def _fill_question_stats(self, cursor):
+        """Recompute question_stats and option_stats from attempt_answers"""
+        cursor.execute('DELETE FROM question_stats')
+        cursor.execute('DELETE FROM option_stats')
+        cursor.execute('''
+            INSERT INTO question_stats (question_id, total_answers, correct_count)
+            SELECT question_id, COUNT(*), SUM(CASE WHEN is_correct THEN 1 ELSE 0 END)
+            FROM attempt_answers
+            GROUP BY question_id
+        ''')
+        cursor.execute('''
+            INSERT INTO option_stats (option_id, question_id, selection_count)
+            SELECT o.id, o.question_id, COUNT(*)
+            FROM attempt_answers aa
+            INNER JOIN options o ON o.id = aa.selected_option_id
+            GROUP BY o.id
+        ''')
+
+    def rebuild_question_stats(self):
+        """Rebuild the answer counters from scratch (one-shot repair for existing databases)"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        try:
+            self._fill_question_stats(cursor)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        self.bump_data_version()
+
+    def _create_quiz_stats(self, cursor):
+        """Create per-quiz score aggregates of completed attempts, maintained by triggers"""
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'quiz_stats'")
+        stats_exist = cursor.fetchone() is not None
+
+        # No foreign key: rows are removed by the triggers below when the last
+        # completed attempt goes away (including when the quiz is deleted)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS quiz_stats (
+                quiz_id INTEGER PRIMARY KEY,
+                attempt_count INTEGER NOT NULL DEFAULT 0,
+                score_sum REAL NOT NULL DEFAULT 0,
+                score_sq_sum REAL NOT NULL DEFAULT 0,
+                min_score REAL,
+                max_score REAL,
+                time_sum INTEGER NOT NULL DEFAULT 0,
+                time_count INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+
+        # Recompute one quiz from its attempts (min/max cannot be undone incrementally)
+        recompute = '''
+            DELETE FROM quiz_stats WHERE quiz_id = {quiz_id};
+            INSERT INTO quiz_stats (quiz_id, attempt_count, score_sum, score_sq_sum,
+                                    min_score, max_score, time_sum, time_count)
+            SELECT quiz_id, COUNT(*), SUM(score), SUM(score * score), MIN(score), MAX(score),
+                   COALESCE(SUM(time_taken), 0), COUNT(time_taken)
+            FROM attempts
+            WHERE quiz_id = {quiz_id} AND completed_at IS NOT NULL
+                AND EXISTS (SELECT 1 FROM quizzes WHERE id = {quiz_id})
+            GROUP BY quiz_id;
+        '''
+
+        # Completing an attempt adds it in the same transaction as the UPDATE
+        add_attempt = '''
+            INSERT INTO quiz_stats (quiz_id, attempt_count, score_sum, score_sq_sum,
+                                    min_score, max_score, time_sum, time_count)
+            VALUES (NEW.quiz_id, 1, NEW.score, NEW.score * NEW.score, NEW.score, NEW.score,
+                    COALESCE(NEW.time_taken, 0), NEW.time_taken IS NOT NULL)
+            ON CONFLICT(quiz_id) DO UPDATE SET
+                attempt_count = attempt_count + 1,
+                score_sum = score_sum + excluded.score_sum,
+                score_sq_sum = score_sq_sum + excluded.score_sq_sum,
+                min_score = MIN(COALESCE(min_score, excluded.min_score), excluded.min_score),
+                max_score = MAX(COALESCE(max_score, excluded.max_score), excluded.max_score),
+                time_sum = time_sum + excluded.time_sum,
+                time_count = time_count + excluded.time_count;
+        '''
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS attempts_quiz_stats_complete
+            AFTER UPDATE OF completed_at ON attempts
+            WHEN OLD.completed_at IS NULL AND NEW.completed_at IS NOT NULL BEGIN
+                {add_attempt}
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS attempts_quiz_stats_insert
+            AFTER INSERT ON attempts
+            WHEN NEW.completed_at IS NOT NULL BEGIN
+                {add_attempt}
+            END
+        ''')
+        # A completed attempt rescored within its quiz only shifts the sums (regrading
+        # thousands of attempts would otherwise recompute the quiz once per attempt);
+        # min/max are read again only when the old score was the extreme
+        rescore_in_place = 'OLD.completed_at IS NOT NULL AND NEW.completed_at IS NOT NULL AND OLD.quiz_id = NEW.quiz_id'
+        extreme = '''
+            CASE WHEN NEW.score {beyond}= {column} THEN NEW.score
+                 WHEN OLD.score {inside} {column} THEN {column}
+                 ELSE (SELECT {func}(score) FROM attempts
+                       WHERE quiz_id = NEW.quiz_id AND completed_at IS NOT NULL)
+            END
+        '''
+        cursor.execute('DROP TRIGGER IF EXISTS attempts_quiz_stats_change')
+        cursor.execute(f'''
+            CREATE TRIGGER attempts_quiz_stats_change
+            AFTER UPDATE OF quiz_id, score, time_taken, completed_at ON attempts
+            WHEN OLD.completed_at IS NOT NULL AND NOT ({rescore_in_place}) BEGIN
+                {recompute.format(quiz_id='OLD.quiz_id')}
+                {recompute.format(quiz_id='NEW.quiz_id')}
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS attempts_quiz_stats_rescore
+            AFTER UPDATE OF score, time_taken ON attempts
+            WHEN {rescore_in_place} BEGIN
+                UPDATE quiz_stats SET
+                    score_sum = score_sum - OLD.score + NEW.score,
+                    score_sq_sum = score_sq_sum - OLD.score * OLD.score + NEW.score * NEW.score,
+                    min_score = {extreme.format(beyond='<', inside='>', column='min_score', func='MIN')},
+                    max_score = {extreme.format(beyond='>', inside='<', column='max_score', func='MAX')},
+                    time_sum = time_sum - COALESCE(OLD.time_taken, 0) + COALESCE(NEW.time_taken, 0),
+                    time_count = time_count - (OLD.time_taken IS NOT NULL) + (NEW.time_taken IS NOT NULL)
+                WHERE quiz_id = NEW.quiz_id;
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS attempts_quiz_stats_delete
+            AFTER DELETE ON attempts
+            WHEN OLD.completed_at IS NOT NULL BEGIN
+                {recompute.format(quiz_id='OLD.quiz_id')}
+            END
+        ''')
+
+        if not stats_exist:
+            self._fill_quiz_stats(cursor)
+
+    def _fill_quiz_stats(self, cursor):
+        """Recompute quiz_stats from the completed attempts"""
+        cursor.execute('DELETE FROM quiz_stats')
+        cursor.execute('''
+            INSERT INTO quiz_stats (quiz_id, attempt_count, score_sum, score_sq_sum,
+                                    min_score, max_score, time_sum, time_count)
+            SELECT quiz_id, COUNT(*), SUM(score), SUM(score * score), MIN(score), MAX(score),
+                   COALESCE(SUM(time_taken), 0), COUNT(time_taken)
+            FROM attempts
+            WHERE completed_at IS NOT NULL
+            GROUP BY quiz_id
+        ''')
+
+    def check_quiz_stats(self):
+        """Compare quiz_stats with a fresh aggregate; returns the ids of quizzes that differ"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute('''
+            WITH actual AS (
+                SELECT quiz_id, COUNT(*) as attempt_count, SUM(score) as score_sum,
+                       SUM(score * score) as score_sq_sum, MIN(score) as min_score,
+                       MAX(score) as max_score, COALESCE(SUM(time_taken), 0) as time_sum,
+                       COUNT(time_taken) as time_count
+                FROM attempts
+                WHERE completed_at IS NOT NULL
+                GROUP BY quiz_id
+            ),
+            quiz_ids AS (
+                SELECT quiz_id FROM actual UNION SELECT quiz_id FROM quiz_stats
+            )
+            SELECT k.quiz_id
+            FROM quiz_ids k
+            LEFT JOIN actual a ON a.quiz_id = k.quiz_id
+            LEFT JOIN quiz_stats s ON s.quiz_id = k.quiz_id
+            WHERE a.quiz_id IS NULL OR s.quiz_id IS NULL
+                OR a.attempt_count != s.attempt_count
+                OR a.time_count != s.time_count
+                OR a.time_sum != s.time_sum
+                OR ABS(a.score_sum - s.score_sum) > 1e-6
+                OR ABS(a.score_sq_sum - s.score_sq_sum) > 1e-6
+                OR ABS(a.min_score - s.min_score) > 1e-9
+                OR ABS(a.max_score - s.max_score) > 1e-9
+            ORDER BY k.quiz_id
+        ''')
+        return [row['quiz_id'] for row in cursor.fetchall()]
+
+    def rebuild_quiz_stats(self):
+        """Rebuild the per-quiz score aggregates from scratch"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        try:
+            self._fill_quiz_stats(cursor)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        self.bump_data_version()
+
+    def _create_search_index(self, cursor):
+        """Create the FTS5 index over question and option texts, kept in sync by triggers"""
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'questions_fts'")
+        index_exists = cursor.fetchone() is not None
+
+        # remove_diacritics lets "khoa" match "khóa"; "đ" is a separate letter, so fold it too
+        cursor.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS questions_fts USING fts5(
+                question_text,
+                option_text,
+                tokenize = 'unicode61 remove_diacritics 2'
+            )
+        ''')
+
+        option_texts = f"""COALESCE((SELECT {fold_diacritics_sql("group_concat(option_text, ' ')")}
+                                      FROM options WHERE question_id = {{}}), '')"""
+
+        # Options inserted before their question (bulk import) are indexed with it;
+        # recreated so databases created with the older definition pick it up
+        cursor.execute('DROP TRIGGER IF EXISTS questions_fts_insert')
+        cursor.execute(f'''
+            CREATE TRIGGER questions_fts_insert AFTER INSERT ON questions BEGIN
+                INSERT INTO questions_fts (rowid, question_text, option_text)
+                VALUES (NEW.id, {fold_diacritics_sql('NEW.question_text')}, {option_texts.format('NEW.id')});
+            END
+        ''')
+        # Updates set every column (see Question.update), so re-index only real text changes
+        cursor.execute('DROP TRIGGER IF EXISTS questions_fts_update')
+        cursor.execute(f'''
+            CREATE TRIGGER questions_fts_update AFTER UPDATE OF question_text ON questions
+            WHEN OLD.question_text IS NOT NEW.question_text BEGIN
+                UPDATE questions_fts SET question_text = {fold_diacritics_sql('NEW.question_text')}
+                WHERE rowid = NEW.id;
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS questions_fts_delete AFTER DELETE ON questions BEGIN
+                DELETE FROM questions_fts WHERE rowid = OLD.id;
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS options_fts_insert AFTER INSERT ON options BEGIN
+                UPDATE questions_fts SET option_text = {option_texts.format('NEW.question_id')}
+                WHERE rowid = NEW.question_id;
+            END
+        ''')
+        cursor.execute('DROP TRIGGER IF EXISTS options_fts_update')
+        cursor.execute(f'''
+            CREATE TRIGGER options_fts_update AFTER UPDATE OF option_text ON options
+            WHEN OLD.option_text IS NOT NEW.option_text BEGIN
+                UPDATE questions_fts SET option_text = {option_texts.format('NEW.question_id')}
+                WHERE rowid = NEW.question_id;
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS options_fts_delete AFTER DELETE ON options BEGIN
+                UPDATE questions_fts SET option_text = {option_texts.format('OLD.question_id')}
+                WHERE rowid = OLD.question_id;
+            END
+        ''')
+
+        # Index questions that existed before the search index was added
+        if not index_exists:
+            cursor.execute(f'''
+                INSERT INTO questions_fts (rowid, question_text, option_text)
+                SELECT id, {fold_diacritics_sql('question_text')}, {option_texts.format('questions.id')}
+                FROM questions
+            ''')
+
     def reset_database(self):
         """Drop all tables and reinitialize (for testing)"""
         conn = self.get_connection()
         cursor = conn.cursor()
 
-        tables = ['attempt_answers', 'attempts', 'quizzes', 'options', 'questions']
+        tables = ['difficulty_proposals', 'recalibration_queue', 'answer_key_version', 'questions_fts', 'quiz_stats', 'option_stats', 'question_stats', 'attempt_answers', 'attempts', 'quizzes', 'options', 'questions']
         for table in tables:
             cursor.execute(f'DROP TABLE IF EXISTS {table}')
 
         conn.commit()
         self.initialize_database()
+        self.bump_data_version()
+
+        for callback in self._reset_listeners:
+            callback()
 
 
 # Create global database instance
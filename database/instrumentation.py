@@ -0,0 +1,201 @@
+"""Opt-in SQL instrumentation: statement counts and timings per operation scope
+
+Enable it with db.enable_instrumentation() (or DB_INSTRUMENTATION in config),
+wrap UI actions in `with db.operation("start exam"):` and read the results
+with recorder.report(), recorder.to_json() or recorder.format_top().
+Durations cover execute() itself, i.e. SQLite running up to the first row;
+fetching the remaining rows is not timed.
+"""
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_SCOPE = '(no scope)'
+
+_THIS_FILE = os.path.abspath(__file__)
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN\s*\((?:\s*\?\s*,)*\s*\?\s*\)", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_sql(sql):
+    """Reduce a statement to its shape: literals become ?, IN lists collapse, whitespace folds"""
+    shape = _STRING_LITERAL.sub('?', sql)
+    shape = _NUMBER_LITERAL.sub('?', shape)
+    shape = _WHITESPACE.sub(' ', shape).strip()
+    return _IN_LIST.sub('IN (...)', shape)
+
+
+def find_caller():
+    """Name of the first function outside this module and sqlite3 (e.g. models.question.Question.search)"""
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = os.path.abspath(frame.f_code.co_filename)
+        if filename != _THIS_FILE and 'sqlite3' not in filename:
+            code = frame.f_code
+            name = getattr(code, 'co_qualname', code.co_name)
+            return f"{frame.f_globals.get('__name__', '?')}.{name}"
+        frame = frame.f_back
+    return '?'
+
+
+class QueryRecorder:
+    """Thread-safe aggregate of executed statements, grouped by operation scope and shape"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.reset()
+
+    def reset(self):
+        """Forget everything recorded so far"""
+        with self._lock:
+            self._scopes = {}
+
+    def current_scope(self):
+        """Innermost scope of the calling thread"""
+        stack = getattr(self._local, 'stack', None)
+        return stack[-1] if stack else DEFAULT_SCOPE
+
+    def _scope_entry(self, name):
+        entry = self._scopes.get(name)
+        if entry is None:
+            entry = self._scopes[name] = {'runs': 0, 'statements': 0, 'total_ms': 0.0, 'queries': {}}
+        return entry
+
+    @contextmanager
+    def scope(self, name):
+        """Attribute statements run by this thread inside the block to `name`"""
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        stack.append(name)
+        with self._lock:
+            self._scope_entry(name)['runs'] += 1
+        try:
+            yield self
+        finally:
+            stack.pop()
+
+    def record(self, sql, duration, caller, parameters=None):
+        """Add one executed statement (an executemany batch counts once) to the current scope
+
+        parameters are those of execute() (None for executemany); subclasses may keep them.
+        """
+        shape = normalize_sql(sql)
+        duration_ms = duration * 1000
+        with self._lock:
+            entry = self._scope_entry(self.current_scope())
+            entry['statements'] += 1
+            entry['total_ms'] += duration_ms
+
+            query = entry['queries'].get(shape)
+            if query is None:
+                query = entry['queries'][shape] = {
+                    'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'callers': {}
+                }
+            query['count'] += 1
+            query['total_ms'] += duration_ms
+            query['max_ms'] = max(query['max_ms'], duration_ms)
+            query['callers'][caller] = query['callers'].get(caller, 0) + 1
+
+    def report(self):
+        """Snapshot of the recorded data as plain dicts (JSON serializable)"""
+        with self._lock:
+            report = {}
+            for name, entry in self._scopes.items():
+                runs = entry['runs'] or 1
+                report[name] = {
+                    'runs': entry['runs'],
+                    'statements': entry['statements'],
+                    'statements_per_run': round(entry['statements'] / runs, 2),
+                    'total_ms': round(entry['total_ms'], 3),
+                    'queries': [
+                        {
+                            'sql': shape,
+                            'count': query['count'],
+                            'total_ms': round(query['total_ms'], 3),
+                            'max_ms': round(query['max_ms'], 3),
+                            'callers': dict(query['callers'])
+                        }
+                        for shape, query in sorted(entry['queries'].items(),
+                                                   key=lambda item: -item[1]['total_ms'])
+                    ]
+                }
+            return report
+
+    def to_json(self, path=None, indent=2):
+        """Dump the report as JSON (returned as a string, and written to `path` if given)"""
+        output = json.dumps(self.report(), indent=indent, ensure_ascii=False)
+        if path:
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(output)
+        return output
+
+    def top(self, limit=10, key='total_ms'):
+        """Most expensive (scope, shape) pairs ordered by `key` (total_ms, count or max_ms)"""
+        rows = []
+        for name, entry in self.report().items():
+            for query in entry['queries']:
+                rows.append(dict(query, scope=name))
+        rows.sort(key=lambda row: -row[key])
+        return rows[:limit]
+
+    def format_top(self, limit=10, key='total_ms', sql_width=70):
+        """Top-N table as text, one line per (scope, shape)"""
+        lines = [f"{'scope':<24} {'count':>6} {'total ms':>10} {'max ms':>8}  sql / caller"]
+        for row in self.top(limit, key):
+            sql = row['sql'] if len(row['sql']) <= sql_width else row['sql'][:sql_width - 3] + '...'
+            caller = max(row['callers'], key=row['callers'].get)
+            lines.append(f"{row['scope'][:24]:<24} {row['count']:>6} {row['total_ms']:>10.3f} "
+                         f"{row['max_ms']:>8.3f}  {sql}")
+            lines.append(f"{'':<52}  ↳ {caller}")
+        return '\n'.join(lines)
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """Cursor timing each execute/executemany and reporting it to the connection's recorder"""
+
+    def execute(self, sql, parameters=()):
+        recorder = self.connection.recorder
+        if recorder is None:
+            return super().execute(sql, parameters)
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            recorder.record(sql, time.perf_counter() - started, find_caller(), parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        recorder = self.connection.recorder
+        if recorder is None:
+            return super().executemany(sql, seq_of_parameters)
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            recorder.record(sql, time.perf_counter() - started, find_caller())
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """Connection whose cursors (including conn.execute shortcuts) are instrumented
+
+    Nothing is recorded until `recorder` is set.
+    """
+
+    recorder = None
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
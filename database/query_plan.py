@@ -0,0 +1,87 @@
+"""Query-plan checks: EXPLAIN QUERY PLAN for recorded statements
+
+A PlanRecorder collects the statements (with their parameters) run inside
+each operation scope; find_plan_problems() then explains them and reports
+full scans of the tables that grow with usage. unindexed_foreign_keys()
+lists child columns that make parent deletes scan the child table.
+"""
+import re
+from database.instrumentation import QueryRecorder, normalize_sql
+
+# Tables whose size grows with the question bank or the answer history
+LARGE_TABLES = ('questions', 'options', 'attempts', 'attempt_answers')
+
+# "SCAN questions", "SCAN q USING INDEX ..." (alias) or "SCAN TABLE questions" (SQLite < 3.36)
+_SCAN = re.compile(r'^SCAN (?:TABLE )?(\w+)')
+_EXPLAINABLE = ('SELECT', 'WITH', 'UPDATE', 'DELETE', 'INSERT', 'REPLACE')
+
+
+class PlanRecorder(QueryRecorder):
+    """QueryRecorder that also keeps each distinct statement of a scope with sample parameters"""
+
+    def reset(self):
+        super().reset()
+        with self._lock:
+            self.statements = {}
+
+    def record(self, sql, duration, caller, parameters=None):
+        super().record(sql, duration, caller, parameters)
+        # executemany batches (parameters None) are the plain INSERT ... VALUES of bulk writes
+        if parameters is not None and sql.lstrip().upper().startswith(_EXPLAINABLE):
+            with self._lock:
+                self.statements.setdefault((self.current_scope(), sql), parameters)
+
+
+def explain(conn, sql, parameters=None):
+    """Detail lines of EXPLAIN QUERY PLAN for one statement"""
+    return [row[3] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql, parameters or ())]
+
+
+def _scanned_tables(sql, details):
+    """Map the table names or aliases of SCAN lines back to tables"""
+    aliases = dict((alias, table) for table, alias in
+                   re.findall(r'\b(?:FROM|JOIN)\s+(\w+)\s+(?:AS\s+)?(\w+)', sql, re.IGNORECASE))
+    for detail in details:
+        match = _SCAN.match(detail)
+        if match:
+            name = match.group(1)
+            yield aliases.get(name, name), detail
+
+
+def find_plan_problems(conn, recorder, allowed_scans=None):
+    """Full scans of LARGE_TABLES among the statements recorded by a PlanRecorder
+
+    allowed_scans: {scope: tables that scope may scan on purpose (reports, exports)}
+    Returns a list of dicts (scope, sql, plan line).
+    """
+    allowed_scans = allowed_scans or {}
+    problems = []
+    with recorder._lock:
+        statements = list(recorder.statements.items())
+
+    for (scope, sql), parameters in statements:
+        details = explain(conn, sql, parameters)
+        for table, detail in _scanned_tables(sql, details):
+            if table in LARGE_TABLES and table not in allowed_scans.get(scope, ()):
+                problems.append({'scope': scope, 'sql': normalize_sql(sql), 'plan': detail})
+    return problems
+
+
+def unindexed_foreign_keys(conn):
+    """Foreign key columns ('table.column') not leading any index of their table"""
+    missing = []
+    tables = [row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'")]
+
+    for table in tables:
+        # An INTEGER PRIMARY KEY is the rowid itself and has no index of its own
+        leading = {column[1] for column in conn.execute(f'PRAGMA table_info("{table}")') if column[5] == 1}
+        for index in conn.execute(f'PRAGMA index_list("{table}")'):
+            columns = conn.execute(f'PRAGMA index_info("{index[1]}")').fetchall()
+            if columns:
+                leading.add(columns[0][2])
+        for foreign_key in conn.execute(f'PRAGMA foreign_key_list("{table}")'):
+            column = foreign_key[3]
+            if column not in leading:
+                missing.append(f'{table}.{column}')
+    return missing
@@ -4,10 +4,12 @@ from tkinter import messagebox
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 from database.connection import db
+from models.answer_key import answer_key
 from views.quiz_view import QuizView
 from views.question_bank_view import QuestionBankView
 from views.statistics_view import StatisticsView
-from config import WINDOW_WIDTH, WINDOW_HEIGHT, FONT_FAMILY, FONT_SIZE_TITLE
+from utils.task_executor import task_executor
+from config import WINDOW_WIDTH, WINDOW_HEIGHT, FONT_FAMILY, FONT_SIZE_TITLE, DB_INSTRUMENTATION_REPORT
 
 
 class QuizApp:
@@ -17,6 +19,7 @@ class QuizApp:
         self.root = root
         self.root.title("Quiz Application")
         self.root.geometry(f"{WINDOW_WIDTH}x{WINDOW_HEIGHT}")
+        task_executor.attach(root)
         
         # Initialize database
         db.initialize_database()
@@ -24,6 +27,8 @@ class QuizApp:
         # Create main container
         # Auto-create sample questions if database is empty
         self.check_and_create_sample_data()
+        # Build the answer key once so grading never reads the options table
+        answer_key.load()
         self.main_container = ttk.Frame(root)
         self.main_container.pack(fill=tk.BOTH, expand=True)
         
@@ -99,6 +104,8 @@ class QuizApp:
 
     def clear_content(self):
         """Clear current content"""
+        # Results of queries started by the previous view are no longer wanted
+        task_executor.cancel_all()
         for widget in self.content_frame.winfo_children():
             widget.destroy()
 
@@ -138,22 +145,30 @@ class QuizApp:
     def show_quiz(self):
         """Show quiz view"""
         self.clear_content()
-        QuizView(self.content_frame)
+        with db.operation("open quiz list"):
+            QuizView(self.content_frame)
 
     def show_question_bank(self):
         """Show question bank view"""
         self.clear_content()
-        QuestionBankView(self.content_frame)
+        with db.operation("open question bank"):
+            QuestionBankView(self.content_frame)
 
     def show_statistics(self):
         """Show statistics view"""
         self.clear_content()
-        StatisticsView(self.content_frame)
+        with db.operation("open statistics"):
+            StatisticsView(self.content_frame)
 
     def quit_app(self):
         """Quit application"""
         if messagebox.askyesno("Xác nhận", "Bạn có chắc muốn thoát?"):
-            db.close_connection()
+            if db.recorder is not None:
+                print(db.recorder.format_top())
+                db.recorder.to_json(DB_INSTRUMENTATION_REPORT)
+                print(f"📄 SQL profile written to {DB_INSTRUMENTATION_REPORT}")
+            task_executor.shutdown()
+            db.close_all_connections()
             self.root.quit()
 
 
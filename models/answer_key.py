@@ -0,0 +1,173 @@
+"""Array-backed answer key for grading without database reads"""
+import threading
+from array import array
+from database.connection import db, in_placeholders, IN_LIST_MAX_PADDED
+
+NO_KEY = 0  # slot value of a question without a correct option (option ids start at 1)
+
+
+class AnswerKey:
+    """Correct option id of every question, in one int64 slot per question id
+
+    Question ids are dense rowids, so array('q') indexed by id takes 8 bytes per
+    question and a lookup is a single index. The key is loaded once (load() at
+    startup, or lazily on the first grading) and the option and question write
+    paths refresh the questions they touch. Ids past the end of the array
+    (questions created by another process) are read on demand. Before grading,
+    PRAGMA data_version tells whether another connection committed since the
+    last check; only then is answer_key_version (bumped by triggers on every
+    correct option change) read, and the key reloaded when it moved.
+    A question with several correct options keys the lowest option id, like
+    Option.get_correct_option.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._keys = None
+        self._version = None  # answer_key_version the key was loaded at
+        self._seen = threading.local()  # data_version last checked on this thread's connection
+
+    def load(self):
+        """(Re)build the key from the options table"""
+        with self._lock:
+            self._data_version_moved()
+            self._keys, self._version = self._load_keys()
+
+    def invalidate(self):
+        """Drop the key; it is reloaded on the next grading"""
+        with self._lock:
+            self._keys = None
+
+    def refresh(self, *question_ids):
+        """Re-read the key of the given questions after their options changed (no-op when not loaded)"""
+        question_ids = [question_id for question_id in question_ids if question_id is not None]
+        with self._lock:
+            if self._keys is not None and question_ids:
+                self._read_keys(self._keys, question_ids)
+
+    def correct_option_id(self, question_id):
+        """Correct option id of a question, or None"""
+        with self._lock:
+            keys = self._ensure([question_id])
+            option_id = keys[question_id] if 0 < question_id < len(keys) else NO_KEY
+        return option_id or None
+
+    def is_correct(self, question_id, selected_option_id):
+        """Whether selected_option_id is the correct option of the question (None is never correct)"""
+        return selected_option_id is not None and self.correct_option_id(question_id) == selected_option_id
+
+    def grade(self, answers):
+        """Grade {question_id: selected_option_id or None} in one pass
+
+        Returns (answer_rows, correct_count), answer_rows being
+        [(question_id, selected_option_id, is_correct)] in the order of answers.
+        """
+        with self._lock:
+            keys = self._ensure(answers.keys())
+            size = len(keys)
+            answer_rows = []
+            correct_count = 0
+            for question_id, selected_option_id in answers.items():
+                is_correct = (selected_option_id is not None and 0 < question_id < size
+                              and keys[question_id] == selected_option_id)
+                correct_count += is_correct
+                answer_rows.append((question_id, selected_option_id, is_correct))
+        return answer_rows, correct_count
+
+    def regrade(self, answer_rows):
+        """Grade stored answers again and return the ones whose result changed
+
+        answer_rows: iterable of (answer_id, attempt_id, question_id, selected_option_id, is_correct)
+        Returns [(answer_id, attempt_id, is_correct)] with the new result of each changed answer.
+        """
+        answer_rows = list(answer_rows)
+        changed = []
+        with self._lock:
+            keys = self._ensure({row[2] for row in answer_rows})
+            size = len(keys)
+            for answer_id, attempt_id, question_id, selected_option_id, was_correct in answer_rows:
+                is_correct = (selected_option_id is not None and 0 < question_id < size
+                              and keys[question_id] == selected_option_id)
+                if is_correct != bool(was_correct):
+                    changed.append((answer_id, attempt_id, is_correct))
+        return changed
+
+    def _ensure(self, question_ids):
+        """Loaded key array, reading ids beyond its end first (lock held)"""
+        if self._data_version_moved() and self._keys is not None and self._read_version() != self._version:
+            self._keys = None
+        if self._keys is None:
+            self._keys, self._version = self._load_keys()
+        size = len(self._keys)
+        unknown = [question_id for question_id in question_ids if question_id >= size]
+        if unknown:
+            self._read_keys(self._keys, unknown)
+        return self._keys
+
+    def _data_version_moved(self):
+        """Whether another connection committed since the last check on this thread's connection"""
+        conn = db.get_connection()
+        data_version = conn.execute('PRAGMA data_version').fetchone()[0]
+        seen = self._seen
+        if getattr(seen, 'connection', None) is conn and seen.data_version == data_version:
+            return False
+        seen.connection, seen.data_version = conn, data_version
+        return True
+
+    @staticmethod
+    def _read_version():
+        row = db.get_connection().execute('SELECT version FROM answer_key_version WHERE id = 1').fetchone()
+        return row[0] if row else 0
+
+    @staticmethod
+    def _grow(keys, question_id):
+        if question_id >= len(keys):
+            keys.extend(array('q', bytes(8 * (question_id + 1 - len(keys)))))
+
+    @staticmethod
+    def _load_keys():
+        """(key array, answer_key_version it reflects)"""
+        # Read before the options: a change committed in between only causes one more reload
+        version = AnswerKey._read_version()
+        cursor = db.get_connection().cursor()
+        cursor.row_factory = None
+        cursor.execute('SELECT COALESCE(MAX(id), 0) FROM questions')
+        keys = array('q', bytes(8 * (cursor.fetchone()[0] + 1)))
+
+        cursor.execute('''
+            SELECT question_id, MIN(id) FROM options
+            WHERE is_correct = 1
+            GROUP BY question_id
+        ''')
+        for question_id, option_id in cursor.fetchall():
+            AnswerKey._grow(keys, question_id)
+            keys[question_id] = option_id
+        return keys, version
+
+    @staticmethod
+    def _read_keys(keys, question_ids):
+        cursor = db.get_connection().cursor()
+        cursor.row_factory = None
+        question_ids = list(question_ids)
+        for start in range(0, len(question_ids), IN_LIST_MAX_PADDED):
+            chunk = question_ids[start:start + IN_LIST_MAX_PADDED]
+            placeholders, params = in_placeholders(chunk)
+            cursor.execute(f'''
+                SELECT question_id, MIN(id) FROM options
+                WHERE question_id IN ({placeholders}) AND is_correct = 1
+                GROUP BY question_id
+            ''', params)
+            found = dict(cursor.fetchall())
+            for question_id in chunk:
+                option_id = found.get(question_id, NO_KEY)
+                if 0 < question_id < len(keys):
+                    keys[question_id] = option_id
+                elif option_id:
+                    # Only real questions grow the array, not arbitrary ids sent by a client
+                    AnswerKey._grow(keys, question_id)
+                    keys[question_id] = option_id
+
+
+# Create global answer key instance
+answer_key = AnswerKey()
+db.add_reset_listener(answer_key.invalidate)
@@ -1,10 +1,25 @@
 """Attempt model"""
-from database.connection import db
+from database.connection import db, in_placeholders, IN_LIST_MAX_PADDED
+from models.base import Record
 from datetime import datetime
+from config import EXPORT_BATCH_SIZE, DB_FETCH_BATCH_SIZE, ANALYSIS_BATCH_SIZE
 
+# Columns derived from the quiz_stats aggregates (s); NULL when there are no completed attempts
+STATISTICS_COLUMNS = '''
+    COALESCE(s.attempt_count, 0) as total_attempts,
+    s.score_sum / s.attempt_count as avg_score,
+    s.max_score as max_score,
+    s.min_score as min_score,
+    s.time_sum * 1.0 / s.time_count as avg_time,
+    MAX(s.score_sq_sum / s.attempt_count
+        - (s.score_sum / s.attempt_count) * (s.score_sum / s.attempt_count), 0) as score_variance
+'''
 
-class Attempt:
+
+class Attempt(Record):
     """Attempt model for quiz attempts"""
+    __slots__ = ('id', 'quiz_id', 'student_name', 'score', 'total_questions',
+                 'correct_answers', 'time_taken', 'started_at', 'completed_at')
 
     def __init__(self, id=None, quiz_id=None, student_name='', score=0, 
                  total_questions=0, correct_answers=0, time_taken=None,
@@ -40,21 +55,7 @@ class Attempt:
         cursor = conn.cursor()
 
         cursor.execute('SELECT * FROM attempts WHERE id = ?', (attempt_id,))
-        row = cursor.fetchone()
-
-        if row:
-            return Attempt(
-                id=row['id'],
-                quiz_id=row['quiz_id'],
-                student_name=row['student_name'],
-                score=row['score'],
-                total_questions=row['total_questions'],
-                correct_answers=row['correct_answers'],
-                time_taken=row['time_taken'],
-                started_at=row['started_at'],
-                completed_at=row['completed_at']
-            )
-        return None
+        return Attempt.fetch_one(cursor)
 
     @staticmethod
     def get_by_quiz(quiz_id):
@@ -65,21 +66,51 @@ class Attempt:
         cursor.execute('''
             SELECT * FROM attempts 
             WHERE quiz_id = ? 
-            ORDER BY started_at DESC
+            ORDER BY started_at DESC, id DESC
+        ''', (quiz_id,))
+        return Attempt.fetch_all(cursor)
+
+    @staticmethod
+    def get_page_by_quiz(quiz_id, before=None, limit=50):
+        """Get one page of a quiz's attempts, newest first (keyset pagination)
+
+        before: (started_at, id) of the last attempt of the previous page, None for the first page
+        """
+        conn = db.get_connection()
+        cursor = conn.cursor()
+
+        if before is None:
+            cursor.execute('''
+                SELECT * FROM attempts
+                WHERE quiz_id = ?
+                ORDER BY started_at DESC, id DESC
+                LIMIT ?
+            ''', (quiz_id, limit))
+        else:
+            cursor.execute('''
+                SELECT * FROM attempts
+                WHERE quiz_id = ? AND (started_at, id) < (?, ?)
+                ORDER BY started_at DESC, id DESC
+                LIMIT ?
+            ''', (quiz_id, before[0], before[1], limit))
+
+        return Attempt.fetch_all(cursor)
+
+    @staticmethod
+    def iter_by_quiz(quiz_id, batch_size=DB_FETCH_BATCH_SIZE):
+        """Stream a quiz's attempts, newest first, without loading them all"""
+        cursor = db.get_connection().cursor()
+        cursor.execute('''
+            SELECT * FROM attempts
+            WHERE quiz_id = ?
+            ORDER BY started_at DESC, id DESC
         ''', (quiz_id,))
-        rows = cursor.fetchall()
+        yield from Attempt.iter_fetch(cursor, batch_size)
 
-        return [Attempt(
-            id=row['id'],
-            quiz_id=row['quiz_id'],
-            student_name=row['student_name'],
-            score=row['score'],
-            total_questions=row['total_questions'],
-            correct_answers=row['correct_answers'],
-            time_taken=row['time_taken'],
-            started_at=row['started_at'],
-            completed_at=row['completed_at']
-        ) for row in rows]
+    @staticmethod
+    def page_key(attempt):
+        """Keyset position of an attempt, passed as `before` to get the next page"""
+        return (attempt.started_at, attempt.id)
 
     @staticmethod
     def complete_attempt(attempt_id, score, correct_answers, time_taken):
@@ -94,6 +125,7 @@ class Attempt:
         ''', (score, correct_answers, time_taken, datetime.now(), attempt_id))
 
         conn.commit()
+        db.bump_data_version()
         return cursor.rowcount > 0
 
     @staticmethod
@@ -108,8 +140,50 @@ class Attempt:
         ''', (attempt_id, question_id, selected_option_id, is_correct))
 
         conn.commit()
+        db.bump_data_version()
         return cursor.lastrowid
 
+    @staticmethod
+    def save_answers_and_complete(attempt_id, answer_rows, score, correct_answers, time_taken):
+        """Save all answers and complete the attempt in a single transaction
+
+        answer_rows: list of tuples [(question_id, selected_option_id, is_correct), ...]
+        """
+        conn = db.get_connection()
+        cursor = conn.cursor()
+
+        try:
+            cursor.executemany('''
+                INSERT INTO attempt_answers (attempt_id, question_id, selected_option_id, is_correct)
+                VALUES (?, ?, ?, ?)
+            ''', [(attempt_id, question_id, option_id, is_correct)
+                  for question_id, option_id, is_correct in answer_rows])
+
+            cursor.execute('''
+                UPDATE attempts
+                SET score = ?, correct_answers = ?, time_taken = ?, completed_at = ?
+                WHERE id = ?
+            ''', (score, correct_answers, time_taken, datetime.now(), attempt_id))
+
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        db.bump_data_version()
+        return cursor.rowcount > 0
+
+    @staticmethod
+    def get_answer_counts(attempt_id):
+        """Get (answers saved, correct answers) of an attempt"""
+        cursor = db.get_connection().cursor()
+        cursor.execute('''
+            SELECT COUNT(*), COALESCE(SUM(is_correct), 0)
+            FROM attempt_answers
+            WHERE attempt_id = ?
+        ''', (attempt_id,))
+        total, correct = cursor.fetchone()
+        return total, correct
+
     @staticmethod
     def get_answers(attempt_id):
         """Get all answers for an attempt"""
@@ -128,24 +202,219 @@ class Attempt:
         return cursor.fetchall()
 
     @staticmethod
-    def get_statistics(quiz_id):
-        """Get statistics for a quiz"""
+    def get_review_rows(attempt_id):
+        """Get answers joined with their question and every option (one row per option)"""
         conn = db.get_connection()
         cursor = conn.cursor()
 
         cursor.execute('''
-            SELECT 
-                COUNT(*) as total_attempts,
-                AVG(score) as avg_score,
-                MAX(score) as max_score,
-                MIN(score) as min_score,
-                AVG(time_taken) as avg_time
-            FROM attempts
-            WHERE quiz_id = ? AND completed_at IS NOT NULL
+            SELECT
+                aa.id as answer_id,
+                aa.question_id,
+                aa.selected_option_id,
+                aa.is_correct,
+                q.question_text,
+                q.difficulty,
+                q.category,
+                q.created_at as question_created_at,
+                o.id as option_id,
+                o.option_text,
+                o.is_correct as option_is_correct,
+                o.created_at as option_created_at
+            FROM attempt_answers aa
+            INNER JOIN questions q ON aa.question_id = q.id
+            LEFT JOIN options o ON o.question_id = aa.question_id
+            WHERE aa.attempt_id = ?
+            ORDER BY aa.answered_at, aa.id, o.id
+        ''', (attempt_id,))
+
+        return cursor.fetchall()
+
+    @staticmethod
+    def iter_export_rows(quiz_id=None, completed_only=True, batch_size=EXPORT_BATCH_SIZE):
+        """Stream attempts (with the quiz title) in id order, batch_size rows at a time"""
+        where, params = Attempt._export_filter(quiz_id, completed_only)
+        yield from db.iter_query(f'''
+            SELECT
+                a.id, a.quiz_id, qz.title as quiz_title, a.student_name, a.score,
+                a.total_questions, a.correct_answers, a.time_taken, a.started_at, a.completed_at
+            FROM attempts a
+            INNER JOIN quizzes qz ON a.quiz_id = qz.id
+            {where}
+            ORDER BY a.id
+        ''', params, batch_size)
+
+    @staticmethod
+    def iter_answer_export_rows(quiz_id=None, completed_only=True, batch_size=EXPORT_BATCH_SIZE):
+        """Stream answers (with attempt and question details) in attempt order, batch_size rows at a time"""
+        where, params = Attempt._export_filter(quiz_id, completed_only)
+        yield from db.iter_query(f'''
+            SELECT
+                aa.id, aa.attempt_id, a.quiz_id, a.student_name, aa.question_id,
+                q.difficulty, q.category, aa.selected_option_id, aa.is_correct, aa.answered_at
+            FROM attempts a
+            INNER JOIN attempt_answers aa ON aa.attempt_id = a.id
+            INNER JOIN questions q ON aa.question_id = q.id
+            {where}
+            ORDER BY a.id, aa.id
+        ''', params, batch_size)
+
+    @staticmethod
+    def iter_response_batches(quiz_id=None, batch_size=ANALYSIS_BATCH_SIZE):
+        """Stream answers of completed attempts as lists of plain tuples, batch_size at a time
+
+        Each row is (attempt_id, quiz_id, question_id, selected_option_id or -1, is_correct),
+        ready to be turned into an array without going through sqlite3.Row.
+        """
+        where, params = Attempt._export_filter(quiz_id, True)
+        cursor = db.get_connection().cursor()
+        cursor.row_factory = None
+        cursor.arraysize = batch_size
+        cursor.execute(f'''
+            SELECT aa.attempt_id, a.quiz_id, aa.question_id,
+                   COALESCE(aa.selected_option_id, -1), aa.is_correct
+            FROM attempts a
+            INNER JOIN attempt_answers aa ON aa.attempt_id = a.id
+            {where}
+        ''', params)
+
+        while True:
+            rows = cursor.fetchmany()
+            if not rows:
+                break
+            yield rows
+
+    @staticmethod
+    def iter_graded_answer_batches(question_ids=None, batch_size=DB_FETCH_BATCH_SIZE):
+        """Stream saved answers (of the given questions, or all) as lists of plain tuples
+
+        Each row is (answer_id, attempt_id, question_id, selected_option_id, is_correct).
+        """
+        cursor = db.get_connection().cursor()
+        cursor.row_factory = None
+        cursor.arraysize = batch_size
+        if question_ids is None:
+            chunks = [None]
+        else:
+            question_ids = list(question_ids)
+            chunks = [question_ids[start:start + IN_LIST_MAX_PADDED]
+                      for start in range(0, len(question_ids), IN_LIST_MAX_PADDED)]
+
+        for chunk in chunks:
+            if chunk is None:
+                cursor.execute('''
+                    SELECT id, attempt_id, question_id, selected_option_id, is_correct
+                    FROM attempt_answers
+                ''')
+            else:
+                placeholders, params = in_placeholders(chunk)
+                cursor.execute(f'''
+                    SELECT id, attempt_id, question_id, selected_option_id, is_correct
+                    FROM attempt_answers
+                    WHERE question_id IN ({placeholders})
+                ''', params)
+            while True:
+                rows = cursor.fetchmany()
+                if not rows:
+                    break
+                yield rows
+
+    @staticmethod
+    def apply_regrade(changed_answers):
+        """Store new results of regraded answers and rescore their completed attempts
+
+        changed_answers: [(answer_id, attempt_id, is_correct)]
+        Runs in one transaction; returns the number of completed attempts rescored.
+        The regraded questions are queued for the next difficulty recalibration.
+        """
+        if not changed_answers:
+            return 0
+
+        conn = db.get_connection()
+        cursor = conn.cursor()
+
+        try:
+            cursor.execute('BEGIN IMMEDIATE')
+            # question_stats follows through the attempt_answers update trigger, and its
+            # update trigger queues the questions in recalibration_queue
+            cursor.executemany(
+                'UPDATE attempt_answers SET is_correct = ? WHERE id = ?',
+                [(is_correct, answer_id) for answer_id, _, is_correct in changed_answers])
+            # Same score as at completion: 10 points spread over the saved answers
+            cursor.executemany('''
+                UPDATE attempts
+                SET (correct_answers, score) = (
+                    SELECT COALESCE(SUM(is_correct), 0), COALESCE(SUM(is_correct) * 10.0 / COUNT(*), 0)
+                    FROM attempt_answers WHERE attempt_id = attempts.id
+                )
+                WHERE id = ? AND completed_at IS NOT NULL
+            ''', [(attempt_id,) for attempt_id in sorted({row[1] for row in changed_answers})])
+            rescored = cursor.rowcount
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        db.bump_data_version()
+        return rescored
+
+    @staticmethod
+    def _export_filter(quiz_id, completed_only):
+        conditions = []
+        params = []
+        if quiz_id is not None:
+            conditions.append('a.quiz_id = ?')
+            params.append(quiz_id)
+        if completed_only:
+            conditions.append('a.completed_at IS NOT NULL')
+        return ('WHERE ' + ' AND '.join(conditions)) if conditions else '', params
+
+    @staticmethod
+    def get_statistics(quiz_id):
+        """Get statistics for a quiz (read from the quiz_stats aggregates)"""
+        conn = db.get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute(f'''
+            SELECT {STATISTICS_COLUMNS}
+            FROM (SELECT ? as quiz_id) k
+            LEFT JOIN quiz_stats s ON s.quiz_id = k.quiz_id
         ''', (quiz_id,))
 
         return cursor.fetchone()
 
+    @staticmethod
+    def get_all_statistics():
+        """Get statistics for every quiz in one query ({quiz_id: stats})"""
+        conn = db.get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute(f'''
+            SELECT qz.id as quiz_id, {STATISTICS_COLUMNS}
+            FROM quizzes qz
+            LEFT JOIN quiz_stats s ON s.quiz_id = qz.id
+        ''')
+
+        return {row['quiz_id']: row for row in cursor.fetchall()}
+
+    @staticmethod
+    def get_statistics_bulk(quiz_ids):
+        """Get statistics for several quizzes at once ({quiz_id: stats}; quizzes without attempts are left out)"""
+        quiz_ids = list(quiz_ids)
+        if not quiz_ids:
+            return {}
+
+        conn = db.get_connection()
+        cursor = conn.cursor()
+
+        placeholders, params = in_placeholders(quiz_ids)
+        cursor.execute(f'''
+            SELECT s.quiz_id, {STATISTICS_COLUMNS}
+            FROM quiz_stats s
+            WHERE s.quiz_id IN ({placeholders})
+        ''', params)
+
+        return {row['quiz_id']: row for row in cursor.fetchall()}
+
     @staticmethod
     def delete(attempt_id):
         """Delete attempt"""
@@ -154,6 +423,7 @@ class Attempt:
 
         cursor.execute('DELETE FROM attempts WHERE id = ?', (attempt_id,))
         conn.commit()
+        db.bump_data_version()
         return cursor.rowcount > 0
     @staticmethod
     def cleanup_abandoned_attempts(hours_threshold=24):
@@ -169,4 +439,7 @@ class Attempt:
         
         deleted_count = cursor.rowcount
         conn.commit()
+        if deleted_count:
+            # Their answers leave the per-question counters
+            db.bump_data_version()
         return deleted_count
@@ -0,0 +1,70 @@
+"""Shared base class for model records"""
+from operator import itemgetter
+
+
+class Record:
+    """Model object with fixed attributes and a fast cursor-to-object mapper
+
+    Subclasses list their columns in __slots__, in the same order as their
+    __init__ parameters, so instances carry no per-object __dict__. Rows are
+    turned into objects by a cursor row factory instead of going through
+    sqlite3.Row and keyword arguments:
+
+        cursor.execute('SELECT * FROM questions WHERE id = ?', (question_id,))
+        return Question.fetch_one(cursor)
+    """
+    __slots__ = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._mappers = {}
+
+    @classmethod
+    def mapper(cls, description):
+        """Row factory building instances from rows with the given cursor.description (cached)"""
+        names = tuple(column[0] for column in description)
+        mapper = cls._mappers.get(names)
+        if mapper is None:
+            mapper = cls._mappers[names] = cls._build_mapper(names)
+        return mapper
+
+    @classmethod
+    def _build_mapper(cls, names):
+        if names == cls.__slots__:
+            # SELECT * in schema order: pass the row straight to the constructor
+            return lambda cursor, row: cls(*row)
+
+        missing = [name for name in cls.__slots__ if name not in names]
+        if missing:
+            raise ValueError(f"{cls.__name__} query is missing columns: {', '.join(missing)}")
+        getter = itemgetter(*(names.index(name) for name in cls.__slots__))
+        if len(cls.__slots__) == 1:
+            return lambda cursor, row: cls(getter(row))
+        return lambda cursor, row: cls(*getter(row))
+
+    @classmethod
+    def fetch_one(cls, cursor):
+        """Fetch the next row of an executed cursor as an instance (None when exhausted)"""
+        cursor.row_factory = cls.mapper(cursor.description)
+        return cursor.fetchone()
+
+    @classmethod
+    def fetch_all(cls, cursor):
+        """Fetch the remaining rows of an executed cursor as instances"""
+        cursor.row_factory = cls.mapper(cursor.description)
+        return cursor.fetchall()
+
+    @classmethod
+    def iter_fetch(cls, cursor, batch_size):
+        """Yield instances from an executed cursor, batch_size rows per fetchmany()"""
+        cursor.row_factory = cls.mapper(cursor.description)
+        cursor.arraysize = batch_size
+        while True:
+            records = cursor.fetchmany()
+            if not records:
+                break
+            yield from records
+
+    def __repr__(self):
+        fields = ', '.join(f'{name}={getattr(self, name)!r}' for name in self.__slots__)
+        return f'{type(self).__name__}({fields})'
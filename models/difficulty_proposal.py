@@ -0,0 +1,203 @@
+"""Difficulty proposal model (output of the recalibration job, reviewed before applying)"""
+from database.connection import db, in_placeholders
+from models.base import Record
+from models.question_sampler import question_sampler
+from models.question import question_cache
+from config import DB_FETCH_BATCH_SIZE
+
+PROPOSAL_STATUSES = ('pending', 'accepted', 'rejected', 'applied', 'stale')
+
+
+class DifficultyProposal(Record):
+    """Suggested difficulty level for one question"""
+    __slots__ = ('question_id', 'current_difficulty', 'proposed_difficulty', 'total_answers',
+                 'success_rate', 'status', 'proposed_at', 'reviewed_at')
+
+    def __init__(self, question_id=None, current_difficulty=1, proposed_difficulty=1, total_answers=0,
+                 success_rate=0.0, status='pending', proposed_at=None, reviewed_at=None):
+        self.question_id = question_id
+        self.current_difficulty = current_difficulty
+        self.proposed_difficulty = proposed_difficulty
+        self.total_answers = total_answers
+        self.success_rate = success_rate
+        self.status = status
+        self.proposed_at = proposed_at
+        self.reviewed_at = reviewed_at
+
+    @staticmethod
+    def get_queued_batch(after_question_id=0, limit=DB_FETCH_BATCH_SIZE):
+        """Next queued questions after after_question_id, with their level and answer counters
+
+        Returns [(question_id, difficulty, total_answers, correct_count)] ordered by question id.
+        """
+        cursor = db.get_connection().cursor()
+        cursor.execute('''
+            SELECT q.id as question_id, q.difficulty, qs.total_answers, qs.correct_count
+            FROM recalibration_queue rq
+            INNER JOIN questions q ON q.id = rq.question_id
+            INNER JOIN question_stats qs ON qs.question_id = rq.question_id
+            WHERE rq.question_id > ?
+            ORDER BY rq.question_id
+            LIMIT ?
+        ''', (after_question_id, limit))
+        return cursor.fetchall()
+
+    @staticmethod
+    def count_queued():
+        """Number of questions waiting for the next recalibration run"""
+        cursor = db.get_connection().cursor()
+        cursor.execute('SELECT COUNT(*) FROM recalibration_queue')
+        return cursor.fetchone()[0]
+
+    @staticmethod
+    def drop_deleted_from_queue():
+        """Remove queued questions that were deleted since they were queued"""
+        conn = db.get_connection()
+        conn.execute('''
+            DELETE FROM recalibration_queue
+            WHERE question_id NOT IN (SELECT question_id FROM question_stats)
+        ''')
+        conn.commit()
+
+    @staticmethod
+    def save_batch(proposals, unchanged_question_ids, processed=()):
+        """Upsert proposals, drop open ones for questions whose level is now right and dequeue
+
+        proposals: [(question_id, current_difficulty, proposed_difficulty, total_answers, success_rate)]
+        processed: [(question_id, total_answers, correct_count)] as read from the queue; a
+        question stays queued when its counters changed since then.
+        A proposal already rejected for the same level stays rejected.
+        """
+        conn = db.get_connection()
+        cursor = conn.cursor()
+
+        try:
+            cursor.executemany('''
+                INSERT INTO difficulty_proposals
+                    (question_id, current_difficulty, proposed_difficulty, total_answers, success_rate)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(question_id) DO UPDATE SET
+                    status = CASE WHEN status = 'rejected'
+                                   AND proposed_difficulty = excluded.proposed_difficulty
+                                  THEN 'rejected' ELSE 'pending' END,
+                    reviewed_at = CASE WHEN status = 'rejected'
+                                        AND proposed_difficulty = excluded.proposed_difficulty
+                                       THEN reviewed_at END,
+                    current_difficulty = excluded.current_difficulty,
+                    proposed_difficulty = excluded.proposed_difficulty,
+                    total_answers = excluded.total_answers,
+                    success_rate = excluded.success_rate,
+                    proposed_at = CURRENT_TIMESTAMP
+            ''', proposals)
+            cursor.executemany('''
+                DELETE FROM difficulty_proposals
+                WHERE question_id = ? AND status IN ('pending', 'accepted')
+            ''', [(question_id,) for question_id in unchanged_question_ids])
+            cursor.executemany('''
+                DELETE FROM recalibration_queue
+                WHERE question_id = ? AND (
+                    SELECT total_answers = ? AND correct_count = ?
+                    FROM question_stats WHERE question_id = recalibration_queue.question_id
+                )
+            ''', processed)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+    @staticmethod
+    def get_by_status(status='pending'):
+        """Get proposals with the given status, largest answer counts first"""
+        cursor = db.get_connection().cursor()
+        cursor.execute('''
+            SELECT * FROM difficulty_proposals
+            WHERE status = ?
+            ORDER BY total_answers DESC, question_id
+        ''', (status,))
+        return DifficultyProposal.fetch_all(cursor)
+
+    @staticmethod
+    def set_status(question_ids, status):
+        """Accept or reject proposals (applied ones are left alone); returns how many changed"""
+        if status not in ('pending', 'accepted', 'rejected'):
+            raise ValueError(f"Cannot set proposal status to {status!r}")
+        question_ids = list(question_ids)
+        if not question_ids:
+            return 0
+
+        conn = db.get_connection()
+        cursor = conn.cursor()
+
+        placeholders, params = in_placeholders(question_ids)
+        cursor.execute(f'''
+            UPDATE difficulty_proposals
+            SET status = ?, reviewed_at = CURRENT_TIMESTAMP
+            WHERE question_id IN ({placeholders}) AND status != 'applied'
+        ''', [status] + params)
+        conn.commit()
+        return cursor.rowcount
+
+    @staticmethod
+    def accept_all_pending():
+        """Accept every pending proposal; returns how many were accepted"""
+        conn = db.get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute('''
+            UPDATE difficulty_proposals
+            SET status = 'accepted', reviewed_at = CURRENT_TIMESTAMP
+            WHERE status = 'pending'
+        ''')
+        conn.commit()
+        return cursor.rowcount
+
+    @staticmethod
+    def apply_accepted():
+        """Write accepted levels to questions in one transaction; returns the number of questions updated
+
+        A proposal whose question was given another level since it was made is
+        marked stale instead, and the question queued for the next run.
+        """
+        conn = db.get_connection()
+        cursor = conn.cursor()
+
+        try:
+            cursor.execute('BEGIN IMMEDIATE')
+            cursor.execute('''
+                INSERT INTO recalibration_queue (question_id)
+                SELECT p.question_id FROM difficulty_proposals p
+                INNER JOIN questions q ON q.id = p.question_id
+                WHERE p.status = 'accepted' AND q.difficulty != p.current_difficulty
+                ON CONFLICT(question_id) DO NOTHING
+            ''')
+            cursor.execute('''
+                UPDATE difficulty_proposals
+                SET status = 'stale', reviewed_at = CURRENT_TIMESTAMP
+                FROM questions q
+                WHERE q.id = difficulty_proposals.question_id AND difficulty_proposals.status = 'accepted'
+                    AND q.difficulty != difficulty_proposals.current_difficulty
+            ''')
+            cursor.execute('''
+                UPDATE questions
+                SET difficulty = p.proposed_difficulty
+                FROM difficulty_proposals p
+                WHERE p.question_id = questions.id AND p.status = 'accepted'
+                    AND questions.difficulty = p.current_difficulty
+            ''')
+            updated = cursor.rowcount
+            cursor.execute('''
+                UPDATE difficulty_proposals
+                SET status = 'applied', current_difficulty = proposed_difficulty,
+                    reviewed_at = CURRENT_TIMESTAMP
+                WHERE status = 'accepted'
+            ''')
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+        if updated:
+            db.bump_data_version()
+            question_cache.clear()
+            question_sampler.invalidate()
+        return updated
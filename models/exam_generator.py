@@ -0,0 +1,158 @@
+"""Stratified exam generation from the question sampler's pools"""
+import random
+import threading
+from models.question_sampler import question_sampler
+from config import DIFFICULTY_LEVELS, QUESTION_SAMPLER_SEED
+
+VARIANT_RETRIES = 3  # redraws of a variant identical to an earlier one before accepting it
+
+
+def difficulty_quotas(difficulty_matrix, categories=None):
+    """Turn {'easy': 10, ...} into {(difficulty, category): count} quotas
+
+    With categories, each difficulty's count is spread over them as evenly as
+    possible (the remainders rotate so no category is always favoured);
+    without, the category is None (any).
+    """
+    categories = list(categories or [])
+    quotas = {}
+    offset = 0
+    for name, count in difficulty_matrix.items():
+        level = DIFFICULTY_LEVELS.get(name, 1)
+        if not categories:
+            quotas[(level, None)] = quotas.get((level, None), 0) + count
+            continue
+
+        share, extra = divmod(count, len(categories))
+        for index, category in enumerate(categories):
+            quota = share + ((index - offset) % len(categories) < extra)
+            if quota:
+                quotas[(level, category)] = quotas.get((level, category), 0) + quota
+        offset += extra
+    return quotas
+
+
+def fallback_chain(difficulty, category):
+    """Strata to draw from for (difficulty, category), the stratum itself first
+
+    Nearer difficulties of the same category come first, then the same
+    difficulty in any category, then nearer difficulties in any category,
+    then the whole bank.
+    """
+    levels = sorted(DIFFICULTY_LEVELS.values())
+    neighbours = [] if difficulty is None else \
+        sorted((level for level in levels if level != difficulty), key=lambda level: (abs(level - difficulty), level))
+
+    chain = [(difficulty, category)]
+    if category is not None:
+        chain += [(level, category) for level in neighbours]
+        if difficulty is not None:
+            chain.append((difficulty, None))
+    chain += [(level, None) for level in neighbours]
+    if chain[-1] != (None, None):
+        chain.append((None, None))
+    return chain
+
+
+class ExamGenerator:
+    """Draws question sets by difficulty × category quotas, without replacement
+
+    The quota strata's pools are copied from the sampler once per call, so any
+    number of variants is drawn in memory; a stratum that runs short is topped
+    up from its fallback_chain, whose pools are only copied then (the whole
+    bank is not copied for every exam), and whatever still cannot be found is
+    reported as missing instead of silently dropped.
+    """
+
+    def __init__(self, sampler=question_sampler, seed=None):
+        self.sampler = sampler
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def seed(self, seed=None):
+        """Reseed the random generator (useful for deterministic tests)"""
+        with self._lock:
+            self._random.seed(seed)
+
+    def generate(self, quotas, variants=1):
+        """Draw `variants` exams for quotas {(difficulty, category): count} (None means any)
+
+        Returns one dict per variant: question_ids (shuffled), fallbacks
+        ({stratum: questions taken from neighbouring strata}) and missing (count
+        that no stratum could supply). Variants differ from each other whenever
+        the pools are large enough.
+        """
+        quotas = [(stratum, count) for stratum, count in quotas.items() if count > 0]
+        chains = {stratum: fallback_chain(*stratum) for stratum, _ in quotas}
+        pools = self.sampler.snapshot({stratum for stratum, _ in quotas})
+
+        exams = []
+        seen = set()
+        with self._lock:
+            for _ in range(variants):
+                for _ in range(VARIANT_RETRIES + 1):
+                    exam = self._draw(quotas, chains, pools)
+                    signature = frozenset(exam['question_ids'])
+                    if signature not in seen:
+                        break
+                seen.add(signature)
+                self._random.shuffle(exam['question_ids'])
+                exams.append(exam)
+        return exams
+
+    def _draw(self, quotas, chains, pools):
+        picked = []
+        used = set()
+        shortages = []
+
+        # Every stratum draws from its own pool before any borrows from a neighbour
+        for stratum, count in quotas:
+            drawn = self._sample(pools[stratum], count, used)
+            picked += drawn
+            used.update(drawn)
+            if len(drawn) < count:
+                shortages.append((stratum, count - len(drawn)))
+
+        fallbacks = {}
+        missing = 0
+        for stratum, needed in shortages:
+            for neighbour in chains[stratum][1:]:
+                if neighbour not in pools:
+                    pools.update(self.sampler.snapshot([neighbour]))
+                drawn = self._sample(pools[neighbour], needed, used)
+                picked += drawn
+                used.update(drawn)
+                if drawn:
+                    fallbacks[stratum] = fallbacks.get(stratum, 0) + len(drawn)
+                needed -= len(drawn)
+                if not needed:
+                    break
+            missing += needed
+
+        return {'question_ids': picked, 'fallbacks': fallbacks, 'missing': missing}
+
+    def _sample(self, pool, count, used):
+        """Up to count ids of pool that are not in used"""
+        if count <= 0 or not pool:
+            return []
+
+        size = len(pool)
+        if size <= 4 * (count + len(used)):
+            # Small pool: draw enough extra ids to make up for any already picked
+            drawn = self._random.sample(pool, min(size, count + len(used)))
+            return [question_id for question_id in drawn if question_id not in used][:count]
+
+        # Large pool: pick random positions and skip repeats (few, since the pool is mostly unused)
+        random_position = self._random.random
+        drawn = []
+        taken = set()
+        while len(drawn) < count:
+            question_id = pool[int(random_position() * size)]
+            if question_id not in used and question_id not in taken:
+                taken.add(question_id)
+                drawn.append(question_id)
+        return drawn
+
+
+# Create global generator instance
+exam_generator = ExamGenerator(question_sampler, QUESTION_SAMPLER_SEED)
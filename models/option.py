@@ -1,15 +1,24 @@
 """Option model"""
-from database.connection import db
+from database.connection import db, in_placeholders
+from models.base import Record
+from models.record_cache import RecordCache
+from models.answer_key import answer_key
+from config import OPTION_CACHE_SIZE
 
+# Options of recently used questions: {question_id: tuple of Option}
+option_cache = RecordCache(OPTION_CACHE_SIZE)
+db.add_reset_listener(option_cache.clear)
 
-class Option:
+
+class Option(Record):
     """Option model for question choices"""
+    __slots__ = ('id', 'question_id', 'option_text', 'is_correct', 'created_at')
 
     def __init__(self, id=None, question_id=None, option_text='', is_correct=False, created_at=None):
         self.id = id
         self.question_id = question_id
         self.option_text = option_text
-        self.is_correct = is_correct
+        self.is_correct = bool(is_correct)
         self.created_at = created_at
 
     @staticmethod
@@ -24,6 +33,9 @@ class Option:
         ''', (question_id, option_text, is_correct))
 
         conn.commit()
+        db.bump_data_version()
+        option_cache.invalidate(question_id)
+        answer_key.refresh(question_id)
         return cursor.lastrowid
 
     @staticmethod
@@ -33,80 +45,93 @@ class Option:
         cursor = conn.cursor()
 
         cursor.execute('SELECT * FROM options WHERE id = ?', (option_id,))
-        row = cursor.fetchone()
-
-        if row:
-            return Option(
-                id=row['id'],
-                question_id=row['question_id'],
-                option_text=row['option_text'],
-                is_correct=bool(row['is_correct']),
-                created_at=row['created_at']
-            )
-        return None
+        return Option.fetch_one(cursor)
 
     @staticmethod
     def get_by_question(question_id):
-        """Get all options for a question"""
+        """Get all options for a question (served from option_cache when possible)"""
+        options = option_cache.get(question_id)
+        if options is None:
+            version = option_cache.version
+            conn = db.get_connection()
+            cursor = conn.cursor()
+
+            cursor.execute('SELECT * FROM options WHERE question_id = ? ORDER BY id', (question_id,))
+            options = tuple(Option.fetch_all(cursor))
+            option_cache.put(question_id, options, version)
+        return list(options)
+
+    @staticmethod
+    def get_by_questions(question_ids):
+        """Get options for several questions in one query, grouped by question_id"""
+        question_ids = list(question_ids)
+        cached, missing = option_cache.get_many(question_ids)
+        grouped = {question_id: list(cached.get(question_id, ())) for question_id in question_ids}
+        if not missing:
+            return grouped
+
+        version = option_cache.version
         conn = db.get_connection()
         cursor = conn.cursor()
 
-        cursor.execute('SELECT * FROM options WHERE question_id = ? ORDER BY id', (question_id,))
-        rows = cursor.fetchall()
+        placeholders, params = in_placeholders(missing)
+        cursor.execute(f'''
+            SELECT * FROM options
+            WHERE question_id IN ({placeholders})
+            ORDER BY question_id, id
+        ''', params)
 
-        return [Option(
-            id=row['id'],
-            question_id=row['question_id'],
-            option_text=row['option_text'],
-            is_correct=bool(row['is_correct']),
-            created_at=row['created_at']
-        ) for row in rows]
+        for option in Option.fetch_all(cursor):
+            grouped[option.question_id].append(option)
+        option_cache.put_many(((question_id, tuple(grouped[question_id])) for question_id in missing), version)
+        return grouped
 
     @staticmethod
     def get_correct_option(question_id):
         """Get the correct option for a question"""
-        conn = db.get_connection()
-        cursor = conn.cursor()
+        for option in Option.get_by_question(question_id):
+            if option.is_correct:
+                return option
+        return None
 
-        cursor.execute('''
-            SELECT * FROM options 
-            WHERE question_id = ? AND is_correct = 1
-        ''', (question_id,))
-        row = cursor.fetchone()
+    @staticmethod
+    def get_correct_option_ids(question_ids):
+        """Get {question_id: correct_option_id} for several questions in one query"""
+        return {
+            question_id: option.id
+            for question_id, options in Option.get_by_questions(question_ids).items()
+            for option in options if option.is_correct
+        }
 
-        if row:
-            return Option(
-                id=row['id'],
-                question_id=row['question_id'],
-                option_text=row['option_text'],
-                is_correct=bool(row['is_correct']),
-                created_at=row['created_at']
-            )
-        return None
+    @staticmethod
+    def get_key_rows():
+        """Get (id, question_id, is_correct) of every option as plain tuples, ordered by id"""
+        cursor = db.get_connection().cursor()
+        cursor.row_factory = None
+        cursor.execute('SELECT id, question_id, is_correct FROM options ORDER BY id')
+        return cursor.fetchall()
 
     @staticmethod
     def update(option_id, option_text=None, is_correct=None):
-        """Update option"""
+        """Update option (None leaves a field unchanged)"""
+        if option_text is None and is_correct is None:
+            return False
+
         conn = db.get_connection()
         cursor = conn.cursor()
 
-        updates = []
-        params = []
-
-        if option_text is not None:
-            updates.append('option_text = ?')
-            params.append(option_text)
-        if is_correct is not None:
-            updates.append('is_correct = ?')
-            params.append(is_correct)
-
-        if updates:
-            params.append(option_id)
-            query = f"UPDATE options SET {', '.join(updates)} WHERE id = ?"
-            cursor.execute(query, params)
-            conn.commit()
-            return cursor.rowcount > 0
-        return False
+        question_id = Option._question_id_of(cursor, option_id)
+        cursor.execute('''
+            UPDATE options
+            SET option_text = COALESCE(?, option_text),
+                is_correct = COALESCE(?, is_correct)
+            WHERE id = ?
+        ''', (option_text, is_correct, option_id))
+        conn.commit()
+        db.bump_data_version()
+        option_cache.invalidate(question_id)
+        answer_key.refresh(question_id)
+        return cursor.rowcount > 0
 
     @staticmethod
     def delete(option_id):
@@ -114,8 +139,12 @@ class Option:
         conn = db.get_connection()
         cursor = conn.cursor()
 
+        question_id = Option._question_id_of(cursor, option_id)
         cursor.execute('DELETE FROM options WHERE id = ?', (option_id,))
         conn.commit()
+        db.bump_data_version()
+        option_cache.invalidate(question_id)
+        answer_key.refresh(question_id)
         return cursor.rowcount > 0
 
     @staticmethod
@@ -126,4 +155,14 @@ class Option:
 
         cursor.execute('DELETE FROM options WHERE question_id = ?', (question_id,))
         conn.commit()
+        db.bump_data_version()
+        option_cache.invalidate(question_id)
+        answer_key.refresh(question_id)
         return cursor.rowcount > 0
+
+    @staticmethod
+    def _question_id_of(cursor, option_id):
+        """Question owning an option (None if it does not exist), for cache invalidation"""
+        cursor.execute('SELECT question_id FROM options WHERE id = ?', (option_id,))
+        row = cursor.fetchone()
+        return row['question_id'] if row else None
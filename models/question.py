@@ -1,9 +1,21 @@
 """Question model"""
-from database.connection import db
+import re
+from database.connection import db, fold_diacritics, in_placeholders
+from models.base import Record
+from models.question_sampler import question_sampler
+from models.record_cache import RecordCache
+from models.option import option_cache
+from models.answer_key import answer_key
+from config import DB_FETCH_BATCH_SIZE, QUESTION_CACHE_SIZE
 
+# Recently used questions by id
+question_cache = RecordCache(QUESTION_CACHE_SIZE)
+db.add_reset_listener(question_cache.clear)
 
-class Question:
+
+class Question(Record):
     """Question model for quiz app"""
+    __slots__ = ('id', 'question_text', 'difficulty', 'category', 'created_at')
 
     def __init__(self, id=None, question_text='', difficulty=1, category='', created_at=None):
         self.id = id
@@ -24,26 +36,94 @@ class Question:
         ''', (question_text, difficulty, category))
 
         conn.commit()
+        db.bump_data_version()
+        option_cache.invalidate(cursor.lastrowid)
+        question_sampler.add(cursor.lastrowid, difficulty, category)
         return cursor.lastrowid
 
     @staticmethod
-    def get_by_id(question_id):
-        """Get question by ID"""
+    def bulk_create(records):
+        """Insert many questions with their options in one transaction
+
+        records: list of tuples [(question_text, difficulty, category, options_data), ...]
+        where options_data is [(option_text, is_correct), ...] (validated by the caller).
+        Returns the new question ids in the order of records.
+        """
+        if not records:
+            return []
+
         conn = db.get_connection()
         cursor = conn.cursor()
 
-        cursor.execute('SELECT * FROM questions WHERE id = ?', (question_id,))
-        row = cursor.fetchone()
+        try:
+            # Take the write lock up front so the ids reserved below stay ours
+            cursor.execute('BEGIN IMMEDIATE')
+            cursor.execute('''
+                SELECT MAX(COALESCE((SELECT MAX(id) FROM questions), 0),
+                           COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'questions'), 0))
+            ''')
+            first_id = cursor.fetchone()[0] + 1
+            question_ids = list(range(first_id, first_id + len(records)))
+
+            # Options go in first (foreign keys are checked at commit) so the
+            # search index trigger on questions sees every option text at once
+            # instead of re-indexing the question once per option
+            cursor.execute('PRAGMA defer_foreign_keys = ON')
+            cursor.executemany('''
+                INSERT INTO options (question_id, option_text, is_correct)
+                VALUES (?, ?, ?)
+            ''', [(question_id, option_text, bool(is_correct))
+                  for question_id, (_, _, _, options_data) in zip(question_ids, records)
+                  for option_text, is_correct in options_data])
+            cursor.executemany('''
+                INSERT INTO questions (id, question_text, difficulty, category)
+                VALUES (?, ?, ?, ?)
+            ''', [(question_id, question_text, difficulty, category)
+                  for question_id, (question_text, difficulty, category, _) in zip(question_ids, records)])
 
-        if row:
-            return Question(
-                id=row['id'],
-                question_text=row['question_text'],
-                difficulty=row['difficulty'],
-                category=row['category'],
-                created_at=row['created_at']
-            )
-        return None
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+        db.bump_data_version()
+        option_cache.invalidate(*question_ids)
+        answer_key.refresh(*question_ids)
+        for question_id, (_, difficulty, category, _) in zip(question_ids, records):
+            question_sampler.add(question_id, difficulty, category)
+        return question_ids
+
+    @staticmethod
+    def get_by_id(question_id):
+        """Get question by ID (served from question_cache when possible)"""
+        question = question_cache.get(question_id)
+        if question is None:
+            version = question_cache.version
+            conn = db.get_connection()
+            cursor = conn.cursor()
+
+            cursor.execute('SELECT * FROM questions WHERE id = ?', (question_id,))
+            question = Question.fetch_one(cursor)
+            question_cache.put(question_id, question, version)
+        return question
+
+    @staticmethod
+    def get_by_ids(question_ids):
+        """Get questions by primary key, preserving the order of question_ids"""
+        question_ids = list(question_ids)
+        by_id, missing = question_cache.get_many(question_ids)
+        if missing:
+            version = question_cache.version
+            conn = db.get_connection()
+            cursor = conn.cursor()
+
+            placeholders, params = in_placeholders(missing)
+            cursor.execute(f'SELECT * FROM questions WHERE id IN ({placeholders})', params)
+
+            fetched = Question.fetch_all(cursor)
+            question_cache.put_many(((question.id, question) for question in fetched), version)
+            by_id.update((question.id, question) for question in fetched)
+        return [by_id[question_id] for question_id in question_ids if question_id in by_id]
 
     @staticmethod
     def get_all():
@@ -52,15 +132,55 @@ class Question:
         cursor = conn.cursor()
 
         cursor.execute('SELECT * FROM questions ORDER BY id ASC')
-        rows = cursor.fetchall()
+        return Question.fetch_all(cursor)
+
+    @staticmethod
+    def get_page(offset=0, limit=50, difficulty=None):
+        """Get one page of questions ordered by id, optionally filtered by difficulty"""
+        conn = db.get_connection()
+        cursor = conn.cursor()
+
+        if difficulty:
+            cursor.execute('''
+                SELECT * FROM questions WHERE difficulty = ?
+                ORDER BY id LIMIT ? OFFSET ?
+            ''', (difficulty, limit, offset))
+        else:
+            cursor.execute('SELECT * FROM questions ORDER BY id LIMIT ? OFFSET ?', (limit, offset))
+        return Question.fetch_all(cursor)
 
-        return [Question(
-            id=row['id'],
-            question_text=row['question_text'],
-            difficulty=row['difficulty'],
-            category=row['category'],
-            created_at=row['created_at']
-        ) for row in rows]
+    @staticmethod
+    def get_page_after(after_id=None, limit=50, difficulty=None):
+        """Get the questions following after_id in id order (keyset pagination)
+
+        Unlike get_page, the cost does not grow with the position in the table;
+        pass the id of the last question of the previous page (None for the first page).
+        """
+        conn = db.get_connection()
+        cursor = conn.cursor()
+
+        conditions = ['id > ?']
+        params = [after_id or 0]
+        if difficulty:
+            conditions.append('difficulty = ?')
+            params.append(difficulty)
+        params.append(limit)
+        cursor.execute(f'''
+            SELECT * FROM questions WHERE {' AND '.join(conditions)}
+            ORDER BY id LIMIT ?
+        ''', params)
+
+        return Question.fetch_all(cursor)
+
+    @staticmethod
+    def iter_all(difficulty=None, batch_size=DB_FETCH_BATCH_SIZE):
+        """Stream questions in id order without loading the whole table"""
+        cursor = db.get_connection().cursor()
+        if difficulty:
+            cursor.execute('SELECT * FROM questions WHERE difficulty = ? ORDER BY id', (difficulty,))
+        else:
+            cursor.execute('SELECT * FROM questions ORDER BY id')
+        yield from Question.iter_fetch(cursor, batch_size)
 
     @staticmethod
     def get_by_difficulty(difficulty):
@@ -69,15 +189,7 @@ class Question:
         cursor = conn.cursor()
 
         cursor.execute('SELECT * FROM questions WHERE difficulty = ?', (difficulty,))
-        rows = cursor.fetchall()
-
-        return [Question(
-            id=row['id'],
-            question_text=row['question_text'],
-            difficulty=row['difficulty'],
-            category=row['category'],
-            created_at=row['created_at']
-        ) for row in rows]
+        return Question.fetch_all(cursor)
 
     @staticmethod
     def get_by_category(category):
@@ -86,134 +198,161 @@ class Question:
         cursor = conn.cursor()
 
         cursor.execute('SELECT * FROM questions WHERE category = ?', (category,))
-        rows = cursor.fetchall()
-
-        return [Question(
-            id=row['id'],
-            question_text=row['question_text'],
-            difficulty=row['difficulty'],
-            category=row['category'],
-            created_at=row['created_at']
-        ) for row in rows]
+        return Question.fetch_all(cursor)
 
     @staticmethod
-    def update(question_id, question_text=None, difficulty=None, category=None):
-        """Update question"""
+    def search(keyword=None, difficulty=None, category=None):
+        """Search questions with the full-text index, best matches first
+
+        The keyword is matched against question and option texts, ignoring
+        Vietnamese diacritics; each word also matches as a prefix.
+        """
         conn = db.get_connection()
         cursor = conn.cursor()
 
-        updates = []
+        conditions = []
         params = []
+        tokens = re.findall(r'\w+', fold_diacritics(keyword)) if keyword else []
+
+        if tokens:
+            query = '''
+                SELECT q.* FROM questions_fts
+                INNER JOIN questions q ON q.id = questions_fts.rowid
+            '''
+            conditions.append('questions_fts MATCH ?')
+            params.append(' '.join(f'"{token}"*' for token in tokens))
+            order_by = 'bm25(questions_fts), q.id'
+        else:
+            query = 'SELECT q.* FROM questions q'
+            order_by = 'q.id'
+            if keyword:
+                # Punctuation-only keywords cannot be tokenized; fall back to a substring match
+                conditions.append('q.question_text LIKE ?')
+                params.append(f'%{keyword}%')
 
-        if question_text is not None:
-            updates.append('question_text = ?')
-            params.append(question_text)
-        if difficulty is not None:
-            updates.append('difficulty = ?')
+        if difficulty:
+            conditions.append('q.difficulty = ?')
             params.append(difficulty)
-        if category is not None:
-            updates.append('category = ?')
+        if category:
+            conditions.append('q.category = ?')
             params.append(category)
 
-        if updates:
-            params.append(question_id)
-            query = f"UPDATE questions SET {', '.join(updates)} WHERE id = ?"
-            cursor.execute(query, params)
-            conn.commit()
-            return cursor.rowcount > 0
-        return False
+        if conditions:
+            query += ' WHERE ' + ' AND '.join(conditions)
+        cursor.execute(f'{query} ORDER BY {order_by}', params)
+
+        return Question.fetch_all(cursor)
 
     @staticmethod
-    def delete(question_id):
-        """Delete question"""
+    def update(question_id, question_text=None, difficulty=None, category=None):
+        """Update question (None leaves a field unchanged)"""
+        if question_text is None and difficulty is None and category is None:
+            return False
+
         conn = db.get_connection()
         cursor = conn.cursor()
 
-        cursor.execute('DELETE FROM questions WHERE id = ?', (question_id,))
+        # One fixed statement for every combination of fields, so it stays prepared
+        cursor.execute('''
+            UPDATE questions
+            SET question_text = COALESCE(?, question_text),
+                difficulty = COALESCE(?, difficulty),
+                category = COALESCE(?, category)
+            WHERE id = ?
+        ''', (question_text, difficulty, category, question_id))
         conn.commit()
+        db.bump_data_version()
+        question_cache.invalidate(question_id)
+        if difficulty is not None or category is not None:
+            question_sampler.invalidate()
         return cursor.rowcount > 0
 
     @staticmethod
-    def count():
-        """Count total questions"""
+    def delete(question_id):
+        """Delete question"""
         conn = db.get_connection()
         cursor = conn.cursor()
 
-        cursor.execute('SELECT COUNT(*) as count FROM questions')
-        return cursor.fetchone()['count']
+        cursor.execute('DELETE FROM questions WHERE id = ?', (question_id,))
+        conn.commit()
+        db.bump_data_version()
+        question_cache.invalidate(question_id)
+        option_cache.invalidate(question_id)
+        answer_key.refresh(question_id)
+        question_sampler.invalidate()
+        return cursor.rowcount > 0
 
     @staticmethod
-    def get_random_questions(count, difficulty=None):
-        """Get random questions, optionally filtered by difficulty"""
+    def count(difficulty=None):
+        """Count total questions, optionally only those of one difficulty"""
         conn = db.get_connection()
         cursor = conn.cursor()
 
         if difficulty:
-            cursor.execute('''
-                SELECT * FROM questions 
-                WHERE difficulty = ?
-                ORDER BY RANDOM() 
-                LIMIT ?
-            ''', (difficulty, count))
+            cursor.execute('SELECT COUNT(*) as count FROM questions WHERE difficulty = ?', (difficulty,))
         else:
-            cursor.execute('''
-                SELECT * FROM questions 
-                ORDER BY RANDOM() 
-                LIMIT ?
-            ''', (count,))
+            cursor.execute('SELECT COUNT(*) as count FROM questions')
+        return cursor.fetchone()['count']
 
-        rows = cursor.fetchall()
+    @staticmethod
+    def get_random_questions(count, difficulty=None, category=None):
+        """Get random questions, optionally filtered by difficulty and category
+
+        Ids are drawn from the in-memory sampler pools, then only the sampled
+        rows are fetched by primary key.
+        """
+        question_ids = question_sampler.sample(count, difficulty or None, category or None)
+        return Question.get_by_ids(question_ids)
 
-        return [Question(
-            id=row['id'],
-            question_text=row['question_text'],
-            difficulty=row['difficulty'],
-            category=row['category'],
-            created_at=row['created_at']
-        ) for row in rows]
     @staticmethod
     def get_statistics(question_id):
         """Get statistics for a specific question (moved from Controller)"""
-        conn = db.get_connection()
-        cursor = conn.cursor()
+        return Question.get_statistics_bulk([question_id])[question_id]
 
-        # 1. Total times answered
-        cursor.execute('''
-            SELECT COUNT(*) as total_answers
-            FROM attempt_answers
-            WHERE question_id = ?
-        ''', (question_id,))
-        total_answers = cursor.fetchone()['total_answers']
+    @staticmethod
+    def get_statistics_bulk(question_ids):
+        """Get statistics for several questions from the precomputed counters in one query"""
+        question_ids = list(question_ids)
+        result = {question_id: {
+            'total_answers': 0,
+            'correct_count': 0,
+            'correct_rate': 0,
+            'option_distribution': []
+        } for question_id in question_ids}
+        if not question_ids:
+            return result
 
-        # 2. Correct answer rate
-        cursor.execute('''
-            SELECT COUNT(*) as correct_count
-            FROM attempt_answers
-            WHERE question_id = ? AND is_correct = 1
-        ''', (question_id,))
-        correct_count = cursor.fetchone()['correct_count']
+        conn = db.get_connection()
+        cursor = conn.cursor()
 
-        # 3. Option selection distribution
-        cursor.execute('''
-            SELECT 
+        placeholders, params = in_placeholders(question_ids)
+        cursor.execute(f'''
+            SELECT
+                q.id as question_id,
+                COALESCE(qs.total_answers, 0) as total_answers,
+                COALESCE(qs.correct_count, 0) as correct_count,
                 o.id,
                 o.option_text,
                 o.is_correct,
-                COUNT(aa.id) as selection_count
-            FROM options o
-            LEFT JOIN attempt_answers aa ON o.id = aa.selected_option_id
-            WHERE o.question_id = ?
-            GROUP BY o.id
-        ''', (question_id,))
-        option_stats = cursor.fetchall()
-
-        # Trả về dictionary dữ liệu đã xử lý
-        return {
-            'total_answers': total_answers,
-            'correct_count': correct_count,
-            'correct_rate': (correct_count / total_answers * 100) if total_answers > 0 else 0,
-            'option_distribution': option_stats
-        }
+                COALESCE(os.selection_count, 0) as selection_count
+            FROM questions q
+            LEFT JOIN question_stats qs ON qs.question_id = q.id
+            LEFT JOIN options o ON o.question_id = q.id
+            LEFT JOIN option_stats os ON os.option_id = o.id
+            WHERE q.id IN ({placeholders})
+            ORDER BY q.id, o.id
+        ''', params)
+
+        for row in cursor.fetchall():
+            stats = result[row['question_id']]
+            total_answers = row['total_answers']
+            stats['total_answers'] = total_answers
+            stats['correct_count'] = row['correct_count']
+            stats['correct_rate'] = (row['correct_count'] / total_answers * 100) if total_answers > 0 else 0
+            if row['id'] is not None:
+                stats['option_distribution'].append(row)
+
+        return result
 
     @staticmethod
     def analyze_difficulty():
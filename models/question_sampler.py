@@ -0,0 +1,77 @@
+"""In-memory question id pools for random sampling"""
+import random
+import threading
+from database.connection import db
+from config import QUESTION_SAMPLER_SEED
+
+
+class QuestionSampler:
+    """Keeps question ids grouped by difficulty and category and draws random samples
+
+    Pools are keyed by (difficulty, category) where None means "any", so a draw
+    only touches the ids it returns instead of sorting the whole table.
+    """
+
+    def __init__(self, seed=None):
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._pools = None
+
+    def seed(self, seed=None):
+        """Reseed the random generator (useful for deterministic tests)"""
+        with self._lock:
+            self._random.seed(seed)
+
+    def invalidate(self):
+        """Drop the pools; they are reloaded on the next draw"""
+        with self._lock:
+            self._pools = None
+
+    def add(self, question_id, difficulty, category):
+        """Register a newly created question in the loaded pools"""
+        with self._lock:
+            if self._pools is not None:
+                self._add_to_pools(self._pools, question_id, difficulty, category)
+
+    def sample(self, count, difficulty=None, category=None):
+        """Draw up to `count` distinct question ids from the matching pool"""
+        with self._lock:
+            if self._pools is None:
+                self._pools = self._load_pools()
+            pool = self._pools.get((difficulty, category), [])
+            return self._random.sample(pool, min(count, len(pool)))
+
+    def pool_size(self, difficulty=None, category=None):
+        """Number of questions available for the given filters"""
+        with self._lock:
+            if self._pools is None:
+                self._pools = self._load_pools()
+            return len(self._pools.get((difficulty, category), []))
+
+    def snapshot(self, keys):
+        """Copies of the pools for the given (difficulty, category) keys, for drawing many samples"""
+        with self._lock:
+            if self._pools is None:
+                self._pools = self._load_pools()
+            return {key: list(self._pools.get(key, ())) for key in keys}
+
+    @staticmethod
+    def _add_to_pools(pools, question_id, difficulty, category):
+        for key in ((None, None), (difficulty, None), (None, category), (difficulty, category)):
+            pools.setdefault(key, []).append(question_id)
+
+    def _load_pools(self):
+        conn = db.get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute('SELECT id, difficulty, category FROM questions ORDER BY id')
+
+        pools = {}
+        for row in cursor.fetchall():
+            self._add_to_pools(pools, row['id'], row['difficulty'], row['category'])
+        return pools
+
+
+# Create global sampler instance
+question_sampler = QuestionSampler(QUESTION_SAMPLER_SEED)
+db.add_reset_listener(question_sampler.invalidate)
@@ -1,10 +1,13 @@
 """Quiz model"""
 import sqlite3
 from database.connection import db
+from models.base import Record
+from config import DB_FETCH_BATCH_SIZE
 
 
-class Quiz:
+class Quiz(Record):
     """Quiz model"""
+    __slots__ = ('id', 'title', 'description', 'time_limit', 'total_questions', 'created_at')
 
     def __init__(self, id=None, title='', description='', time_limit=600, 
                  total_questions=0, created_at=None):
@@ -27,6 +30,7 @@ class Quiz:
                 VALUES (?, ?, ?, ?)
             ''', (title, description, time_limit, total_questions))
             conn.commit()
+            db.bump_data_version()
             return cursor.lastrowid
         except sqlite3.IntegrityError:
             # Title already exists, return existing quiz ID
@@ -41,18 +45,7 @@ class Quiz:
         cursor = conn.cursor()
 
         cursor.execute('SELECT * FROM quizzes WHERE id = ?', (quiz_id,))
-        row = cursor.fetchone()
-
-        if row:
-            return Quiz(
-                id=row['id'],
-                title=row['title'],
-                description=row['description'],
-                time_limit=row['time_limit'],
-                total_questions=row['total_questions'],
-                created_at=row['created_at']
-            )
-        return None
+        return Quiz.fetch_one(cursor)
 
     @staticmethod
     def get_by_title(title):
@@ -61,18 +54,7 @@ class Quiz:
         cursor = conn.cursor()
 
         cursor.execute('SELECT * FROM quizzes WHERE title = ?', (title,))
-        row = cursor.fetchone()
-
-        if row:
-            return Quiz(
-                id=row['id'],
-                title=row['title'],
-                description=row['description'],
-                time_limit=row['time_limit'],
-                total_questions=row['total_questions'],
-                created_at=row['created_at']
-            )
-        return None
+        return Quiz.fetch_one(cursor)
 
     @staticmethod
     def get_all():
@@ -80,47 +62,66 @@ class Quiz:
         conn = db.get_connection()
         cursor = conn.cursor()
 
-        cursor.execute('SELECT * FROM quizzes ORDER BY created_at DESC')
-        rows = cursor.fetchall()
+        cursor.execute('SELECT * FROM quizzes ORDER BY created_at DESC, id DESC')
+        return Quiz.fetch_all(cursor)
 
-        return [Quiz(
-            id=row['id'],
-            title=row['title'],
-            description=row['description'],
-            time_limit=row['time_limit'],
-            total_questions=row['total_questions'],
-            created_at=row['created_at']
-        ) for row in rows]
+    @staticmethod
+    def get_page(before=None, limit=50):
+        """Get one page of quizzes, newest first (keyset pagination)
+
+        before: (created_at, id) of the last quiz of the previous page, None for the first page
+        """
+        conn = db.get_connection()
+        cursor = conn.cursor()
+
+        if before is None:
+            cursor.execute('''
+                SELECT * FROM quizzes
+                ORDER BY created_at DESC, id DESC
+                LIMIT ?
+            ''', (limit,))
+        else:
+            cursor.execute('''
+                SELECT * FROM quizzes
+                WHERE (created_at, id) < (?, ?)
+                ORDER BY created_at DESC, id DESC
+                LIMIT ?
+            ''', (before[0], before[1], limit))
+
+        return Quiz.fetch_all(cursor)
+
+    @staticmethod
+    def iter_all(batch_size=DB_FETCH_BATCH_SIZE):
+        """Stream quizzes, newest first, without loading them all"""
+        cursor = db.get_connection().cursor()
+        cursor.execute('SELECT * FROM quizzes ORDER BY created_at DESC, id DESC')
+        yield from Quiz.iter_fetch(cursor, batch_size)
+
+    @staticmethod
+    def page_key(quiz):
+        """Keyset position of a quiz, passed as `before` to get the next page"""
+        return (quiz.created_at, quiz.id)
 
     @staticmethod
     def update(quiz_id, title=None, description=None, time_limit=None, total_questions=None):
-        """Update quiz"""
+        """Update quiz (None leaves a field unchanged)"""
+        if title is None and description is None and time_limit is None and total_questions is None:
+            return False
+
         conn = db.get_connection()
         cursor = conn.cursor()
 
-        updates = []
-        params = []
-
-        if title is not None:
-            updates.append('title = ?')
-            params.append(title)
-        if description is not None:
-            updates.append('description = ?')
-            params.append(description)
-        if time_limit is not None:
-            updates.append('time_limit = ?')
-            params.append(time_limit)
-        if total_questions is not None:
-            updates.append('total_questions = ?')
-            params.append(total_questions)
-
-        if updates:
-            params.append(quiz_id)
-            query = f"UPDATE quizzes SET {', '.join(updates)} WHERE id = ?"
-            cursor.execute(query, params)
-            conn.commit()
-            return cursor.rowcount > 0
-        return False
+        cursor.execute('''
+            UPDATE quizzes
+            SET title = COALESCE(?, title),
+                description = COALESCE(?, description),
+                time_limit = COALESCE(?, time_limit),
+                total_questions = COALESCE(?, total_questions)
+            WHERE id = ?
+        ''', (title, description, time_limit, total_questions, quiz_id))
+        conn.commit()
+        db.bump_data_version()
+        return cursor.rowcount > 0
 
     @staticmethod
     def delete(quiz_id):
@@ -130,6 +131,7 @@ class Quiz:
 
         cursor.execute('DELETE FROM quizzes WHERE id = ?', (quiz_id,))
         conn.commit()
+        db.bump_data_version()
         return cursor.rowcount > 0
 
     # Quiz questions are now generated randomly at attempt time
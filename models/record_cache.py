@@ -0,0 +1,95 @@
+"""Bounded in-memory LRU cache for model records"""
+import threading
+from collections import OrderedDict
+
+
+class RecordCache:
+    """Thread-safe LRU mapping of keys to records, with hit/miss counters
+
+    The cache lives in this process only: every write path of the cached model
+    invalidates the affected keys, and it is cleared when the database is reset
+    or switched. Writes made by another process are not seen until the entry is
+    evicted or the cache cleared.
+
+    Readers take `version` before querying the database and pass it to put():
+    if an invalidation happened in between, the possibly stale rows are not stored.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Cached value for key, or None (counted as a miss)"""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def get_many(self, keys):
+        """({key: value} of the cached keys, [keys not cached])"""
+        found = {}
+        missing = []
+        with self._lock:
+            for key in keys:
+                value = self._entries.get(key)
+                if value is None:
+                    missing.append(key)
+                else:
+                    self._entries.move_to_end(key)
+                    found[key] = value
+            self.hits += len(found)
+            self.misses += len(missing)
+        return found, missing
+
+    def put(self, key, value, version=None):
+        """Store a value (None is never cached), evicting the least recently used entries"""
+        self.put_many([(key, value)], version)
+
+    def put_many(self, items, version=None):
+        """Store several (key, value) pairs read while the cache was at `version`"""
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            if version is not None and version != self.version:
+                return
+            for key, value in items:
+                if value is None:
+                    continue
+                self._entries[key] = value
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, *keys):
+        """Drop the given keys"""
+        with self._lock:
+            self.version += 1
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        """Drop every entry (counters are kept)"""
+        with self._lock:
+            self.version += 1
+            self._entries.clear()
+
+    def stats(self):
+        """Size and hit/miss counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
@@ -0,0 +1,372 @@
+"""Headless HTTP exam server sharing the quiz controllers
+
+Serves JSON over plain HTTP/1.1 with asyncio so one machine can run a whole
+exam room. Database work runs in a thread pool (one SQLite connection per
+worker thread), the event loop only parses requests and keeps exam sessions.
+
+Each attempt has a monotonic deadline (the quiz time limit): answers sent
+after it are rejected and the attempt is completed automatically when it
+passes, so a client cannot extend its exam by never calling /complete.
+A finished attempt stays in memory for its review for SERVER_REVIEW_WINDOW
+seconds and is then forgotten.
+
+Usage:
+    python server.py [--host HOST] [--port PORT] [--workers N]
+
+Endpoints:
+    GET  /quizzes                      list quizzes
+    POST /attempts                     {"quiz_id", "student_name"} -> start an attempt
+                                       ("missing": questions the bank could not supply)
+    GET  /attempts/<id>/questions      questions of the attempt (no answer key)
+    POST /attempts/<id>/answers        {"answers": {"<question_id>": <option_id or null>}}
+    POST /attempts/<id>/complete       grade and save all answers, return the score
+                                       (done automatically at the deadline)
+    GET  /attempts/<id>/review         detailed review of a completed attempt
+"""
+import argparse
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import urlsplit
+from database.connection import db
+from controllers.quiz_controller import QuizController
+from models.quiz import Quiz
+from models.answer_key import answer_key
+from utils.exam_timer import ExamTimer
+from config import (SERVER_HOST, SERVER_PORT, SERVER_WORKERS, SERVER_MAX_BODY_SIZE, SERVER_REVIEW_WINDOW,
+                    EXAM_DEADLINE_GRACE)
+
+DEFAULT_DIFFICULTY_MATRIX = {'easy': 10, 'medium': 10, 'hard': 10}
+
+
+class HTTPError(Exception):
+    """Error returned to the client as a JSON body"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class ExamSession:
+    """In-memory state of one running attempt"""
+
+    def __init__(self, attempt_id, quiz, quiz_data, clock=time.monotonic):
+        self.attempt_id = attempt_id
+        self.quiz = quiz
+        self.questions = [serialize_question(item) for item in quiz_data['questions']]
+        self.question_ids = {item['id'] for item in self.questions}
+        self.missing = quiz_data['missing']  # questions the bank could not supply
+        self.answers = {}
+        self.timer = ExamTimer(quiz.time_limit, clock)
+        self.deadline_handle = None
+        self.expiry_task = None
+        self.cleanup_handle = None
+        self.result = None
+        self.completing = False
+
+
+def serialize_question(item):
+    """Question with its options, without revealing the correct answer"""
+    question = item['question']
+    return {
+        'id': question.id,
+        'question_text': question.question_text,
+        'difficulty': question.difficulty,
+        'category': question.category,
+        'options': [{'id': option.id, 'option_text': option.option_text}
+                    for option in item['options']]
+    }
+
+
+def serialize_review(review):
+    """Attempt review as JSON-compatible data"""
+    attempt = review['attempt']
+    return {
+        'attempt': {
+            'id': attempt.id,
+            'quiz_id': attempt.quiz_id,
+            'student_name': attempt.student_name,
+            'score': attempt.score,
+            'correct_answers': attempt.correct_answers,
+            'total_questions': attempt.total_questions,
+            'time_taken': attempt.time_taken,
+            'completed_at': str(attempt.completed_at) if attempt.completed_at else None
+        },
+        'answers': [{
+            'question_id': answer['question'].id,
+            'question_text': answer['question'].question_text,
+            'options': [{'id': option.id, 'option_text': option.option_text}
+                        for option in answer['all_options']],
+            'selected_option_id': answer['selected_option_id'],
+            'correct_option_id': answer['correct_option_id'],
+            'is_correct': bool(answer['is_correct'])
+        } for answer in review['answers']]
+    }
+
+
+class ExamServer:
+    """Routes JSON requests to QuizController, offloading database work to threads"""
+
+    def __init__(self, workers=SERVER_WORKERS, difficulty_matrix=None, clock=time.monotonic,
+                 deadline_grace=EXAM_DEADLINE_GRACE, review_window=SERVER_REVIEW_WINDOW):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='exam-db')
+        self.difficulty_matrix = difficulty_matrix or DEFAULT_DIFFICULTY_MATRIX
+        self.clock = clock
+        self.deadline_grace = deadline_grace
+        self.review_window = review_window
+        self.sessions = {}
+
+    async def run_db(self, func, *args):
+        """Run a blocking controller call in the database thread pool"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, func, *args)
+
+    def close(self):
+        """Stop the worker threads"""
+        self.executor.shutdown(wait=True)
+
+    async def handle_request(self, method, path, body=None):
+        """Dispatch one request; returns (status, payload)"""
+        try:
+            parts = [part for part in urlsplit(path).path.split('/') if part]
+
+            if parts == ['quizzes'] and method == 'GET':
+                return HTTPStatus.OK, await self.list_quizzes()
+            if parts == ['attempts'] and method == 'POST':
+                return HTTPStatus.CREATED, await self.start_attempt(body or {})
+            if len(parts) == 3 and parts[0] == 'attempts':
+                session = self.get_session(parts[1])
+                action = (method, parts[2])
+                if action == ('GET', 'questions'):
+                    return HTTPStatus.OK, {'attempt_id': session.attempt_id,
+                                           'remaining_seconds': session.timer.remaining_seconds(),
+                                           'questions': session.questions}
+                if action == ('POST', 'answers'):
+                    return HTTPStatus.OK, self.save_answers(session, body or {})
+                if action == ('POST', 'complete'):
+                    return HTTPStatus.OK, await self.complete_attempt(session)
+                if action == ('GET', 'review'):
+                    return HTTPStatus.OK, await self.review_attempt(session)
+            raise HTTPError(HTTPStatus.NOT_FOUND, 'Not found')
+        except HTTPError as e:
+            return e.status, {'error': e.message}
+        except Exception as e:
+            print(f"⚠️ {method} {path} failed: {e!r}")
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {'error': 'Internal server error'}
+
+    async def list_quizzes(self):
+        quizzes = await self.run_db(Quiz.get_all)
+        return {'quizzes': [{
+            'id': quiz.id,
+            'title': quiz.title,
+            'description': quiz.description,
+            'time_limit': quiz.time_limit,
+            'total_questions': quiz.total_questions
+        } for quiz in quizzes]}
+
+    async def start_attempt(self, body):
+        student_name = str(body.get('student_name', '')).strip()
+        if not student_name:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, 'student_name is required')
+
+        quiz = await self.run_db(Quiz.get_by_id, body.get('quiz_id'))
+        if not quiz:
+            raise HTTPError(HTTPStatus.NOT_FOUND, 'Quiz not found')
+
+        quiz_data = await self.run_db(QuizController.get_quiz_with_questions,
+                                      quiz.id, self.difficulty_matrix)
+        attempt_id = await self.run_db(QuizController.start_attempt, quiz.id, student_name)
+
+        session = ExamSession(attempt_id, quiz, quiz_data, self.clock)
+        self.sessions[attempt_id] = session
+        session.deadline_handle = asyncio.get_running_loop().call_later(
+            session.timer.remaining() + self.deadline_grace, self.expire_session, session)
+        return {'attempt_id': attempt_id, 'time_limit': quiz.time_limit,
+                'remaining_seconds': session.timer.remaining_seconds(),
+                'total_questions': len(session.questions), 'missing': session.missing}
+
+    def get_session(self, attempt_id):
+        try:
+            session = self.sessions.get(int(attempt_id))
+        except ValueError:
+            session = None
+        if session is None:
+            raise HTTPError(HTTPStatus.NOT_FOUND, 'Attempt not found')
+        return session
+
+    def save_answers(self, session, body):
+        """Record answers in memory; they are written to the database on completion"""
+        if session.result is not None or session.completing:
+            raise HTTPError(HTTPStatus.CONFLICT, 'Attempt already completed')
+        if session.timer.expired(self.deadline_grace):
+            raise HTTPError(HTTPStatus.CONFLICT, 'Time is up')
+
+        answers = body.get('answers')
+        if not isinstance(answers, dict):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, 'answers must be an object')
+
+        parsed = {}
+        for question_id, option_id in answers.items():
+            try:
+                question_id = int(question_id)
+                option_id = None if option_id is None else int(option_id)
+            except (TypeError, ValueError):
+                raise HTTPError(HTTPStatus.BAD_REQUEST, 'ids must be integers')
+            if question_id not in session.question_ids:
+                raise HTTPError(HTTPStatus.BAD_REQUEST, f'Question {question_id} is not part of this attempt')
+            parsed[question_id] = option_id
+
+        session.answers.update(parsed)
+        return {'attempt_id': session.attempt_id, 'answered': len(session.answers)}
+
+    async def complete_attempt(self, session):
+        if session.result is not None:
+            return session.result
+        if session.completing:
+            raise HTTPError(HTTPStatus.CONFLICT, 'Attempt is being completed')
+
+        session.completing = True
+        try:
+            answers = {question['id']: session.answers.get(question['id'])
+                       for question in session.questions}
+            time_taken = session.timer.elapsed_seconds()
+            result = await self.run_db(QuizController.submit_answers_bulk,
+                                       session.attempt_id, answers, time_taken)
+        finally:
+            session.completing = False
+
+        session.timer.stop()
+        if session.deadline_handle is not None:
+            session.deadline_handle.cancel()
+            session.deadline_handle = None
+        session.result = dict(result, attempt_id=session.attempt_id)
+        self.schedule_cleanup(session)
+        return session.result
+
+    def schedule_cleanup(self, session):
+        """Forget a finished session once its review window has passed"""
+        if session.cleanup_handle is None:
+            session.cleanup_handle = asyncio.get_running_loop().call_later(
+                self.review_window, self.sessions.pop, session.attempt_id, None)
+
+    def expire_session(self, session):
+        """Deadline callback: complete the attempt with the answers saved so far"""
+        session.deadline_handle = None
+        if session.result is None and not session.completing:
+            session.expiry_task = asyncio.ensure_future(self.complete_expired(session))
+
+    async def complete_expired(self, session):
+        try:
+            await self.complete_attempt(session)
+        except Exception as e:
+            print(f"⚠️ Could not complete expired attempt {session.attempt_id}: {e}")
+            # The attempt stays incomplete in the database and is cleaned up as abandoned
+            self.schedule_cleanup(session)
+
+    async def review_attempt(self, session):
+        if session.result is None:
+            raise HTTPError(HTTPStatus.CONFLICT, 'Attempt is not completed yet')
+        review = await self.run_db(QuizController.get_attempt_review, session.attempt_id)
+        return serialize_review(review)
+
+    async def handle_connection(self, reader, writer):
+        """Serve HTTP/1.1 requests on one connection (keep-alive supported)"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+
+                try:
+                    method, path, _ = request_line.decode('latin-1').split(' ', 2)
+                except ValueError:
+                    await self.write_response(writer, HTTPStatus.BAD_REQUEST,
+                                              {'error': 'Malformed request line'}, False)
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                try:
+                    length = int(headers.get('content-length') or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    # The body cannot be framed, so the connection cannot be reused
+                    await self.write_response(writer, HTTPStatus.BAD_REQUEST,
+                                              {'error': 'Invalid Content-Length'}, False)
+                    break
+                if length > SERVER_MAX_BODY_SIZE:
+                    await self.write_response(writer, HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+                                              {'error': 'Request body too large'}, False)
+                    break
+
+                body = None
+                if length:
+                    try:
+                        body = json.loads(await reader.readexactly(length))
+                    except ValueError:
+                        await self.write_response(writer, HTTPStatus.BAD_REQUEST,
+                                                  {'error': 'Invalid JSON body'}, keep_alive)
+                        continue
+                    if not isinstance(body, dict):
+                        body = None
+
+                status, payload = await self.handle_request(method.upper(), path, body)
+                await self.write_response(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def write_response(writer, status, payload, keep_alive):
+        data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        head = (f'HTTP/1.1 {status.value} {status.phrase}\r\n'
+                'Content-Type: application/json; charset=utf-8\r\n'
+                f'Content-Length: {len(data)}\r\n'
+                f'Connection: {"keep-alive" if keep_alive else "close"}\r\n\r\n')
+        writer.write(head.encode('latin-1') + data)
+        await writer.drain()
+
+    async def serve(self, host=SERVER_HOST, port=SERVER_PORT):
+        """Start listening and serve until cancelled"""
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        async with server:
+            await server.serve_forever()
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description='Headless quiz exam server')
+    parser.add_argument('--host', default=SERVER_HOST)
+    parser.add_argument('--port', type=int, default=SERVER_PORT)
+    parser.add_argument('--workers', type=int, default=SERVER_WORKERS)
+    args = parser.parse_args()
+
+    db.initialize_database()
+    answer_key.load()
+    exam_server = ExamServer(workers=args.workers)
+    print(f"🚀 Exam server listening on http://{args.host}:{args.port}")
+    try:
+        asyncio.run(exam_server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        exam_server.close()
+        db.close_all_connections()
+
+
+if __name__ == '__main__':
+    main()
@@ -2,17 +2,33 @@
 import pytest
 import sys
 import os
+import sqlite3
+import threading
+import time
+import asyncio
+import json
 
 # Add parent directory to path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from database.connection import db
-from models.question import Question
-from models.option import Option
+from models.question import Question, question_cache
+from models.option import Option, option_cache
+from models.record_cache import RecordCache
 from models.quiz import Quiz
 from models.attempt import Attempt
+from models.question_sampler import question_sampler
 from controllers.quiz_controller import QuizController
 from controllers.question_bank_controller import QuestionBankController
+from server import ExamServer
+from utils.task_executor import TaskExecutor
+from utils.exam_timer import ExamTimer
+from utils.check_query_plans import check_model_queries
+from utils.recalibrate_difficulty import recalibrate, suggest_difficulty
+from models.difficulty_proposal import DifficultyProposal
+from models.exam_generator import exam_generator, difficulty_quotas, fallback_chain
+from models.answer_key import answer_key
+from database.connection import in_placeholders
 
 
 @pytest.fixture(scope='function')
@@ -24,6 +40,129 @@ def setup_database():
     db.reset_database()
 
 
+class TestDatabase:
+    """Tests for the database connection handler"""
+
+    def test_connection_pragmas(self, setup_database):
+        """Test that connections are opened in WAL mode with the tuned pragmas"""
+        conn = db.get_connection()
+        assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+        assert conn.execute('PRAGMA foreign_keys').fetchone()[0] == 1
+        assert conn.execute('PRAGMA synchronous').fetchone()[0] == 1  # NORMAL
+        assert conn.execute('PRAGMA temp_store').fetchone()[0] == 2  # MEMORY
+
+    def test_connection_per_thread(self, setup_database):
+        """Test that worker threads get their own connection and can read"""
+        Question.create("Shared question", 1, "Test")
+        result = {}
+
+        def worker():
+            result['connection'] = db.get_connection()
+            result['count'] = Question.count()
+            db.close_connection()
+
+        thread = threading.Thread(target=worker)
+        thread.start()
+        thread.join()
+
+        assert result['connection'] is not db.get_connection()
+        assert result['count'] == 1
+
+    def test_instrumentation_records_statements_per_operation(self, setup_database):
+        """Test that instrumented statements are grouped by operation, shape and caller"""
+        question_id = Question.create("Instrumented question", 1, "Test")
+        Option.create(question_id, "A", True)
+
+        recorder = db.enable_instrumentation()
+        try:
+            with db.operation("load question"):
+                Question.get_by_id(question_id)
+                Option.get_by_question(question_id)
+            question_cache.clear()  # make the second lookup reach the database
+            with db.operation("load question"):
+                Question.get_by_id(question_id)
+        finally:
+            db.disable_instrumentation()
+
+        scope = recorder.report()["load question"]
+        assert scope['runs'] == 2
+        assert scope['statements'] == 3
+
+        by_shape = {query['sql']: query for query in scope['queries']}
+        query = by_shape['SELECT * FROM questions WHERE id = ?']
+        assert query['count'] == 2
+        assert list(query['callers'].values()) == [2]
+        assert 'get_by_id' in list(query['callers'])[0]
+
+        assert json.loads(recorder.to_json())["load question"]['statements'] == 3
+        assert 'load question' in recorder.format_top(limit=2)
+
+    def test_operation_is_noop_without_instrumentation(self, setup_database):
+        """Test that operation scopes cost nothing when instrumentation is off"""
+        assert db.recorder is None
+        with db.operation("anything"):
+            assert Question.count() == 0
+
+    def test_data_version_bumped_by_writes(self, setup_database):
+        """Test that completing attempts and editing questions invalidate cached results"""
+        version = db.data_version
+        question_id = Question.create("Versioned", 1, "Test")
+        option_id = Option.create(question_id, "A", True)
+        assert db.data_version > version
+
+        quiz_id = Quiz.create("Versioned quiz", "Desc", 300, 1)
+        attempt_id = QuizController.start_attempt(quiz_id, "Student")
+        version = db.data_version
+        Question.get_by_id(question_id)
+        Attempt.get_statistics(quiz_id)
+        assert db.data_version == version
+
+        QuizController.submit_answers_bulk(attempt_id, {question_id: option_id}, 30)
+        assert db.data_version > version
+        version = db.data_version
+        Question.update(question_id, question_text="Edited")
+        assert db.data_version > version
+
+        # Answers saved one at a time and abandoned attempts also change the answer counters
+        attempt_id = QuizController.start_attempt(quiz_id, "Abandoned")
+        version = db.data_version
+        QuizController.submit_answer(attempt_id, question_id, option_id)
+        assert db.data_version > version
+        conn = db.get_connection()
+        conn.execute("UPDATE attempts SET started_at = datetime('now', '-2 days') WHERE id = ?", (attempt_id,))
+        conn.commit()
+        version = db.data_version
+        assert Attempt.cleanup_abandoned_attempts() == 1
+        assert db.data_version > version
+
+    def test_query_plans_use_indexes(self, setup_database):
+        """Test that no registered model query scans a large table and every foreign key is indexed"""
+        assert check_model_queries() == []
+        # The checker ran on a scratch database; the test database is back in place
+        assert Question.count() == 0
+
+    def test_query_plan_regression_detected(self, setup_database):
+        """Test that dropping an index makes the plan check fail for the queries relying on it"""
+        drop_index = lambda: db.get_connection().execute('DROP INDEX idx_attempts_quiz_started')
+        problems = check_model_queries([
+            ('drop index', drop_index, ()),
+            ('Attempt.get_by_quiz', lambda: Attempt.get_by_quiz(1), ()),
+        ])
+
+        assert [problem['scope'] for problem in problems] == ['Attempt.get_by_quiz', 'schema']
+        assert 'SCAN attempts' in problems[0]['plan']
+        assert problems[1]['sql'] == 'attempts.quiz_id'
+
+    def test_in_placeholders_padded_to_fixed_sizes(self):
+        """Test that IN lists are padded with NULL so few statement texts cover every length"""
+        placeholders, params = in_placeholders([1, 2, 3])
+        assert placeholders.count('?') == 8
+        assert params == [1, 2, 3] + [None] * 5
+
+        assert in_placeholders(range(9))[0].count('?') == 16
+        assert len(in_placeholders(range(600))[1]) == 600
+
+
 class TestQuestionModel:
     """Tests for Question model"""
 
@@ -91,6 +230,105 @@ class TestQuestionModel:
         assert len(set(selections)) >= 1  # At minimum, we got results
 
 
+    def test_get_questions_by_ids_keeps_order(self, setup_database):
+        """Test fetching questions by id in the requested order"""
+        ids = [Question.create(f"Question {i}", 1, "Test") for i in range(3)]
+        questions = Question.get_by_ids([ids[2], ids[0], 9999])
+        assert [q.id for q in questions] == [ids[2], ids[0]]
+
+    def test_records_are_slotted_and_mapped_by_column_name(self, setup_database):
+        """Test that model objects have no __dict__ and map rows whatever the column order"""
+        question_id = Question.create("Slotted", 2, "Test")
+        Option.create(question_id, "A", 1)
+
+        question = Question.get_by_id(question_id)
+        assert not hasattr(question, '__dict__')
+        assert Option.get_by_question(question_id)[0].is_correct is True
+
+        cursor = db.get_connection().cursor()
+        cursor.execute('SELECT category, created_at, difficulty, question_text, id, 1 as extra FROM questions')
+        reordered = Question.fetch_one(cursor)
+        assert (reordered.id, reordered.question_text, reordered.difficulty) == (question_id, "Slotted", 2)
+
+        cursor.execute('SELECT id, question_text FROM questions')
+        with pytest.raises(ValueError):
+            Question.fetch_all(cursor)
+
+    def test_random_questions_are_seedable(self, setup_database):
+        """Test that the sampler gives reproducible draws for a fixed seed"""
+        for i in range(20):
+            Question.create(f"Question {i}", 1 + i % 3, "Test")
+
+        question_sampler.seed(42)
+        first = [q.id for q in Question.get_random_questions(5, 1)]
+        question_sampler.seed(42)
+        second = [q.id for q in Question.get_random_questions(5, 1)]
+
+        assert first == second
+        assert len(set(first)) == 5
+        question_sampler.seed(None)
+
+    def test_sampler_follows_question_changes(self, setup_database):
+        """Test that sampler pools are refreshed on create, update and delete"""
+        q1 = Question.create("Easy", 1, "Python")
+        assert question_sampler.pool_size(1) == 1
+
+        q2 = Question.create("Easy too", 1, "SQL")
+        assert question_sampler.pool_size(1) == 2
+        assert question_sampler.pool_size(1, "SQL") == 1
+
+        Question.update(q2, difficulty=3)
+        assert question_sampler.pool_size(1) == 1
+        assert question_sampler.pool_size(3, "SQL") == 1
+
+        Question.delete(q1)
+        assert question_sampler.pool_size(1) == 0
+        assert Question.get_random_questions(5, 1) == []
+
+
+    def test_statistics_counters(self, setup_database):
+        """Test that answer counters are maintained with the answers"""
+        q_id = Question.create("Counted", 1, "Test")
+        correct_id = Option.create(q_id, "Correct", True)
+        wrong_id = Option.create(q_id, "Wrong", False)
+        quiz_id = Quiz.create("Stats", "Desc", 300, 1)
+
+        for selected in (correct_id, wrong_id, correct_id, None):
+            attempt_id = QuizController.start_attempt(quiz_id, "Student")
+            QuizController.submit_answers_bulk(attempt_id, {q_id: selected}, 10)
+
+        stats = Question.get_statistics(q_id)
+        assert stats['total_answers'] == 4
+        assert stats['correct_count'] == 2
+        assert stats['correct_rate'] == 50
+        counts = {row['id']: row['selection_count'] for row in stats['option_distribution']}
+        assert counts == {correct_id: 2, wrong_id: 1}
+
+        # Deleting an attempt removes its answers from the counters
+        Attempt.delete(attempt_id - 1)
+        assert Question.get_statistics(q_id)['correct_count'] == 1
+
+    def test_rebuild_statistics(self, setup_database):
+        """Test rebuilding the counters from attempt_answers"""
+        q_id = Question.create("Rebuilt", 1, "Test")
+        correct_id = Option.create(q_id, "Correct", True)
+        Option.create(q_id, "Wrong", False)
+        quiz_id = Quiz.create("Stats", "Desc", 300, 1)
+        attempt_id = QuizController.start_attempt(quiz_id, "Student")
+        QuizController.submit_answers_bulk(attempt_id, {q_id: correct_id}, 10)
+
+        conn = db.get_connection()
+        conn.execute('DELETE FROM question_stats')
+        conn.execute('DELETE FROM option_stats')
+        conn.commit()
+        assert Question.get_statistics(q_id)['total_answers'] == 0
+
+        db.rebuild_question_stats()
+        stats = Question.get_statistics_bulk([q_id])[q_id]
+        assert stats['total_answers'] == 1
+        assert stats['correct_count'] == 1
+
+
 class TestOptionModel:
     """Tests for Option model"""
 
@@ -124,6 +362,77 @@ class TestOptionModel:
         assert correct_option.is_correct == True
         assert correct_option.option_text == "Correct"
 
+    def test_get_options_by_questions(self, setup_database):
+        """Test loading options for several questions at once"""
+        q1 = Question.create("Question 1", 1, "Test")
+        q2 = Question.create("Question 2", 1, "Test")
+        q3 = Question.create("No options", 1, "Test")
+        Option.create(q1, "A", True)
+        Option.create(q1, "B", False)
+        Option.create(q2, "C", True)
+
+        grouped = Option.get_by_questions([q1, q2, q3])
+        assert [o.option_text for o in grouped[q1]] == ["A", "B"]
+        assert [o.option_text for o in grouped[q2]] == ["C"]
+        assert grouped[q3] == []
+
+
+    def test_grading_reads_are_cached_until_a_write(self, setup_database):
+        """Test that repeated lookups skip the database and every write path invalidates them"""
+        question_id = Question.create("Cached", 1, "Test")
+        correct_id = Option.create(question_id, "A", True)
+        wrong_id = Option.create(question_id, "B", False)
+        Question.get_by_id(question_id)
+        Option.get_correct_option_ids([question_id])
+
+        before = option_cache.stats()
+        statements = []
+        conn = db.get_connection()
+        conn.set_trace_callback(statements.append)
+        try:
+            assert Question.get_by_id(question_id).question_text == "Cached"
+            assert Question.get_by_ids([question_id])[0].id == question_id
+            assert Option.get_correct_option(question_id).id == correct_id
+            assert Option.get_correct_option_ids([question_id]) == {question_id: correct_id}
+            options = Option.get_by_question(question_id)
+            options.reverse()  # callers get their own list
+            assert [o.id for o in Option.get_by_question(question_id)] == [correct_id, wrong_id]
+        finally:
+            conn.set_trace_callback(None)
+        assert statements == []
+        after = option_cache.stats()
+        assert after['misses'] == before['misses']
+        assert after['hits'] > before['hits']
+
+        Question.update(question_id, question_text="Edited")
+        assert Question.get_by_id(question_id).question_text == "Edited"
+        Option.update(correct_id, is_correct=False)
+        Option.update(wrong_id, is_correct=True)
+        assert Option.get_correct_option(question_id).id == wrong_id
+        Option.delete(wrong_id)
+        assert Option.get_correct_option(question_id) is None
+        QuestionBankController.update_question_with_options(question_id, options_data=[("C", True), ("D", False)])
+        assert [o.option_text for o in Option.get_by_question(question_id)] == ["C", "D"]
+        Question.delete(question_id)
+        assert Question.get_by_id(question_id) is None
+        assert Option.get_by_question(question_id) == []
+
+    def test_record_cache_lru_and_stats(self):
+        """Test eviction order, hit/miss counters and that reads racing an invalidation are not stored"""
+        cache = RecordCache(2)
+        cache.put(1, "one")
+        cache.put(2, "two")
+        assert cache.get(1) == "one"
+        cache.put(3, "three")  # evicts 2, the least recently used
+        assert cache.get(2) is None
+        assert cache.get_many([1, 3, 4]) == ({1: "one", 3: "three"}, [4])
+        assert cache.stats() == {'size': 2, 'maxsize': 2, 'hits': 3, 'misses': 2, 'hit_rate': 0.6}
+
+        version = cache.version
+        cache.invalidate(1)
+        cache.put(1, "stale", version)
+        assert cache.get(1) is None
+
 
 class TestQuizController:
     """Tests for Quiz Controller"""
@@ -171,6 +480,28 @@ class TestQuizController:
         quiz_data = QuizController.get_quiz_with_questions(quiz_id)
         assert len(quiz_data['questions']) == 6
 
+    def test_quiz_assembly_query_count(self, setup_database):
+        """Test that quiz assembly does not issue one query per question"""
+        for difficulty in (1, 2, 3):
+            for i in range(10):
+                q_id = Question.create(f"Q{difficulty}-{i}", difficulty, "Test")
+                Option.create(q_id, "A", True)
+                Option.create(q_id, "B", False)
+        quiz_id = Quiz.create("Count Quiz", "Desc", 300, 30)
+        question_sampler.pool_size()  # warm up sampler pools
+
+        statements = []
+        conn = db.get_connection()
+        conn.set_trace_callback(statements.append)
+        try:
+            quiz_data = QuizController.get_quiz_with_questions(quiz_id)
+        finally:
+            conn.set_trace_callback(None)
+
+        assert len(quiz_data['questions']) == 30
+        assert all(len(item['options']) == 2 for item in quiz_data['questions'])
+        assert len(statements) <= 5
+
     def test_submit_answer_correct(self, setup_database):
         """Test submitting a correct answer"""
         # Setup
@@ -237,6 +568,161 @@ class TestQuizController:
         assert result['score'] == 20  # 2 correct * 10 points
 
 
+    def test_submit_answers_bulk(self, setup_database):
+        """Test grading and completing an attempt in one call"""
+        questions = []
+        for i in range(3):
+            q_id = Question.create(f"Q{i}", 1, "Test")
+            correct_id = Option.create(q_id, "Correct", True)
+            wrong_id = Option.create(q_id, "Wrong", False)
+            questions.append((q_id, correct_id, wrong_id))
+
+        quiz_id = Quiz.create("Bulk", "Desc", 300, 3)
+        attempt_id = QuizController.start_attempt(quiz_id, "Student")
+
+        answers = {
+            questions[0][0]: questions[0][1],
+            questions[1][0]: questions[1][2],
+            questions[2][0]: None,
+        }
+        result = QuizController.submit_answers_bulk(attempt_id, answers, 90)
+
+        assert result == {'score': 3.3, 'correct': 1, 'total': 3}
+        saved = Attempt.get_answers(attempt_id)
+        assert len(saved) == 3
+        assert sum(1 for row in saved if row['is_correct']) == 1
+
+        attempt = Attempt.get_by_id(attempt_id)
+        assert attempt.correct_answers == 1
+        assert attempt.time_taken == 90
+        assert attempt.completed_at is not None
+
+    def test_quiz_statistics_aggregates(self, setup_database):
+        """Test that quiz_stats follows completed attempts, edits and deletes"""
+        quiz_id = Quiz.create("Aggregates", "Desc", 300, 5)
+        empty_quiz_id = Quiz.create("No attempts", "Desc", 300, 5)
+        first = Attempt.create(quiz_id, "A", 5)
+        second = Attempt.create(quiz_id, "B", 5)
+        Attempt.create(quiz_id, "Unfinished", 5)
+        Attempt.complete_attempt(first, 4.0, 2, 100)
+        Attempt.complete_attempt(second, 8.0, 4, 200)
+
+        stats = Attempt.get_statistics(quiz_id)
+        assert stats['total_attempts'] == 2
+        assert stats['avg_score'] == 6.0
+        assert (stats['min_score'], stats['max_score']) == (4.0, 8.0)
+        assert stats['avg_time'] == 150
+        assert stats['score_variance'] == pytest.approx(4.0)
+
+        all_stats = Attempt.get_all_statistics()
+        assert all_stats[quiz_id]['total_attempts'] == 2
+        assert all_stats[empty_quiz_id]['total_attempts'] == 0
+        assert all_stats[empty_quiz_id]['avg_score'] is None
+
+        # Rescoring a completed attempt and deleting one recompute the quiz row
+        conn = db.get_connection()
+        conn.execute('UPDATE attempts SET score = 2.0 WHERE id = ?', (second,))
+        conn.commit()
+        assert Attempt.get_statistics(quiz_id)['max_score'] == 4.0
+
+        Attempt.delete(first)
+        stats = Attempt.get_statistics(quiz_id)
+        assert stats['total_attempts'] == 1
+        assert stats['min_score'] == 2.0
+        assert db.check_quiz_stats() == []
+
+        Quiz.delete(quiz_id)
+        assert Attempt.get_statistics(quiz_id)['total_attempts'] == 0
+        assert db.check_quiz_stats() == []
+
+    def test_quiz_statistics_check_and_rebuild(self, setup_database):
+        """Test detecting and repairing stale quiz aggregates"""
+        quiz_id = Quiz.create("Repair", "Desc", 300, 5)
+        attempt_id = Attempt.create(quiz_id, "A", 5)
+        Attempt.complete_attempt(attempt_id, 7.5, 3, 60)
+
+        conn = db.get_connection()
+        conn.execute('UPDATE quiz_stats SET attempt_count = 3')
+        conn.commit()
+        assert db.check_quiz_stats() == [quiz_id]
+
+        db.rebuild_quiz_stats()
+        assert db.check_quiz_stats() == []
+        assert Attempt.get_statistics(quiz_id)['avg_score'] == 7.5
+
+    def test_attempt_keyset_pages(self, setup_database):
+        """Test paging attempts newest first with ties on started_at broken by id"""
+        quiz_id = Quiz.create("Paged", "Desc", 300, 5)
+        ids = [Attempt.create(quiz_id, f"Student {i}", 5) for i in range(5)]
+        conn = db.get_connection()
+        conn.execute("UPDATE attempts SET started_at = '2024-01-01 10:00:00' WHERE id IN (?, ?)", ids[:2])
+        conn.execute("UPDATE attempts SET started_at = '2024-01-02 10:00:00' WHERE id NOT IN (?, ?)", ids[:2])
+        conn.commit()
+
+        seen = []
+        before = None
+        while True:
+            page, before = QuizController.get_attempts_page(quiz_id, before, limit=2)
+            seen.extend(attempt.id for attempt in page)
+            if before is None:
+                break
+        assert seen == [ids[4], ids[3], ids[2], ids[1], ids[0]]
+        assert [attempt.id for attempt in Attempt.iter_by_quiz(quiz_id, batch_size=2)] == seen
+
+        plan = ' '.join(row[3] for row in conn.execute(
+            "EXPLAIN QUERY PLAN SELECT * FROM attempts WHERE quiz_id = ? AND (started_at, id) < (?, ?) "
+            "ORDER BY started_at DESC, id DESC LIMIT 2", (quiz_id, '2024-01-02', 1)))
+        assert 'idx_attempts_quiz_started' in plan and 'TEMP B-TREE' not in plan
+
+        quizzes = [Quiz.create(f"Quiz {i}", "Desc", 300, 5) for i in range(3)]
+        first = Quiz.get_page(limit=2)
+        rest = Quiz.get_page(Quiz.page_key(first[-1]), limit=10)
+        assert [q.id for q in first + rest] == [q.id for q in Quiz.iter_all()]
+        assert len(first + rest) == 4 and set(quizzes) <= {q.id for q in first + rest}
+
+        # The statistics tab pages quizzes together with their aggregates
+        QuizController.submit_answers_bulk(ids[0], {}, 30)
+        page, stats, next_key = QuizController.get_quizzes_page(limit=3)
+        assert [q.id for q in page] == [q.id for q in first + rest][:3] and next_key is not None
+        page, stats, next_key = QuizController.get_quizzes_page(next_key, limit=3)
+        assert [q.id for q in page] == [quiz_id] and next_key is None
+        assert stats[quiz_id]['total_attempts'] == 1
+
+
+    def test_attempt_review(self, setup_database):
+        """Test that the review is built from a constant number of queries"""
+        answers = {}
+        for i in range(5):
+            q_id = Question.create(f"Q{i}", 1, "Test")
+            correct_id = Option.create(q_id, "Correct", True)
+            wrong_id = Option.create(q_id, "Wrong", False)
+            Option.create(q_id, "Other", False)
+            answers[q_id] = correct_id if i % 2 == 0 else wrong_id
+
+        quiz_id = Quiz.create("Review", "Desc", 300, 5)
+        attempt_id = QuizController.start_attempt(quiz_id, "Student")
+        QuizController.submit_answers_bulk(attempt_id, answers, 60)
+
+        statements = []
+        conn = db.get_connection()
+        conn.set_trace_callback(statements.append)
+        try:
+            review = QuizController.get_attempt_review(attempt_id)
+        finally:
+            conn.set_trace_callback(None)
+
+        assert len(statements) == 2
+        assert review['attempt'].id == attempt_id
+        assert len(review['answers']) == 5
+        for answer in review['answers']:
+            question_id = answer['question'].id
+            assert len(answer['all_options']) == 3
+            assert answer['selected_option_id'] == answers[question_id]
+            correct = [o for o in answer['all_options'] if o.is_correct][0]
+            assert answer['correct_option_id'] == correct.id
+            assert bool(answer['is_correct']) == (correct.id == answers[question_id])
+
+
 class TestQuestionBankController:
     """Tests for Question Bank Controller"""
 
@@ -294,6 +780,855 @@ class TestQuestionBankController:
         assert len(validation['issues']) == 0
 
 
+    def test_get_questions_page(self, setup_database):
+        """Test loading the question list one page at a time"""
+        for i in range(7):
+            QuestionBankController.add_question_with_options(
+                f"Question {i}", 1 + i % 2, "Test", [("A", True), ("B", False)]
+            )
+
+        page = QuestionBankController.get_questions_page(offset=2, limit=3)
+        assert [item['question'].question_text for item in page] == ["Question 2", "Question 3", "Question 4"]
+        assert all(len(item['options']) == 2 for item in page)
+
+        hard_page = QuestionBankController.get_questions_page(offset=0, limit=10, difficulty=2)
+        assert [item['question'].difficulty for item in hard_page] == [2, 2, 2]
+        assert QuestionBankController.count_questions() == 7
+        assert QuestionBankController.count_questions(2) == 3
+
+    def test_keyset_pages_and_streaming(self, setup_database):
+        """Test seeking pages by the previous page's last id and streaming the whole bank"""
+        for i in range(7):
+            QuestionBankController.add_question_with_options(
+                f"Question {i}", 1 + i % 2, "Test", [("A", True), ("B", False)]
+            )
+
+        first = QuestionBankController.get_questions_page(limit=3)
+        second = QuestionBankController.get_questions_page(limit=3, after_id=first[-1]['question'].id)
+        assert [item['question'].question_text for item in second] == ["Question 3", "Question 4", "Question 5"]
+        by_offset = QuestionBankController.get_questions_page(offset=3, limit=3)
+        assert [item['question'].id for item in second] == [item['question'].id for item in by_offset]
+
+        hard = Question.get_page_after(None, 2, difficulty=2)
+        assert [q.question_text for q in Question.get_page_after(hard[-1].id, 2, difficulty=2)] == ["Question 5"]
+
+        streamed = list(QuestionBankController.iter_questions_with_options(batch_size=2))
+        assert [item['question'].question_text for item in streamed] == [f"Question {i}" for i in range(7)]
+        assert all(len(item['options']) == 2 for item in streamed)
+        assert [q.id for q in Question.iter_all(batch_size=2)] == [item['question'].id for item in streamed]
+
+    def test_search_questions_full_text(self, setup_database):
+        """Test ranked full-text search with diacritic-insensitive matching"""
+        q1 = QuestionBankController.add_question_with_options(
+            "Từ khóa nào dùng để định nghĩa hàm?", 1, "Functions",
+            [("def", True), ("function", False)]
+        )
+        q2 = QuestionBankController.add_question_with_options(
+            "Vòng lặp nào duyệt qua các phần tử?", 2, "Vòng lặp",
+            [("for", True), ("while", False)]
+        )
+
+        assert [q.id for q in QuestionBankController.search_questions("khoa")] == [q1]
+        assert [q.id for q in QuestionBankController.search_questions("dinh nghia")] == [q1]
+        assert [q.id for q in QuestionBankController.search_questions("Vòng")] == [q2]
+        # Option texts are indexed too, and words match as prefixes
+        assert [q.id for q in QuestionBankController.search_questions("whi")] == [q2]
+        # Filters are applied in SQL
+        assert QuestionBankController.search_questions("khoa", difficulty=2) == []
+        assert [q.id for q in QuestionBankController.search_questions(category="Functions")] == [q1]
+
+    def test_search_index_follows_edits(self, setup_database):
+        """Test that the search index is kept in sync by triggers"""
+        question_id = QuestionBankController.add_question_with_options(
+            "Original text", 1, "Test", [("alpha", True), ("beta", False)]
+        )
+        QuestionBankController.update_question_with_options(
+            question_id, "Replacement text", options_data=[("gamma", True), ("delta", False)]
+        )
+
+        assert QuestionBankController.search_questions("original") == []
+        assert QuestionBankController.search_questions("alpha") == []
+        assert [q.id for q in QuestionBankController.search_questions("gamma")] == [question_id]
+
+        QuestionBankController.delete_question(question_id)
+        assert QuestionBankController.search_questions("replacement") == []
+
+    def test_import_questions_in_chunks(self, setup_database):
+        """Test bulk import: valid records are inserted per chunk, invalid ones reported"""
+        existing_id = QuestionBankController.add_question_with_options(
+            "Existing question", 1, "Test", [("A", True), ("B", False)]
+        )
+        records = [(f"Imported {i}", 1 + i % 3, "Bulk", [(f"right{i}", True), (f"wrong{i}", False)])
+                   for i in range(5)]
+        records.insert(2, ("Two correct", 1, "Bulk", [("A", True), ("B", True)]))
+        records.append(("Bad difficulty", 7, "Bulk", [("A", True), ("B", False)]))
+        progress_calls = []
+
+        result = QuestionBankController.import_questions(
+            records, chunk_size=2, progress=lambda imported, processed: progress_calls.append(imported))
+
+        assert result['imported'] == 5
+        assert result['total_records'] == 7
+        assert [error['record'] for error in result['errors']] == [3, 7]
+        assert progress_calls == [2, 4, 5]
+
+        imported = Question.search(category="Bulk")
+        assert len(imported) == 5
+        assert all(q.id > existing_id for q in imported)
+        assert all(len(Option.get_by_question(q.id)) == 2 for q in imported)
+        assert QuestionBankController.validate_question_bank()['is_valid']
+        # Bulk-imported options are searchable and the sampler sees the new questions
+        assert [q.question_text for q in QuestionBankController.search_questions("right3")] == ["Imported 3"]
+        assert question_sampler.pool_size(category="Bulk") == 5
+
+    def test_import_file_formats(self, setup_database, tmp_path):
+        """Test reading JSON Lines and CSV files for the import CLI"""
+        from utils.import_questions import import_file
+
+        jsonl_path = tmp_path / "questions.jsonl"
+        jsonl_path.write_text(
+            json.dumps({"question_text": "JSON question", "difficulty": "hard", "category": "Files",
+                        "options": [{"text": "yes", "is_correct": True}, {"text": "no", "is_correct": False}]})
+            + "\n\n", encoding='utf-8')
+        csv_path = tmp_path / "questions.csv"
+        csv_path.write_text(
+            "question_text,difficulty,category,correct,option_1,option_2,option_3\n"
+            "CSV question,2,Files,3,one,two,three\n", encoding='utf-8')
+
+        assert import_file(str(jsonl_path))['imported'] == 1
+        assert import_file(str(csv_path))['imported'] == 1
+
+        by_text = {q.question_text: q for q in Question.search(category="Files")}
+        assert by_text["JSON question"].difficulty == 3
+        csv_options = Option.get_by_question(by_text["CSV question"].id)
+        assert [o.option_text for o in csv_options if o.is_correct] == ["three"]
+
+        bad_path = tmp_path / "broken.jsonl"
+        bad_path.write_text("{not json\n", encoding='utf-8')
+        with pytest.raises(ValueError):
+            import_file(str(bad_path))
+
+
+
+class TestTaskExecutor:
+    """Tests for the background executor used by the views"""
+
+    class FakeRoot:
+        """Stands in for the Tk root: records after() calls instead of running a loop"""
+
+        def __init__(self):
+            self.scheduled = []
+
+        def after(self, delay, callback):
+            self.scheduled.append(callback)
+
+    def wait_for_results(self, executor, handles, timeout=10):
+        deadline = time.time() + timeout
+        while any(not handle.done for handle in handles) and time.time() < deadline:
+            executor.process_results()
+            time.sleep(0.01)
+
+    def test_callbacks_run_on_calling_thread(self, setup_database):
+        """Test that results and errors are delivered through the queue, and cancelled ones dropped"""
+        Question.create("Background", 1, "Test")
+        root = self.FakeRoot()
+        executor = TaskExecutor(workers=1)
+        executor.attach(root)
+        received = []
+        try:
+            ok = executor.submit(Question.count, on_success=lambda n: received.append(
+                ('count', n, threading.current_thread() is threading.main_thread())))
+            failed = executor.submit(Question.get_page, -1, "bad",
+                                     on_error=lambda e: received.append(('error', type(e).__name__, True)))
+            owner = object()
+            dropped = executor.submit(Question.count, owner=owner, on_success=lambda n: received.append('dropped'))
+            executor.cancel_all(owner=owner)
+
+            assert len(root.scheduled) == 1  # polling started on first submit
+            self.wait_for_results(executor, [ok, failed, dropped])
+        finally:
+            executor.shutdown()
+
+        assert ('count', 1, True) in received
+        assert any(item[0] == 'error' for item in received if isinstance(item, tuple))
+        assert 'dropped' not in received
+
+    def test_cancel_interrupts_running_query(self, setup_database):
+        """Test that cancelling an interruptible task aborts its query"""
+        started = threading.Event()
+        executor = TaskExecutor(workers=1)
+        received = []
+
+        def slow_query():
+            started.set()
+            conn = db.get_connection()
+            return conn.execute('''
+                WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c WHERE x < 200000000)
+                SELECT COUNT(*) FROM c
+            ''').fetchone()[0]
+
+        try:
+            handle = executor.submit(slow_query, interruptible=True,
+                                     on_success=received.append, on_error=received.append)
+            assert started.wait(5)
+            began = time.time()
+            handle.cancel()
+            self.wait_for_results(executor, [handle])
+        finally:
+            executor.shutdown()
+
+        assert handle.done
+        assert time.time() - began < 5
+        assert received == []
+
+
+class TestItemAnalysis:
+    """Tests for the vectorized item analysis"""
+
+    def test_statistics_match_dense_formulas(self):
+        """Test p-values, discrimination and alpha against the textbook formulas on a full matrix"""
+        np = pytest.importorskip('numpy')
+        from utils.item_analysis import ItemAnalysis
+
+        responses = np.array([
+            [1, 1, 1, 0],
+            [1, 1, 0, 0],
+            [1, 0, 1, 1],
+            [0, 0, 0, 1],
+            [1, 1, 1, 1],
+            [0, 1, 0, 0],
+        ])
+        attempts, questions = responses.shape
+        attempt_ids = np.repeat(np.arange(1, attempts + 1), questions)
+        question_ids = np.tile(np.arange(1, questions + 1), attempts)
+        # Option 10*q is correct, 10*q + 1 is the only distractor ever chosen
+        selected = np.where(responses.ravel() == 1, question_ids * 10, question_ids * 10 + 1)
+        option_ids = np.array([q * 10 + k for q in range(1, questions + 1) for k in range(3)])
+
+        analysis = ItemAnalysis(attempt_ids, np.ones_like(attempt_ids), question_ids, selected,
+                                responses.ravel(), option_ids, option_ids // 10, option_ids % 10 == 0)
+
+        totals = responses.sum(axis=1)
+        assert np.allclose(analysis.p_values, responses.mean(axis=0))
+        for column in range(questions):
+            rest = totals - responses[:, column]
+            expected = np.corrcoef(responses[:, column], rest)[0, 1]
+            assert analysis.discrimination[column] == pytest.approx(expected)
+
+        alpha = questions / (questions - 1) * (1 - responses.var(axis=0).sum() / totals.var())
+        assert analysis.quiz_report() == {1: {'attempts': attempts, 'alpha': pytest.approx(alpha)}}
+        # Each question has two distractors and only one is ever chosen
+        assert np.allclose(analysis.distractor_efficiency, 0.5)
+
+    def test_analyze_items_from_database(self, setup_database):
+        """Test the report built from completed attempts, with undefined statistics as None"""
+        pytest.importorskip('numpy')
+        easy = Question.create("Easy", 1, "Test")
+        easy_right = Option.create(easy, "Right", True)
+        easy_wrong = Option.create(easy, "Wrong", False)
+        hard = Question.create("Hard", 3, "Test")
+        hard_right = Option.create(hard, "Right", True)
+        hard_wrong = Option.create(hard, "Wrong", False)
+        Option.create(hard, "Never chosen", False)
+        quiz_id = Quiz.create("Analysis quiz", "Desc", 300, 2)
+
+        answer_sets = [
+            {easy: easy_right, hard: hard_right},
+            {easy: easy_right, hard: hard_wrong},
+            {easy: easy_right, hard: hard_wrong},
+            {easy: easy_wrong, hard: None},
+        ]
+        for answers in answer_sets:
+            attempt_id = QuizController.start_attempt(quiz_id, "Student")
+            QuizController.submit_answers_bulk(attempt_id, answers, 30)
+        QuizController.start_attempt(quiz_id, "Not finished")
+
+        report = QuizController.analyze_items()
+        rows = {row['id']: row for row in report['questions']}
+
+        assert [row['id'] for row in report['questions']] == [hard, easy]
+        assert rows[easy]['success_rate'] == 75.0
+        assert rows[hard]['success_rate'] == 25.0
+        assert rows[hard]['total_answers'] == 4
+        assert rows[easy]['distractor_efficiency'] == 1.0
+        assert rows[hard]['distractor_efficiency'] == 0.5
+        assert rows[easy]['discrimination'] == pytest.approx(1 / 3)
+        assert report['quizzes'][quiz_id]['attempts'] == 4
+        assert report['quizzes'][quiz_id]['title'] == "Analysis quiz"
+
+        assert QuizController.analyze_items(quiz_id + 1) == {'questions': [], 'quizzes': {}}
+
+
+class TestDifficultyRecalibration:
+    """Tests for the incremental difficulty recalibration job"""
+
+    def answer(self, quiz_id, answers, times):
+        for _ in range(times):
+            attempt_id = QuizController.start_attempt(quiz_id, "Student")
+            QuizController.submit_answers_bulk(attempt_id, answers, 30)
+
+    def test_suggest_difficulty_thresholds(self):
+        """Test the thresholds, the minimum answer count and the margin around thresholds"""
+        assert suggest_difficulty(1, 10, 0) == 1  # too few answers
+        assert suggest_difficulty(1, 100, 10) == 3
+        assert suggest_difficulty(3, 100, 90) == 1
+        assert suggest_difficulty(2, 100, 50) == 2
+        # Just past the easy threshold, but within the margin
+        assert suggest_difficulty(2, 100, 72) == 2
+        assert suggest_difficulty(1, 100, 67) == 1
+
+    def test_propose_review_and_apply(self, setup_database):
+        """Test that runs only see new answers and accepted proposals are applied in bulk"""
+        labeled_easy = Question.create("Labeled easy", 1, "Test")
+        easy_right = Option.create(labeled_easy, "Right", True)
+        easy_wrong = Option.create(labeled_easy, "Wrong", False)
+        labeled_hard = Question.create("Labeled hard", 3, "Test")
+        hard_right = Option.create(labeled_hard, "Right", True)
+        quiz_id = Quiz.create("Recalibration", "Desc", 300, 2)
+
+        self.answer(quiz_id, {labeled_easy: easy_wrong, labeled_hard: hard_right}, 30)
+        self.answer(quiz_id, {labeled_easy: easy_right, labeled_hard: hard_right}, 5)
+
+        result = recalibrate(batch_size=1)
+        assert result['questions'] == 2
+        assert result['proposed'] == 2
+        proposals = {p.question_id: p for p in DifficultyProposal.get_by_status('pending')}
+        assert proposals[labeled_easy].proposed_difficulty == 3
+        assert proposals[labeled_hard].proposed_difficulty == 1
+
+        # Nothing new was answered
+        assert recalibrate()['questions'] == 0
+
+        assert DifficultyProposal.set_status([labeled_easy], 'accepted') == 1
+        assert DifficultyProposal.set_status([labeled_hard], 'rejected') == 1
+        assert DifficultyProposal.apply_accepted() == 1
+        assert Question.get_by_id(labeled_easy).difficulty == 3
+        assert Question.get_by_id(labeled_hard).difficulty == 3
+        assert [p.question_id for p in DifficultyProposal.get_by_status('applied')] == [labeled_easy]
+
+        # New answers: the rejected proposal is not reopened for the same level
+        self.answer(quiz_id, {labeled_easy: easy_wrong, labeled_hard: hard_right}, 1)
+        result = recalibrate()
+        assert result['questions'] == 2
+        assert result['proposed'] == 1
+        assert [p.question_id for p in DifficultyProposal.get_by_status('rejected')] == [labeled_hard]
+        assert DifficultyProposal.get_by_status('pending') == []
+
+    def test_deleted_answers_and_stale_proposals(self, setup_database):
+        """Test that deleted answers queue their question and levels edited by hand are not overwritten"""
+        question_id = Question.create("Labeled easy", 1, "Test")
+        wrong = Option.create(question_id, "Wrong", False)
+        Option.create(question_id, "Right", True)
+        quiz_id = Quiz.create("Recalibration", "Desc", 300, 1)
+
+        attempt_ids = []
+        for _ in range(30):
+            attempt_ids.append(QuizController.start_attempt(quiz_id, "Student"))
+            QuizController.submit_answers_bulk(attempt_ids[-1], {question_id: wrong}, 30)
+        assert recalibrate()['proposed'] == 1
+
+        # Deleting answers queues the question too; too few answers left for a proposal
+        for attempt_id in attempt_ids[:10]:
+            Attempt.delete(attempt_id)
+        assert DifficultyProposal.count_queued() == 1
+        result = recalibrate()
+        assert result['questions'] == 1
+        assert result['queued'] == 0
+        assert DifficultyProposal.get_by_status('pending') == []
+
+        self.answer(quiz_id, {question_id: wrong}, 10)
+        assert recalibrate()['proposed'] == 1
+        DifficultyProposal.accept_all_pending()
+        Question.update(question_id, difficulty=2)
+        assert DifficultyProposal.apply_accepted() == 0
+        assert Question.get_by_id(question_id).difficulty == 2
+        assert [p.question_id for p in DifficultyProposal.get_by_status('stale')] == [question_id]
+
+        # The stale proposal is queued and reopened from the new level
+        assert recalibrate()['proposed'] == 1
+        proposal = DifficultyProposal.get_by_status('pending')[0]
+        assert (proposal.current_difficulty, proposal.proposed_difficulty) == (2, 3)
+
+
+class TestExamGenerator:
+    """Tests for stratified exam generation"""
+
+    def create_questions(self, difficulty, category, count):
+        question_ids = []
+        for i in range(count):
+            question_id = Question.create(f"{category} {difficulty}-{i}", difficulty, category)
+            Option.create(question_id, "A", True)
+            Option.create(question_id, "B", False)
+            question_ids.append(question_id)
+        return question_ids
+
+    def test_quotas_and_fallback_order(self):
+        """Test that counts are spread evenly over categories and neighbours are tried nearest first"""
+        quotas = difficulty_quotas({'easy': 5, 'hard': 3}, ["A", "B"])
+        assert quotas == {(1, "A"): 3, (1, "B"): 2, (3, "A"): 1, (3, "B"): 2}
+        assert difficulty_quotas({'medium': 4}) == {(2, None): 4}
+
+        assert fallback_chain(2, "A") == [(2, "A"), (1, "A"), (3, "A"), (2, None), (1, None), (3, None), (None, None)]
+        assert fallback_chain(None, "A") == [(None, "A"), (None, None)]
+
+    def test_short_stratum_borrows_from_neighbours(self, setup_database):
+        """Test that a short pool is topped up from the nearest strata and the rest reported missing"""
+        easy_a = self.create_questions(1, "A", 4)
+        medium_a = self.create_questions(2, "A", 1)
+        hard_b = self.create_questions(3, "B", 2)
+
+        exam = exam_generator.generate({(2, "A"): 3, (3, "B"): 1})[0]
+        question_ids = exam['question_ids']
+        assert len(question_ids) == len(set(question_ids)) == 4
+        assert set(medium_a) <= set(question_ids)
+        assert len(set(question_ids) & set(easy_a)) == 2
+        assert len(set(question_ids) & set(hard_b)) == 1
+        assert exam['fallbacks'] == {(2, "A"): 2}
+        assert exam['missing'] == 0
+
+        exam = exam_generator.generate({(1, None): 10})[0]
+        assert len(exam['question_ids']) == 7
+        assert exam['missing'] == 3
+
+    def test_generate_distinct_variants(self, setup_database, monkeypatch):
+        """Test that a room's variants are distinct and loaded with a fixed number of queries"""
+        self.create_questions(1, "A", 10)
+        self.create_questions(2, "B", 10)
+        quiz_id = Quiz.create("Room", "Desc", 300, 4)
+        question_sampler.pool_size()  # warm up sampler pools
+
+        # Only the quota strata are copied when none runs short
+        copied = []
+        snapshot = question_sampler.snapshot
+        monkeypatch.setattr(question_sampler, 'snapshot', lambda keys: copied.extend(keys) or snapshot(keys))
+
+        conn = db.get_connection()
+        statements = []
+        conn.set_trace_callback(statements.append)
+        try:
+            exams = QuizController.generate_exam_variants(quiz_id, {(1, "A"): 2, (2, "B"): 2}, 40)
+        finally:
+            conn.set_trace_callback(None)
+
+        assert len(exams) == 40
+        assert len({frozenset(item['question'].id for item in exam['questions']) for exam in exams}) == 40
+        for exam in exams:
+            assert [item['question'].difficulty for item in exam['questions']].count(1) == 2
+            assert all(len(item['options']) == 2 for item in exam['questions'])
+            assert exam['missing'] == 0
+        assert len(statements) <= 5
+        assert sorted(copied) == [(1, "A"), (2, "B")]
+        assert QuizController.generate_exam_variants(quiz_id + 1, {(1, None): 1}, 2) is None
+
+
+class TestAnswerKey:
+    """Tests for the in-memory answer key and regrading"""
+
+    def test_grading_follows_key_edits_without_queries(self, setup_database):
+        """Test that grading reads no options and the key follows every option write"""
+        q1 = Question.create("Q1", 1, "Test")
+        a1 = Option.create(q1, "A", True)
+        b1 = Option.create(q1, "B", False)
+        q2 = Question.create("Q2", 1, "Test")
+        a2 = Option.create(q2, "A", True)
+        answer_key.load()
+
+        conn = db.get_connection()
+        statements = []
+        conn.set_trace_callback(statements.append)
+        try:
+            answer_rows, correct = answer_key.grade({q1: a1, q2: None})
+            assert answer_key.is_correct(q1, b1) is False
+        finally:
+            conn.set_trace_callback(None)
+        # Only the cheap check for commits made through other connections
+        assert statements == ['PRAGMA data_version'] * 2
+        assert answer_rows == [(q1, a1, True), (q2, None, False)]
+        assert correct == 1
+
+        Option.update(a1, is_correct=False)
+        Option.update(b1, is_correct=True)
+        assert answer_key.correct_option_id(q1) == b1
+        Option.delete_by_question(q2)
+        assert answer_key.correct_option_id(q2) is None
+
+        # A question written by another process is read on first use; unknown ids are not keyed
+        conn.execute("INSERT INTO questions (id, question_text, difficulty) VALUES (500, 'Q500', 1)")
+        conn.execute("INSERT INTO options (id, question_id, option_text, is_correct) VALUES (900, 500, 'A', 1)")
+        conn.commit()
+        assert answer_key.grade({500: 900, 10 ** 9: 1}) == ([(500, 900, True), (10 ** 9, 1, False)], 1)
+
+        Question.delete(q1)
+        assert answer_key.correct_option_id(q1) is None
+
+    def test_key_reloaded_after_edits_by_another_process(self, setup_database):
+        """Test that a key corrected through another connection is used for the next grading"""
+        q1 = Question.create("Q1", 1, "Test")
+        a1 = Option.create(q1, "A", True)
+        b1 = Option.create(q1, "B", False)
+        assert answer_key.grade({q1: a1}) == ([(q1, a1, True)], 1)
+
+        other = sqlite3.connect(db.database_path)
+        try:
+            other.execute('UPDATE options SET is_correct = (id = ?) WHERE question_id = ?', (b1, q1))
+            other.commit()
+        finally:
+            other.close()
+        assert answer_key.grade({q1: a1}) == ([(q1, a1, False)], 0)
+        assert answer_key.correct_option_id(q1) == b1
+
+        # Rewording a correct option (Option.update rewrites is_correct too) keeps the key version
+        version = db.get_connection().execute('SELECT version FROM answer_key_version').fetchone()[0]
+        Option.update(b1, option_text="B renamed")
+        assert db.get_connection().execute('SELECT version FROM answer_key_version').fetchone()[0] == version
+
+        # Commits that do not touch correct options do not reload the key
+        other = sqlite3.connect(db.database_path)
+        try:
+            other.execute("UPDATE questions SET category = 'Other' WHERE id = ?", (q1,))
+            other.commit()
+        finally:
+            other.close()
+        keys = answer_key._keys
+        assert answer_key.correct_option_id(q1) == b1
+        assert answer_key._keys is keys
+
+    def test_regrade_after_key_correction(self, setup_database):
+        """Test that correcting a key rescores saved answers, attempts and statistics"""
+        q1 = Question.create("Q1", 1, "Test")
+        wrong_key = Option.create(q1, "A", True)
+        right_key = Option.create(q1, "B", False)
+        q2 = Question.create("Q2", 1, "Test")
+        a2 = Option.create(q2, "A", True)
+        quiz_id = Quiz.create("Regrade", "Desc", 300, 2)
+
+        attempt_ids = []
+        for selected in (wrong_key, right_key, right_key):
+            attempt_id = QuizController.start_attempt(quiz_id, "Student")
+            QuizController.submit_answers_bulk(attempt_id, {q1: selected, q2: a2}, 10)
+            attempt_ids.append(attempt_id)
+        # One attempt answered one by one and not completed yet
+        open_attempt = QuizController.start_attempt(quiz_id, "Student")
+        QuizController.submit_answer(open_attempt, q1, right_key)
+
+        Option.update(wrong_key, is_correct=False)
+        Option.update(right_key, is_correct=True)
+        recalibrate()
+        assert QuizController.regrade_attempts([q1]) == {'answers': 4, 'attempts': 3}
+        assert QuizController.regrade_attempts() == {'answers': 0, 'attempts': 0}
+        # The regraded question is queued for the next recalibration run
+        assert recalibrate()['questions'] == 1
+
+        assert [Attempt.get_by_id(a).score for a in attempt_ids] == [5.0, 10.0, 10.0]
+        assert Question.get_statistics(q1)['correct_count'] == 3
+        assert Attempt.get_statistics(quiz_id)['avg_score'] == pytest.approx(25 / 3)
+        assert db.check_quiz_stats() == []
+        assert QuizController.complete_attempt(open_attempt, 20) == {'score': 10.0, 'correct': 1, 'total': 1}
+
+
+class TestExamTimer:
+    """Tests for the monotonic exam countdown"""
+
+    class FakeClock:
+        def __init__(self):
+            self.now = 1000.0
+
+        def __call__(self):
+            return self.now
+
+    def test_countdown_from_deadline(self):
+        """Test that remaining time follows the clock, not the number of ticks"""
+        clock = self.FakeClock()
+        timer = ExamTimer(600, clock)
+        assert timer.remaining_seconds() == 600
+
+        clock.now += 0.25
+        assert timer.remaining_seconds() == 600
+        assert timer.next_tick_delay_ms() == 755
+
+        # A tick that arrives 7.4 s late still shows the right time
+        clock.now += 7.4
+        assert timer.remaining_seconds() == 593
+        assert abs(timer.next_tick_delay() - 0.355) < 1e-6
+
+        clock.now += 600
+        assert timer.expired()
+        assert timer.remaining() == 0
+        assert timer.elapsed_seconds() == 600
+
+    def test_tick_never_passes_deadline_and_stop_freezes(self):
+        """Test the last tick lands on the deadline and stop() freezes elapsed time"""
+        clock = self.FakeClock()
+        timer = ExamTimer(10, clock)
+        clock.now += 9.998
+        assert timer.next_tick_delay_ms() == 2
+        assert timer.remaining_ms() == 2
+
+        clock.now = 1004.6
+        timer.stop()
+        clock.now += 100
+        assert timer.elapsed_seconds() == 4
+        assert not timer.expired()
+
+
+class TestResultExport:
+    """Tests for streaming result exports"""
+
+    def _create_history(self):
+        quiz_id = Quiz.create("Export", "Desc", 300, 2)
+        answers = {}
+        for i in range(2):
+            q_id = Question.create(f"Q{i}", 1 + i, "Export")
+            answers[q_id] = Option.create(q_id, "Correct", True)
+            Option.create(q_id, "Wrong", False)
+
+        completed_id = QuizController.start_attempt(quiz_id, "Học sinh A")
+        QuizController.submit_answers_bulk(completed_id, answers, 60)
+        QuizController.start_attempt(quiz_id, "Unfinished")
+        return quiz_id, completed_id
+
+    def test_export_formats(self, setup_database, tmp_path):
+        """Test exporting completed attempts and answers to CSV, JSON Lines and columnar files"""
+        from utils.export_results import export_results
+        from utils.columnar import ColumnarReader
+        quiz_id, completed_id = self._create_history()
+
+        assert export_results('attempts', str(tmp_path / "attempts.csv")) == 1
+        lines = (tmp_path / "attempts.csv").read_text(encoding='utf-8').splitlines()
+        assert lines[0].startswith("id,quiz_id,quiz_title,student_name,score")
+        assert "Học sinh A" in lines[1]
+
+        assert export_results('answers', str(tmp_path / "answers.jsonl"), quiz_id=quiz_id) == 2
+        rows = [json.loads(line) for line in (tmp_path / "answers.jsonl").read_text(encoding='utf-8').splitlines()]
+        assert [row['attempt_id'] for row in rows] == [completed_id, completed_id]
+        assert all(row['is_correct'] is True for row in rows)
+
+        assert export_results('attempts', str(tmp_path / "all.qcol"), completed_only=False) == 2
+        reader = ColumnarReader(str(tmp_path / "all.qcol"))
+        assert reader.num_rows == 2
+        exported = list(reader.iter_rows(['student_name', 'score', 'completed_at']))
+        assert exported[0]['student_name'] == "Học sinh A"
+        assert exported[0]['score'] == 10.0
+        assert exported[1]['completed_at'] is None
+
+        with pytest.raises(ValueError):
+            export_results('attempts', str(tmp_path / "attempts.xlsx"))
+
+    def test_columnar_roundtrip(self, tmp_path):
+        """Test that columnar files split rows into row groups and keep NULLs and types"""
+        from utils.columnar import ColumnarWriter, ColumnarReader
+        columns = [('id', 'int'), ('name', 'str'), ('score', 'float'), ('ok', 'bool')]
+        rows = [(i, None if i == 3 else f"name{i % 2}", i / 2, i % 2 == 0) for i in range(7)]
+        path = str(tmp_path / "data.qcol")
+
+        with ColumnarWriter(path, columns, row_group_size=3) as writer:
+            writer.write_rows(rows)
+
+        reader = ColumnarReader(path)
+        assert len(reader.row_groups) == 3
+        assert [tuple(row.values()) for row in reader.iter_rows()] == rows
+        assert [group['ok'] for group in reader.iter_row_groups(['ok'])][-1] == [True]
+
+    def test_failed_columnar_export_leaves_no_file(self, tmp_path):
+        """Test that an export failing partway does not leave a file readable as complete"""
+        from utils.export_results import write_columnar
+
+        def failing_rows():
+            for i in range(5):
+                yield (i, f"name{i}")
+            raise sqlite3.OperationalError('database is locked')
+
+        path = tmp_path / "partial.qcol"
+        with pytest.raises(sqlite3.OperationalError):
+            write_columnar(failing_rows(), [('id', 'int'), ('name', 'str')], str(path))
+        assert not path.exists()
+
+
+class TestExamServer:
+    """Tests for the headless exam server"""
+
+    def create_bank(self):
+        for difficulty in (1, 2, 3):
+            for i in range(2):
+                QuestionBankController.add_question_with_options(
+                    f"Q{difficulty}-{i}", difficulty, "Test", [("Right", True), ("Wrong", False)]
+                )
+        return Quiz.create("Server Quiz", "Desc", 300, 6)
+
+    def test_exam_flow(self, setup_database):
+        """Test start, questions, answers, complete and review through the router"""
+        quiz_id = self.create_bank()
+        server = ExamServer(workers=2, difficulty_matrix={'easy': 2, 'medium': 2, 'hard': 2})
+
+        async def flow():
+            status, started = await server.handle_request(
+                'POST', '/attempts', {'quiz_id': quiz_id, 'student_name': 'Student'})
+            assert status == 201
+            assert started['total_questions'] == 6 and started['missing'] == 0
+            attempt_id = started['attempt_id']
+
+            status, data = await server.handle_request('GET', f'/attempts/{attempt_id}/questions')
+            assert status == 200
+            assert len(data['questions']) == 6
+            assert all('is_correct' not in option
+                       for question in data['questions'] for option in question['options'])
+
+            # Answer every question correctly
+            answers = {}
+            for question in data['questions']:
+                correct = Option.get_correct_option(question['id'])
+                answers[str(question['id'])] = correct.id
+            status, saved = await server.handle_request(
+                'POST', f'/attempts/{attempt_id}/answers', {'answers': answers})
+            assert status == 200 and saved['answered'] == 6
+
+            status, _ = await server.handle_request('GET', f'/attempts/{attempt_id}/review')
+            assert status == 409
+
+            status, result = await server.handle_request('POST', f'/attempts/{attempt_id}/complete')
+            assert status == 200
+            assert result['correct'] == 6 and result['score'] == 10
+
+            status, _ = await server.handle_request(
+                'POST', f'/attempts/{attempt_id}/answers', {'answers': {}})
+            assert status == 409
+
+            status, review = await server.handle_request('GET', f'/attempts/{attempt_id}/review')
+            assert status == 200
+            assert len(review['answers']) == 6
+            assert all(answer['is_correct'] for answer in review['answers'])
+
+        try:
+            asyncio.run(flow())
+        finally:
+            server.close()
+
+    def test_errors(self, setup_database):
+        """Test validation errors and unknown routes"""
+        quiz_id = self.create_bank()
+        server = ExamServer(workers=1)
+
+        async def flow():
+            assert (await server.handle_request('GET', '/nope'))[0] == 404
+            assert (await server.handle_request('GET', '/attempts/42/questions'))[0] == 404
+            assert (await server.handle_request('POST', '/attempts', {'quiz_id': quiz_id}))[0] == 400
+            status, started = await server.handle_request(
+                'POST', '/attempts', {'quiz_id': quiz_id, 'student_name': 'S'})
+            # The default matrix asks for 30 questions, the bank has 6
+            assert started['total_questions'] == 6 and started['missing'] == 24
+            status, _ = await server.handle_request(
+                'POST', f"/attempts/{started['attempt_id']}/answers", {'answers': {'999999': 1}})
+            assert status == 400
+
+            async def broken():
+                raise sqlite3.OperationalError('database is locked')
+            server.list_quizzes = broken
+            assert await server.handle_request('GET', '/quizzes') == (500, {'error': 'Internal server error'})
+
+        try:
+            asyncio.run(flow())
+        finally:
+            server.close()
+
+    def test_finished_sessions_are_forgotten(self, setup_database):
+        """Test that a completed attempt leaves memory once its review window has passed"""
+        quiz_id = self.create_bank()
+        server = ExamServer(workers=1, difficulty_matrix={'easy': 1}, review_window=0.01)
+
+        async def flow():
+            _, started = await server.handle_request(
+                'POST', '/attempts', {'quiz_id': quiz_id, 'student_name': 'S'})
+            attempt_id = started['attempt_id']
+            await server.handle_request('POST', f'/attempts/{attempt_id}/complete')
+            assert (await server.handle_request('GET', f'/attempts/{attempt_id}/review'))[0] == 200
+            await asyncio.sleep(0.05)
+            assert attempt_id not in server.sessions
+            assert (await server.handle_request('GET', f'/attempts/{attempt_id}/review'))[0] == 404
+
+        try:
+            asyncio.run(flow())
+        finally:
+            server.close()
+
+    def test_deadline_enforced(self, setup_database):
+        """Test that answers are rejected after the deadline and the attempt is completed automatically"""
+        quiz_id = self.create_bank()
+        clock = TestExamTimer.FakeClock()
+        server = ExamServer(workers=1, difficulty_matrix={'easy': 2, 'medium': 2, 'hard': 2},
+                            clock=clock, deadline_grace=2)
+
+        async def flow():
+            status, started = await server.handle_request(
+                'POST', '/attempts', {'quiz_id': quiz_id, 'student_name': 'Late'})
+            attempt_id = started['attempt_id']
+            assert started['remaining_seconds'] == 300
+            session = server.sessions[attempt_id]
+            assert session.deadline_handle is not None
+
+            _, data = await server.handle_request('GET', f'/attempts/{attempt_id}/questions')
+            first_id = data['questions'][0]['id']
+            correct = Option.get_correct_option(first_id)
+            status, _ = await server.handle_request(
+                'POST', f'/attempts/{attempt_id}/answers', {'answers': {str(first_id): correct.id}})
+            assert status == 200
+
+            # Within the grace period answers still count; after it they are rejected
+            clock.now += 301
+            _, data = await server.handle_request('GET', f'/attempts/{attempt_id}/questions')
+            assert data['remaining_seconds'] == 0
+            clock.now += 2
+            status, body = await server.handle_request(
+                'POST', f'/attempts/{attempt_id}/answers', {'answers': {str(first_id): None}})
+            assert status == 409 and body['error'] == 'Time is up'
+
+            # Fire the deadline callback instead of waiting for the loop timer
+            server.expire_session(session)
+            await session.expiry_task
+            assert session.result['correct'] == 1
+            attempt = Attempt.get_by_id(attempt_id)
+            assert attempt.completed_at is not None
+            assert attempt.time_taken == 300
+
+        try:
+            asyncio.run(flow())
+        finally:
+            server.close()
+
+    def test_http_roundtrip(self, setup_database):
+        """Test serving concurrent requests over a real socket"""
+        self.create_bank()
+        server = ExamServer(workers=4)
+
+        async def request(port, path):
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(f'GET {path} HTTP/1.1\r\nHost: test\r\nConnection: close\r\n\r\n'.encode())
+            await writer.drain()
+            response = await reader.read()
+            writer.close()
+            head, _, body = response.partition(b'\r\n\r\n')
+            return int(head.split()[1]), json.loads(body)
+
+        async def flow():
+            listener = await asyncio.start_server(server.handle_connection, '127.0.0.1', 0)
+            port = listener.sockets[0].getsockname()[1]
+            async with listener:
+                results = await asyncio.gather(*[request(port, '/quizzes') for _ in range(20)])
+
+                # A Content-Length that is not a number gets a 400 instead of a dropped connection
+                reader, writer = await asyncio.open_connection('127.0.0.1', port)
+                writer.write(b'POST /attempts HTTP/1.1\r\nContent-Length: abc\r\n\r\n')
+                await writer.drain()
+                response = await reader.read()
+                writer.close()
+            assert all(status == 200 for status, _ in results)
+            assert all(body['quizzes'][0]['title'] == 'Server Quiz' for _, body in results)
+            assert response.split()[1] == b'400'
+
+        try:
+            asyncio.run(flow())
+        finally:
+            server.close()
+
 def run_tests():
     """Run all tests"""
     pytest.main([__file__, '-v', '--tb=short'])
@@ -0,0 +1,169 @@
+"""Check that model queries keep using indexes
+
+Runs every registered model query against a small scratch database, explains
+each statement it executes and reports full scans of the large tables, plus
+foreign key columns without an index.
+
+Usage:
+    python -m utils.check_query_plans
+"""
+import argparse
+import os
+import sys
+import tempfile
+from database.connection import db
+from database.query_plan import PlanRecorder, find_plan_problems, unindexed_foreign_keys
+from models.question import Question, question_cache
+from models.option import Option, option_cache
+from models.quiz import Quiz
+from models.attempt import Attempt
+from models.difficulty_proposal import DifficultyProposal
+from models.answer_key import answer_key
+from controllers.quiz_controller import QuizController
+
+# (name, call, tables the query scans on purpose: whole-bank reports and exports)
+# The scratch database holds question 1 (options 1-2), quiz 1 and completed attempt 1.
+QUERY_CHECKS = [
+    ('Question.get_by_id', lambda: Question.get_by_id(1), ()),
+    ('Question.get_by_ids', lambda: Question.get_by_ids([1, 2]), ()),
+    ('Question.get_all', lambda: Question.get_all(), ('questions',)),
+    ('Question.iter_all', lambda: list(Question.iter_all()), ('questions',)),
+    # OFFSET paging reads offset + limit rows in id order (get_page_after is the keyset version)
+    ('Question.get_page', lambda: Question.get_page(0, 50), ('questions',)),
+    ('Question.get_page by difficulty', lambda: Question.get_page(0, 50, 1), ()),
+    ('Question.get_page_after', lambda: Question.get_page_after(1, 50), ()),
+    ('Question.get_page_after by difficulty', lambda: Question.get_page_after(1, 50, 1), ()),
+    ('Question.get_by_difficulty', lambda: Question.get_by_difficulty(1), ()),
+    ('Question.get_by_category', lambda: Question.get_by_category('General'), ()),
+    ('Question.search', lambda: Question.search('python', 1, 'General'), ()),
+    ('Question.search filters', lambda: Question.search(None, 1, 'General'), ()),
+    ('Question.update', lambda: Question.update(1, question_text='Python là gì?'), ()),
+    ('Question.count', lambda: Question.count(), ('questions',)),
+    ('Question.count by difficulty', lambda: Question.count(1), ()),
+    ('Question.get_statistics_bulk', lambda: Question.get_statistics_bulk([1]), ()),
+    ('Question.analyze_difficulty', lambda: Question.analyze_difficulty(), ('questions',)),
+    ('Option.get_by_id', lambda: Option.get_by_id(1), ()),
+    ('Option.get_by_question', lambda: Option.get_by_question(1), ()),
+    ('Option.get_by_questions', lambda: Option.get_by_questions([1]), ()),
+    ('Option.get_correct_option', lambda: Option.get_correct_option(1), ()),
+    ('Option.get_correct_option_ids', lambda: Option.get_correct_option_ids([1]), ()),
+    ('Option.get_key_rows', lambda: Option.get_key_rows(), ('options',)),
+    ('Option.update', lambda: Option.update(2, option_text='Một loài rắn'), ()),
+    ('Quiz.get_by_id', lambda: Quiz.get_by_id(1), ()),
+    ('Quiz.get_by_title', lambda: Quiz.get_by_title('Kiểm tra'), ()),
+    ('Quiz.get_page', lambda: Quiz.get_page(('9999-12-31', 0), 50), ()),
+    ('Quiz.update', lambda: Quiz.update(1, time_limit=900), ()),
+    ('Attempt.get_by_id', lambda: Attempt.get_by_id(1), ()),
+    ('Attempt.get_by_quiz', lambda: Attempt.get_by_quiz(1), ()),
+    ('Attempt.get_page_by_quiz', lambda: Attempt.get_page_by_quiz(1, ('9999-12-31', 0), 50), ()),
+    ('Attempt.get_answers', lambda: Attempt.get_answers(1), ()),
+    ('Attempt.get_review_rows', lambda: Attempt.get_review_rows(1), ()),
+    ('Attempt.get_statistics', lambda: Attempt.get_statistics(1), ()),
+    ('Attempt.get_all_statistics', lambda: Attempt.get_all_statistics(), ()),
+    ('Attempt.get_statistics_bulk', lambda: Attempt.get_statistics_bulk([1]), ()),
+    ('QuizController.get_quizzes_page', lambda: QuizController.get_quizzes_page(('9999-12-31', 0), 50), ()),
+    ('Attempt.iter_export_rows', lambda: list(Attempt.iter_export_rows(1)), ()),
+    ('Attempt.iter_answer_export_rows', lambda: list(Attempt.iter_answer_export_rows(1)), ()),
+    ('Attempt.iter_response_batches', lambda: list(Attempt.iter_response_batches()),
+     ('attempts', 'attempt_answers')),
+    ('Attempt.iter_response_batches by quiz', lambda: list(Attempt.iter_response_batches(1)), ()),
+    ('Attempt.get_answer_counts', lambda: Attempt.get_answer_counts(1), ()),
+    ('Attempt.iter_graded_answer_batches', lambda: list(Attempt.iter_graded_answer_batches()),
+     ('attempt_answers',)),
+    ('Attempt.iter_graded_answer_batches by question',
+     lambda: list(Attempt.iter_graded_answer_batches([1])), ()),
+    ('Attempt.apply_regrade', lambda: Attempt.apply_regrade([(1, 1, False)]), ()),
+    # The answer key is built from every correct option once per process
+    ('answer_key.load', lambda: answer_key.load(), ('options',)),
+    ('answer_key.refresh', lambda: answer_key.refresh(1), ()),
+    ('QuizController.regrade_attempts', lambda: QuizController.regrade_attempts([1]), ()),
+    ('Attempt.cleanup_abandoned_attempts', lambda: Attempt.cleanup_abandoned_attempts(), ()),
+    ('DifficultyProposal.get_queued_batch', lambda: DifficultyProposal.get_queued_batch(0, 10), ()),
+    # The queue only holds the questions changed since the last run
+    ('DifficultyProposal.drop_deleted_from_queue', lambda: DifficultyProposal.drop_deleted_from_queue(),
+     ('recalibration_queue',)),
+    ('DifficultyProposal.count_queued', lambda: DifficultyProposal.count_queued(), ('recalibration_queue',)),
+    ('DifficultyProposal.save_batch',
+     lambda: DifficultyProposal.save_batch([(1, 1, 3, 40, 0.2)], [1], [(1, 40, 8)]), ()),
+    ('DifficultyProposal.get_by_status', lambda: DifficultyProposal.get_by_status('pending'), ()),
+    ('DifficultyProposal.set_status', lambda: DifficultyProposal.set_status([1], 'accepted'), ()),
+    ('DifficultyProposal.apply_accepted', lambda: DifficultyProposal.apply_accepted(), ()),
+    # The question sampler reloads its id pools once after a write
+    ('QuizController.get_quiz_with_questions',
+     lambda: QuizController.get_quiz_with_questions(1, {'easy': 1}), ('questions',)),
+    ('QuizController.start_attempt', lambda: QuizController.start_attempt(1, 'Bình'), ()),
+    ('QuizController.submit_answers_bulk',
+     lambda: QuizController.submit_answers_bulk(2, {1: 1}, 30), ()),
+    ('Attempt.delete', lambda: Attempt.delete(2), ()),
+    ('Option.delete', lambda: Option.delete(2), ()),
+    ('Question.delete', lambda: Question.delete(1), ()),
+    ('Quiz.delete', lambda: Quiz.delete(1), ()),
+]
+
+
+def _create_sample_data():
+    question_id = Question.create('Python là gì?', 1, 'General')
+    Option.create(question_id, 'Một ngôn ngữ lập trình', True)
+    Option.create(question_id, 'Một loài rắn', False)
+    quiz_id = Quiz.create('Kiểm tra', 'Bài kiểm tra mẫu', 600, 1)
+    attempt_id = QuizController.start_attempt(quiz_id, 'An')
+    QuizController.submit_answers_bulk(attempt_id, {question_id: 1}, 60)
+
+
+def check_model_queries(checks=QUERY_CHECKS):
+    """Run the registered queries on a scratch database and return the plan problems found
+
+    The current database path and instrumentation are restored afterwards.
+    Each problem is a dict with scope, sql and plan (the offending plan line).
+    """
+    original_path = db.database_path
+    original_recorder = db.recorder
+    recorder = PlanRecorder()
+    directory = tempfile.mkdtemp()
+
+    try:
+        db.set_database_path(os.path.join(directory, 'query_plans.db'))
+        db.initialize_database()
+        _create_sample_data()
+
+        db.enable_instrumentation(recorder)
+        for name, call, _ in checks:
+            # Start cold so cached lookups still reach SQLite
+            question_cache.clear()
+            option_cache.clear()
+            with db.operation(name):
+                call()
+        db.disable_instrumentation()
+
+        conn = db.get_connection()
+        problems = find_plan_problems(conn, recorder, {name: allowed for name, _, allowed in checks})
+        for column in unindexed_foreign_keys(conn):
+            problems.append({'scope': 'schema', 'sql': column, 'plan': 'foreign key without index'})
+        return problems
+    finally:
+        if original_recorder is not None:
+            db.enable_instrumentation(original_recorder)
+        else:
+            db.disable_instrumentation()
+        db.set_database_path(original_path)
+        for name in os.listdir(directory):
+            os.remove(os.path.join(directory, name))
+        os.rmdir(directory)
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description='Check that model queries keep using indexes')
+    parser.parse_args()
+
+    problems = check_model_queries()
+    if problems:
+        for problem in problems:
+            print(f"❌ {problem['scope']}: {problem['plan']}")
+            print(f"   {problem['sql']}")
+        sys.exit(1)
+    print(f"✅ {len(QUERY_CHECKS)} model queries checked, no full scans of large tables")
+
+
+if __name__ == '__main__':
+    main()
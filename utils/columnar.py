@@ -0,0 +1,222 @@
+"""Compact columnar binary files built from array-backed columns
+
+Layout (Parquet-like): rows are buffered into row groups; each row group
+stores one contiguous block per column, and a JSON footer at the end of the
+file records the schema and where every block lives, so readers can load
+only the columns they need.
+
+    MAGIC | row group 1 | row group 2 | ... | footer JSON | footer length (u64 LE) | MAGIC
+
+Column kinds: 'int' (int64), 'float' (float64), 'bool' (int8) and 'str'.
+Strings are dictionary encoded per row group (int32 indexes into a list of
+distinct values stored as int64 end offsets + UTF-8 data), which keeps
+repeated names, categories and timestamps small. A column holding NULLs in a
+row group also stores one validity byte per row.
+"""
+import json
+import os
+import struct
+import sys
+from array import array
+from config import EXPORT_ROW_GROUP_SIZE
+
+MAGIC = b'QZCOL1\x00\x00'
+FORMAT_VERSION = 1
+TYPECODES = {'int': 'q', 'float': 'd', 'bool': 'b'}
+_FOOTER_LENGTH = struct.Struct('<Q')
+
+
+class _ColumnBuffer:
+    """Values of one column for the row group being built"""
+
+    def __init__(self, kind):
+        if kind != 'str' and kind not in TYPECODES:
+            raise ValueError(f"Unknown column kind: {kind!r}")
+        self.kind = kind
+        self.clear()
+
+    def clear(self):
+        self.validity = bytearray()
+        self.has_nulls = False
+        if self.kind == 'str':
+            self.indexes = array('i')
+            self.dictionary = {}
+            self.offsets = array('q')
+            self.data = bytearray()
+        else:
+            self.values = array(TYPECODES[self.kind])
+
+    def append(self, value):
+        if value is None:
+            self.has_nulls = True
+            self.validity.append(0)
+        else:
+            self.validity.append(1)
+
+        if self.kind == 'str':
+            value = '' if value is None else str(value)
+            index = self.dictionary.get(value)
+            if index is None:
+                index = self.dictionary[value] = len(self.dictionary)
+                self.data += value.encode('utf-8')
+                self.offsets.append(len(self.data))
+            self.indexes.append(index)
+        elif value is None:
+            self.values.append(0)
+        else:
+            self.values.append(bool(value) if self.kind == 'bool' else value)
+
+    def blocks(self):
+        """Byte blocks written for this column: validity, then values (or indexes, offsets, data)"""
+        blocks = [bytes(self.validity) if self.has_nulls else b'']
+        if self.kind == 'str':
+            blocks += [self.indexes.tobytes(), self.offsets.tobytes(), bytes(self.data)]
+        else:
+            blocks.append(self.values.tobytes())
+        return blocks
+
+
+class ColumnarWriter:
+    """Write rows (sequences in column order) to a columnar file, one row group at a time"""
+
+    def __init__(self, path, columns, row_group_size=EXPORT_ROW_GROUP_SIZE):
+        """columns: list of (name, kind) tuples"""
+        self.columns = list(columns)
+        self.row_group_size = row_group_size
+        self.row_groups = []
+        self.num_rows = 0
+        self._buffers = [_ColumnBuffer(kind) for _, kind in self.columns]
+        self._pending = 0
+        self.path = path
+        self._file = open(path, 'wb')
+        self._file.write(MAGIC)
+
+    def write_row(self, row):
+        for buffer, value in zip(self._buffers, row):
+            buffer.append(value)
+        self._pending += 1
+        if self._pending >= self.row_group_size:
+            self._flush_row_group()
+
+    def write_rows(self, rows):
+        for row in rows:
+            self.write_row(row)
+
+    def _flush_row_group(self):
+        if not self._pending:
+            return
+        group = {'rows': self._pending, 'columns': []}
+        for buffer in self._buffers:
+            locations = []
+            for block in buffer.blocks():
+                locations.append([self._file.tell(), len(block)])
+                self._file.write(block)
+            group['columns'].append(locations)
+            buffer.clear()
+        self.row_groups.append(group)
+        self.num_rows += self._pending
+        self._pending = 0
+
+    def close(self):
+        if self._file.closed:
+            return
+        self._flush_row_group()
+        footer = json.dumps({
+            'version': FORMAT_VERSION,
+            'byteorder': sys.byteorder,
+            'num_rows': self.num_rows,
+            'columns': [{'name': name, 'kind': kind} for name, kind in self.columns],
+            'row_groups': self.row_groups
+        }).encode('utf-8')
+        self._file.write(footer)
+        self._file.write(_FOOTER_LENGTH.pack(len(footer)))
+        self._file.write(MAGIC)
+        self._file.close()
+
+    def abort(self):
+        """Close without a footer and delete the partial file, so it is never read as complete"""
+        if self._file.closed:
+            return
+        self._file.close()
+        os.remove(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class ColumnarReader:
+    """Read a columnar file written by ColumnarWriter"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a columnar export file")
+            f.seek(-(len(MAGIC) + _FOOTER_LENGTH.size), 2)
+            (footer_length,) = _FOOTER_LENGTH.unpack(f.read(_FOOTER_LENGTH.size))
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is truncated (missing footer)")
+            f.seek(-(len(MAGIC) + _FOOTER_LENGTH.size + footer_length), 2)
+            footer = json.loads(f.read(footer_length).decode('utf-8'))
+
+        self.columns = [(column['name'], column['kind']) for column in footer['columns']]
+        self.num_rows = footer['num_rows']
+        self.row_groups = footer['row_groups']
+        self._swap = footer['byteorder'] != sys.byteorder
+
+    def iter_row_groups(self, columns=None):
+        """Yield {name: list of values} per row group, loading only the requested columns"""
+        names = [name for name, _ in self.columns]
+        wanted = names if columns is None else list(columns)
+        indexes = [names.index(name) for name in wanted]
+
+        with open(self.path, 'rb') as f:
+            for group in self.row_groups:
+                yield {
+                    names[index]: self._read_column(f, self.columns[index][1], group['columns'][index])
+                    for index in indexes
+                }
+
+    def iter_rows(self, columns=None):
+        """Yield one dict per row"""
+        for group in self.iter_row_groups(columns):
+            names = list(group)
+            for values in zip(*(group[name] for name in names)):
+                yield dict(zip(names, values))
+
+    def _read_column(self, f, kind, locations):
+        blocks = []
+        for offset, length in locations:
+            f.seek(offset)
+            blocks.append(f.read(length))
+
+        validity = blocks[0]
+        if kind == 'str':
+            data = blocks[3]
+            dictionary = []
+            start = 0
+            for end in self._array('q', blocks[2]):
+                dictionary.append(data[start:end].decode('utf-8'))
+                start = end
+            values = [dictionary[index] for index in self._array('i', blocks[1])]
+        else:
+            values = self._array(TYPECODES[kind], blocks[1]).tolist()
+            if kind == 'bool':
+                values = [bool(value) for value in values]
+
+        if validity:
+            values = [value if valid else None for value, valid in zip(values, validity)]
+        return values
+
+    def _array(self, typecode, block):
+        values = array(typecode)
+        values.frombytes(block)
+        if self._swap:
+            values.byteswap()
+        return values
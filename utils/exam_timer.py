@@ -0,0 +1,69 @@
+"""Monotonic exam countdown shared by the quiz view and the exam server
+
+Everything is derived from a deadline on time.monotonic(), so late or missed
+ticks never make the clock drift: a tick only decides when to redraw, not how
+much time is left.
+
+    timer = ExamTimer(quiz.time_limit)
+    root.after(timer.next_tick_delay_ms(), tick)   # redraw on the next second
+    root.after(timer.remaining_ms(), time_up)      # submit exactly at the deadline
+"""
+import math
+import time
+
+# Tick just after the displayed second changes rather than just before it
+TICK_SLACK = 0.005
+
+
+class ExamTimer:
+    """Countdown of `duration` seconds measured against a fixed deadline"""
+
+    def __init__(self, duration, clock=time.monotonic):
+        self.duration = duration
+        self.clock = clock
+        self.started = clock()
+        self.deadline = self.started + duration
+        self.stopped_at = None
+
+    def now(self):
+        """Current clock reading (frozen once the timer is stopped)"""
+        return self.stopped_at if self.stopped_at is not None else self.clock()
+
+    def stop(self):
+        """Freeze the timer, e.g. when the attempt is submitted"""
+        if self.stopped_at is None:
+            self.stopped_at = self.clock()
+
+    def remaining(self):
+        """Seconds left (float, never negative)"""
+        return max(0.0, self.deadline - self.now())
+
+    def remaining_seconds(self):
+        """Whole seconds to display (rounded up, so 0 only once time is up)"""
+        return math.ceil(self.remaining())
+
+    def remaining_ms(self):
+        """Milliseconds until the deadline, for scheduling the time-up callback"""
+        return math.ceil(self.remaining() * 1000)
+
+    def elapsed(self):
+        """Seconds since the start, capped at the duration"""
+        return min(self.now() - self.started, self.duration)
+
+    def elapsed_seconds(self):
+        """Whole seconds taken (stored as the attempt's time_taken)"""
+        return int(self.elapsed())
+
+    def expired(self, grace=0):
+        """True once the deadline (plus an optional grace period) has passed"""
+        return self.now() >= self.deadline + grace
+
+    def next_tick_delay(self):
+        """Seconds until the displayed value next changes (never past the deadline)"""
+        remaining = self.remaining()
+        fraction = remaining - math.floor(remaining)
+        return min((fraction or 1.0) + TICK_SLACK, remaining)
+
+    def next_tick_delay_ms(self):
+        """next_tick_delay() in whole milliseconds for Tk's after()"""
+        return max(1, math.ceil(self.next_tick_delay() * 1000))
@@ -0,0 +1,112 @@
+"""Stream attempts or answers to CSV, JSON Lines or a columnar binary file
+
+Usage:
+    python -m utils.export_results attempts results.csv [--quiz-id 1] [--include-incomplete]
+    python -m utils.export_results answers answers.jsonl
+    python -m utils.export_results answers answers.qcol
+
+Rows are fetched from SQLite in batches and written as they arrive, so memory
+use does not grow with the size of the history.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from database.connection import db
+from models.attempt import Attempt
+from utils.columnar import ColumnarWriter
+
+ATTEMPT_COLUMNS = [
+    ('id', 'int'), ('quiz_id', 'int'), ('quiz_title', 'str'), ('student_name', 'str'),
+    ('score', 'float'), ('total_questions', 'int'), ('correct_answers', 'int'),
+    ('time_taken', 'int'), ('started_at', 'str'), ('completed_at', 'str')
+]
+ANSWER_COLUMNS = [
+    ('id', 'int'), ('attempt_id', 'int'), ('quiz_id', 'int'), ('student_name', 'str'),
+    ('question_id', 'int'), ('difficulty', 'int'), ('category', 'str'),
+    ('selected_option_id', 'int'), ('is_correct', 'bool'), ('answered_at', 'str')
+]
+EXPORTS = {
+    'attempts': (ATTEMPT_COLUMNS, Attempt.iter_export_rows),
+    'answers': (ANSWER_COLUMNS, Attempt.iter_answer_export_rows)
+}
+FORMATS = {'.csv': 'csv', '.jsonl': 'jsonl', '.qcol': 'columnar'}
+
+
+def write_csv(rows, columns, path):
+    """Write rows as CSV with a header line"""
+    count = 0
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow([name for name, _ in columns])
+        for row in rows:
+            writer.writerow(tuple(row))
+            count += 1
+    return count
+
+
+def write_jsonl(rows, columns, path):
+    """Write rows as one JSON object per line"""
+    names = [name for name, _ in columns]
+    bool_columns = [index for index, (_, kind) in enumerate(columns) if kind == 'bool']
+    count = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        for row in rows:
+            values = list(row)
+            for index in bool_columns:
+                if values[index] is not None:
+                    values[index] = bool(values[index])
+            f.write(json.dumps(dict(zip(names, values)), ensure_ascii=False))
+            f.write('\n')
+            count += 1
+    return count
+
+
+def write_columnar(rows, columns, path):
+    """Write rows to a columnar file (see utils.columnar)"""
+    with ColumnarWriter(path, columns) as writer:
+        writer.write_rows(rows)
+    return writer.num_rows
+
+
+WRITERS = {'csv': write_csv, 'jsonl': write_jsonl, 'columnar': write_columnar}
+
+
+def export_results(kind, path, file_format=None, quiz_id=None, completed_only=True):
+    """Export attempts or answers to path; the format defaults to the file extension. Returns the row count"""
+    if kind not in EXPORTS:
+        raise ValueError(f"Unknown export: {kind!r} (use attempts or answers)")
+    if file_format is None:
+        file_format = FORMATS.get(os.path.splitext(path)[1].lower())
+    if file_format not in WRITERS:
+        raise ValueError(f"Unsupported format for {path} (use .csv, .jsonl or .qcol)")
+
+    columns, iter_rows = EXPORTS[kind]
+    return WRITERS[file_format](iter_rows(quiz_id, completed_only), columns, path)
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description='Export quiz results')
+    parser.add_argument('kind', choices=sorted(EXPORTS))
+    parser.add_argument('output', help='output file (.csv, .jsonl or .qcol)')
+    parser.add_argument('--format', choices=sorted(WRITERS), help='override the format detected from the extension')
+    parser.add_argument('--quiz-id', type=int, help='only export this quiz')
+    parser.add_argument('--include-incomplete', action='store_true', help='also export unfinished attempts')
+    args = parser.parse_args()
+
+    db.initialize_database()
+    started = time.perf_counter()
+    try:
+        count = export_results(args.kind, args.output, args.format, args.quiz_id,
+                               completed_only=not args.include_incomplete)
+    except (OSError, ValueError) as e:
+        print(f"❌ Export failed: {e}")
+        sys.exit(1)
+    print(f"✅ Exported {count} {args.kind} to {args.output} in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""Bulk import questions from JSON Lines or CSV
+
+Usage:
+    python -m utils.import_questions questions.jsonl [--format jsonl|csv] [--chunk-size 5000]
+
+JSON Lines: one object per line
+    {"question_text": "...", "difficulty": 1, "category": "Python",
+     "options": [{"text": "...", "is_correct": true}, {"text": "...", "is_correct": false}]}
+
+CSV: header row with question_text, difficulty, category, correct and option_1..option_N
+    columns; `correct` is the 1-based number of the correct option.
+
+Difficulty may be 1/2/3 or easy/medium/hard.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from database.connection import db
+from controllers.question_bank_controller import QuestionBankController
+from config import DIFFICULTY_LEVELS, QUESTION_IMPORT_CHUNK_SIZE
+
+
+def parse_difficulty(value):
+    """Map 1/2/3, "1"/"2"/"3" or easy/medium/hard to the stored difficulty level"""
+    if isinstance(value, str):
+        value = value.strip().lower()
+        if value in DIFFICULTY_LEVELS:
+            return DIFFICULTY_LEVELS[value]
+        if value.isdigit():
+            return int(value)
+    return value
+
+
+def read_jsonl(f):
+    """Yield (question_text, difficulty, category, options_data) from a JSON Lines stream"""
+    for line_number, line in enumerate(f, start=1):
+        if not line.strip():
+            continue
+        try:
+            item = json.loads(line)
+            options_data = []
+            for option in item.get('options', []):
+                if isinstance(option, dict):
+                    options_data.append((option.get('text'), bool(option.get('is_correct'))))
+                else:
+                    option_text, is_correct = option
+                    options_data.append((option_text, bool(is_correct)))
+            yield (item.get('question_text'), parse_difficulty(item.get('difficulty')),
+                   item.get('category') or 'General', options_data)
+        except (ValueError, TypeError, AttributeError) as e:
+            raise ValueError(f"Line {line_number}: invalid record ({e})") from e
+
+
+def read_csv(f):
+    """Yield (question_text, difficulty, category, options_data) from a CSV stream"""
+    reader = csv.DictReader(f)
+    option_columns = sorted((name for name in reader.fieldnames or [] if name.startswith('option_')),
+                            key=lambda name: int(name.split('_', 1)[1]))
+    if not option_columns:
+        raise ValueError("CSV header must contain option_1, option_2, ... columns")
+
+    for row in reader:
+        try:
+            correct = int(row.get('correct') or 0)
+        except ValueError as e:
+            raise ValueError(f"Line {reader.line_num}: invalid correct option number") from e
+
+        options_data = [(row[name], number == correct)
+                        for number, name in enumerate(option_columns, start=1) if row.get(name)]
+        yield (row.get('question_text'), parse_difficulty(row.get('difficulty')),
+               row.get('category') or 'General', options_data)
+
+
+READERS = {'jsonl': read_jsonl, 'csv': read_csv}
+
+
+def import_file(path, file_format=None, chunk_size=QUESTION_IMPORT_CHUNK_SIZE, progress=None):
+    """Import a JSON Lines or CSV file; the format defaults to the file extension"""
+    if file_format is None:
+        extension = os.path.splitext(path)[1].lower().lstrip('.')
+        file_format = 'jsonl' if extension in ('jsonl', 'json', 'ndjson') else extension
+    if file_format not in READERS:
+        raise ValueError(f"Unsupported format: {file_format!r} (use jsonl or csv)")
+
+    db.initialize_database()
+    with open(path, encoding='utf-8', newline='') as f:
+        return QuestionBankController.import_questions(READERS[file_format](f), chunk_size, progress)
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description='Bulk import questions into the question bank')
+    parser.add_argument('path', help='JSON Lines (.jsonl) or CSV (.csv) file')
+    parser.add_argument('--format', choices=sorted(READERS), help='override the format detected from the extension')
+    parser.add_argument('--chunk-size', type=int, default=QUESTION_IMPORT_CHUNK_SIZE,
+                        help='questions per transaction')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+
+    def progress(imported, processed):
+        print(f"⏳ {imported} imported / {processed} read ({time.perf_counter() - started:.1f}s)")
+
+    try:
+        result = import_file(args.path, args.format, args.chunk_size, progress)
+    except (OSError, ValueError) as e:
+        print(f"❌ Import failed: {e}")
+        sys.exit(1)
+
+    for error in result['errors'][:20]:
+        print(f"⚠️ Record {error['record']}: {error['error']}")
+    if len(result['errors']) > 20:
+        print(f"⚠️ ... {len(result['errors']) - 20} more invalid records")
+    print(f"✅ Imported {result['imported']} of {result['total_records']} questions "
+          f"in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
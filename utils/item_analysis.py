@@ -0,0 +1,195 @@
+"""Item analysis of completed attempts (classical test theory, vectorized with NumPy)
+
+Answers are loaded once as parallel arrays, one entry per attempt_answers row,
+rather than as a dense attempt × question matrix: every attempt draws its own
+questions, so that matrix would be almost empty. Per-question, per-option and
+per-quiz sums are then taken with np.bincount in a single pass:
+
+- p-value: share of correct answers (higher is easier)
+- discrimination: point-biserial correlation between an answer and the score
+  of the rest of the attempt
+- distractor efficiency: share of a question's wrong options chosen by at
+  least DISTRACTOR_MIN_RATE of the examinees
+- alpha: Cronbach's alpha per quiz (KR-20 for right/wrong items)
+"""
+import numpy as np
+from models.attempt import Attempt
+from models.option import Option
+from config import ANALYSIS_BATCH_SIZE, DISTRACTOR_MIN_RATE
+
+
+def _ratio(numerator, denominator):
+    """numerator / denominator, NaN where the denominator is not positive"""
+    return np.divide(numerator, denominator, out=np.full(len(numerator), np.nan),
+                     where=denominator > 0)
+
+
+def _to_list(values):
+    """Array to list with NaN replaced by None"""
+    return [None if value != value else value for value in values.tolist()]
+
+
+class ItemAnalysis:
+    """Question, option and quiz statistics computed from the answers of completed attempts
+
+    Results are arrays aligned with question_ids, option_ids and quiz_ids
+    (NaN where a statistic is undefined, e.g. a question everybody got right
+    has no discrimination).
+    """
+
+    def __init__(self, attempt_ids, quiz_ids, question_ids, selected_option_ids, is_correct,
+                 option_ids, option_question_ids, option_is_correct,
+                 distractor_min_rate=DISTRACTOR_MIN_RATE):
+        attempt_ids = np.asarray(attempt_ids, dtype=np.int64)
+        quiz_ids = np.asarray(quiz_ids, dtype=np.int64)
+        selected_option_ids = np.asarray(selected_option_ids, dtype=np.int64)
+        correct = np.asarray(is_correct, dtype=np.float64)
+
+        self.question_ids, question_index = np.unique(np.asarray(question_ids, dtype=np.int64),
+                                                      return_inverse=True)
+        _, attempt_index = np.unique(attempt_ids, return_inverse=True)
+        question_count = len(self.question_ids)
+
+        # Difficulty
+        self.answer_counts = np.bincount(question_index, minlength=question_count)
+        self.correct_counts = np.bincount(question_index, weights=correct, minlength=question_count)
+        self.p_values = _ratio(self.correct_counts, self.answer_counts)
+
+        # Discrimination, against the share of the attempt's other questions answered correctly
+        attempt_sizes = np.bincount(attempt_index)
+        attempt_scores = np.bincount(attempt_index, weights=correct)
+        others = attempt_sizes[attempt_index] - 1
+        rest = np.divide(attempt_scores[attempt_index] - correct, others,
+                         out=np.zeros_like(correct), where=others > 0)
+        used = (others > 0).astype(np.float64)
+
+        def per_question(weights):
+            return np.bincount(question_index, weights=weights, minlength=question_count)
+
+        n = per_question(used)
+        sum_x = per_question(correct * used)
+        sum_y = per_question(rest)
+        sum_xy = per_question(correct * rest)
+        sum_yy = per_question(rest * rest)
+        # x is 0/1, so sum(x²) == sum(x)
+        spread = np.maximum(n * sum_x - sum_x * sum_x, 0) * np.maximum(n * sum_yy - sum_y * sum_y, 0)
+        self.discrimination = _ratio(n * sum_xy - sum_x * sum_y, np.sqrt(spread))
+
+        self._analyze_options(selected_option_ids, option_ids, option_question_ids,
+                              option_is_correct, distractor_min_rate)
+        self._analyze_quizzes(quiz_ids, attempt_index, question_index, attempt_sizes, attempt_scores)
+
+    def _analyze_options(self, selected_option_ids, option_ids, option_question_ids,
+                         option_is_correct, distractor_min_rate):
+        option_ids = np.asarray(option_ids, dtype=np.int64)
+        option_question_ids = np.asarray(option_question_ids, dtype=np.int64)
+        option_is_correct = np.asarray(option_is_correct, dtype=bool)
+        question_count = len(self.question_ids)
+
+        # Keep the options of analyzed questions, in id order
+        order = np.argsort(option_ids)
+        option_ids, option_question_ids = option_ids[order], option_question_ids[order]
+        option_is_correct = option_is_correct[order]
+        position = np.searchsorted(self.question_ids, option_question_ids)
+        position[position == question_count] = 0
+        analyzed = (self.question_ids[position] == option_question_ids) if question_count else \
+            np.zeros(len(option_ids), dtype=bool)
+
+        self.option_ids = option_ids[analyzed]
+        self.option_question_ids = option_question_ids[analyzed]
+        self.option_is_correct = option_is_correct[analyzed]
+        option_question_index = position[analyzed]
+        option_count = len(self.option_ids)
+
+        # Selections (unanswered questions and deleted options are skipped)
+        chosen = selected_option_ids[selected_option_ids >= 0]
+        chosen_index = np.searchsorted(self.option_ids, chosen)
+        chosen_index[chosen_index == option_count] = 0
+        known = (self.option_ids[chosen_index] == chosen) if option_count else \
+            np.zeros(len(chosen), dtype=bool)
+        self.option_counts = np.bincount(chosen_index[known], minlength=option_count)
+        self.option_rates = _ratio(self.option_counts, self.answer_counts[option_question_index])
+
+        distractors = ~self.option_is_correct
+        self.functional_distractors = distractors & (self.option_rates >= distractor_min_rate)
+        self.distractor_efficiency = _ratio(
+            np.bincount(option_question_index, weights=self.functional_distractors, minlength=question_count),
+            np.bincount(option_question_index, weights=distractors, minlength=question_count))
+
+    def _analyze_quizzes(self, quiz_ids, attempt_index, question_index, attempt_sizes, attempt_scores):
+        # Every answer of an attempt carries the same quiz id
+        attempt_quiz_ids = np.zeros(len(attempt_sizes), dtype=np.int64)
+        attempt_quiz_ids[attempt_index] = quiz_ids
+        self.quiz_ids, quiz_index = np.unique(attempt_quiz_ids, return_inverse=True)
+        quiz_count = len(self.quiz_ids)
+
+        # Attempts draw different questions, so the item-variance term is the
+        # mean over attempts of the variances of the items each one answered;
+        # with a fixed question set this is exactly KR-20
+        item_variances = self.p_values * (1 - self.p_values)
+        attempt_item_variance = np.bincount(attempt_index, weights=item_variances[question_index],
+                                            minlength=len(attempt_sizes))
+
+        def per_quiz(weights):
+            return np.bincount(quiz_index, weights=weights, minlength=quiz_count)
+
+        self.quiz_attempts = np.bincount(quiz_index, minlength=quiz_count)
+        attempts = self.quiz_attempts.astype(np.float64)
+        items = _ratio(per_quiz(attempt_sizes.astype(np.float64)), attempts)
+        item_variance = _ratio(per_quiz(attempt_item_variance), attempts)
+        mean_score = _ratio(per_quiz(attempt_scores), attempts)
+        score_variance = _ratio(per_quiz(attempt_scores * attempt_scores), attempts) - mean_score ** 2
+
+        valid = (attempts > 1) & (items > 1) & (score_variance > 1e-12)
+        self.alpha = np.full(quiz_count, np.nan)
+        self.alpha[valid] = (items[valid] / (items[valid] - 1)
+                             * (1 - item_variance[valid] / score_variance[valid]))
+
+    @classmethod
+    def load(cls, quiz_id=None, batch_size=ANALYSIS_BATCH_SIZE):
+        """Analyze the completed attempts of one quiz (or of every quiz)"""
+        batches = [np.array(rows, dtype=np.int64)
+                   for rows in Attempt.iter_response_batches(quiz_id, batch_size)]
+        answers = np.concatenate(batches) if batches else np.empty((0, 5), dtype=np.int64)
+        options = np.array(Option.get_key_rows(), dtype=np.int64).reshape(-1, 3)
+        return cls(answers[:, 0], answers[:, 1], answers[:, 2], answers[:, 3], answers[:, 4],
+                   options[:, 0], options[:, 1], options[:, 2])
+
+    def question_report(self):
+        """[{question_id, answer_count, p_value, discrimination, distractor_efficiency}] (None when undefined)"""
+        columns = zip(self.question_ids.tolist(), self.answer_counts.tolist(), _to_list(self.p_values),
+                      _to_list(self.discrimination), _to_list(self.distractor_efficiency))
+        return [
+            {
+                'question_id': question_id,
+                'answer_count': answer_count,
+                'p_value': p_value,
+                'discrimination': discrimination,
+                'distractor_efficiency': distractor_efficiency
+            }
+            for question_id, answer_count, p_value, discrimination, distractor_efficiency in columns
+        ]
+
+    def option_report(self):
+        """{question_id: [{option_id, is_correct, selection_count, selection_rate, functional}]}"""
+        report = {question_id: [] for question_id in self.question_ids.tolist()}
+        columns = zip(self.option_ids.tolist(), self.option_question_ids.tolist(),
+                      self.option_is_correct.tolist(), self.option_counts.tolist(),
+                      _to_list(self.option_rates), self.functional_distractors.tolist())
+        for option_id, question_id, is_correct, count, rate, functional in columns:
+            report[question_id].append({
+                'option_id': option_id,
+                'is_correct': is_correct,
+                'selection_count': count,
+                'selection_rate': rate,
+                'functional': functional
+            })
+        return report
+
+    def quiz_report(self):
+        """{quiz_id: {'attempts': n, 'alpha': Cronbach's alpha or None}}"""
+        return {
+            quiz_id: {'attempts': attempts, 'alpha': alpha}
+            for quiz_id, attempts, alpha in zip(self.quiz_ids.tolist(), self.quiz_attempts.tolist(),
+                                                _to_list(self.alpha))
+        }
@@ -0,0 +1,39 @@
+"""Rebuild precomputed statistics tables
+
+Usage:
+    python -m utils.rebuild_stats [--check]
+"""
+import argparse
+import sys
+from database.connection import db
+
+
+def rebuild_statistics():
+    """Recompute every summary table from the raw answer history"""
+    db.initialize_database()
+    db.rebuild_question_stats()
+    db.rebuild_quiz_stats()
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description='Rebuild precomputed statistics tables')
+    parser.add_argument('--check', action='store_true',
+                        help='only report quizzes whose aggregates are out of date')
+    args = parser.parse_args()
+
+    if args.check:
+        db.initialize_database()
+        stale = db.check_quiz_stats()
+        if stale:
+            print(f"⚠️ Quiz statistics out of date for quizzes: {', '.join(map(str, stale))}")
+            sys.exit(1)
+        print("✅ Quiz statistics are consistent")
+        return
+
+    rebuild_statistics()
+    print("✅ Question and quiz statistics rebuilt")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+"""Recalibrate question difficulty from answer statistics
+
+The job is incremental: triggers on question_stats queue every question whose
+answer counters change (new answers, answers deleted with abandoned attempts,
+regraded answers) in recalibration_queue, and a run only reads the queued
+questions, so a nightly run costs what the day changed. Suggested levels
+go to difficulty_proposals for review; accepted ones are applied in one
+transaction.
+
+Usage:
+    python -m utils.recalibrate_difficulty run
+    python -m utils.recalibrate_difficulty list [--status pending]
+    python -m utils.recalibrate_difficulty accept 12 15 | --all
+    python -m utils.recalibrate_difficulty reject 17
+    python -m utils.recalibrate_difficulty apply
+"""
+import argparse
+import sys
+from database.connection import db
+from models.difficulty_proposal import DifficultyProposal, PROPOSAL_STATUSES
+from config import (DB_FETCH_BATCH_SIZE, DIFFICULTY_LEVELS, RECALIBRATION_MIN_ANSWERS,
+                    RECALIBRATION_EASY_RATE, RECALIBRATION_HARD_RATE, RECALIBRATION_MARGIN)
+
+DIFFICULTY_NAMES = {level: name for name, level in DIFFICULTY_LEVELS.items()}
+
+
+def success_rate(total_answers, correct_count):
+    """Smoothed share of correct answers (one imaginary right and one wrong answer)"""
+    return (correct_count + 1) / (total_answers + 2)
+
+
+def suggest_difficulty(current, total_answers, correct_count, min_answers=RECALIBRATION_MIN_ANSWERS,
+                       easy_rate=RECALIBRATION_EASY_RATE, hard_rate=RECALIBRATION_HARD_RATE,
+                       margin=RECALIBRATION_MARGIN):
+    """Level matching the observed success rate, or `current` when the evidence is too weak
+
+    A question only leaves its level when the rate is past the level's bounds by
+    more than `margin`, so questions close to a threshold do not flip every night.
+    """
+    if total_answers < min_answers:
+        return current
+
+    rate = success_rate(total_answers, correct_count)
+    lower, upper = {1: (easy_rate, 1.0), 2: (hard_rate, easy_rate), 3: (0.0, hard_rate)}[current]
+    if lower - margin <= rate < upper + margin:
+        return current
+    if rate >= easy_rate:
+        return 1
+    return 2 if rate >= hard_rate else 3
+
+
+def recalibrate(batch_size=DB_FETCH_BATCH_SIZE):
+    """Propose new levels for the questions whose answers changed since the last run
+
+    Returns {'questions': checked, 'proposed': changes suggested, 'queued': left for the next run}.
+    """
+    DifficultyProposal.drop_deleted_from_queue()
+
+    checked = proposed = 0
+    last_question_id = 0
+    # Keyset batches: questions queued again while the job runs wait for the next run
+    while True:
+        rows = DifficultyProposal.get_queued_batch(last_question_id, batch_size)
+        if not rows:
+            break
+        proposals, unchanged, processed = [], [], []
+        for row in rows:
+            checked += 1
+            current = row['difficulty']
+            level = suggest_difficulty(current, row['total_answers'], row['correct_count'])
+            if level == current:
+                unchanged.append(row['question_id'])
+            else:
+                proposals.append((row['question_id'], current, level, row['total_answers'],
+                                  success_rate(row['total_answers'], row['correct_count'])))
+                proposed += 1
+            processed.append((row['question_id'], row['total_answers'], row['correct_count']))
+        DifficultyProposal.save_batch(proposals, unchanged, processed)
+        last_question_id = rows[-1]['question_id']
+
+    return {'questions': checked, 'proposed': proposed, 'queued': DifficultyProposal.count_queued()}
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description='Recalibrate question difficulty from answer statistics')
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('run', help='propose levels for questions whose answers changed since the last run')
+    list_parser = commands.add_parser('list', help='show proposals')
+    list_parser.add_argument('--status', choices=PROPOSAL_STATUSES, default='pending')
+    accept_parser = commands.add_parser('accept', help='accept proposals')
+    accept_parser.add_argument('question_ids', type=int, nargs='*')
+    accept_parser.add_argument('--all', action='store_true', help='accept every pending proposal')
+    reject_parser = commands.add_parser('reject', help='reject proposals')
+    reject_parser.add_argument('question_ids', type=int, nargs='+')
+    commands.add_parser('apply', help='write accepted levels to the questions')
+    args = parser.parse_args()
+
+    db.initialize_database()
+    if args.command == 'run':
+        result = recalibrate()
+        print(f"✅ Checked {result['questions']} questions, {result['proposed']} new proposals "
+              f"({result['queued']} changed meanwhile, left for the next run)")
+    elif args.command == 'list':
+        proposals = DifficultyProposal.get_by_status(args.status)
+        for proposal in proposals:
+            print(f"#{proposal.question_id}: {DIFFICULTY_NAMES[proposal.current_difficulty]} → "
+                  f"{DIFFICULTY_NAMES[proposal.proposed_difficulty]} "
+                  f"({proposal.success_rate * 100:.1f}% correct, {proposal.total_answers} answers)")
+        print(f"📋 {len(proposals)} {args.status} proposals")
+    elif args.command == 'accept':
+        if not args.all and not args.question_ids:
+            print("❌ Give question ids or --all")
+            sys.exit(1)
+        count = DifficultyProposal.accept_all_pending() if args.all else \
+            DifficultyProposal.set_status(args.question_ids, 'accepted')
+        print(f"✅ Accepted {count} proposals")
+    elif args.command == 'reject':
+        print(f"✅ Rejected {DifficultyProposal.set_status(args.question_ids, 'rejected')} proposals")
+    else:
+        print(f"✅ Updated the difficulty of {DifficultyProposal.apply_accepted()} questions")
+        stale = DifficultyProposal.get_by_status('stale')
+        if stale:
+            print(f"⚠️ {len(stale)} proposals are stale (level changed since proposed), see list --status stale")
+
+
+if __name__ == '__main__':
+    main()
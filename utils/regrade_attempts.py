@@ -0,0 +1,28 @@
+"""Grade saved answers again after an answer key correction
+
+Answers are streamed from attempt_answers, graded against the in-memory
+answer key and only the ones whose result changed are written back, together
+with the score of their completed attempts, in one transaction.
+
+Usage:
+    python -m utils.regrade_attempts            # every saved answer
+    python -m utils.regrade_attempts 12 15      # answers to questions 12 and 15
+"""
+import argparse
+from database.connection import db
+from controllers.quiz_controller import QuizController
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description='Grade saved answers again after an answer key correction')
+    parser.add_argument('question_ids', type=int, nargs='*', help='only regrade answers to these questions')
+    args = parser.parse_args()
+
+    db.initialize_database()
+    result = QuizController.regrade_attempts(args.question_ids or None)
+    print(f"✅ {result['answers']} answers changed, {result['attempts']} completed attempts rescored")
+
+
+if __name__ == '__main__':
+    main()
@@ -215,18 +215,13 @@ def create_sample_questions_and_quizzes():
          [("Có thể truy cập bằng tên field", True), ("Mutable", False), ("Nhanh hơn", False), ("Tiết kiệm memory hơn", False)]),
     ]
     
-    # Add questions to database
-    for q_text, diff, cat, options in sample_questions:
-        try:
-            QuestionBankController.add_question_with_options(q_text, diff, cat, options)
-        except Exception:
-            # Skip if question already exists
-            pass
+    # Add questions to database in a single transaction
+    result = QuestionBankController.import_questions(sample_questions)
     
     # Không tạo quiz trước - quiz sẽ được tạo động mỗi khi bắt đầu làm bài
     # Điều này đảm bảo mỗi lần thi sẽ có bộ câu hỏi ngẫu nhiên khác nhau
     
     return {
-        'questions_count': len(sample_questions),
+        'questions_count': result['imported'],
         'quizzes_count': 0  # Quiz được tạo động khi làm bài
     }
@@ -0,0 +1,142 @@
+"""Background task executor for the tkinter views
+
+Database work runs on a small thread pool; results are put on a queue that
+the Tk main loop polls with root.after, so callbacks always run on the UI
+thread and the window keeps repainting (and the exam timer keeps ticking)
+while a query runs.
+
+    task_executor.submit(QuizController.get_attempt_review, attempt_id,
+                         on_success=self.render_review, owner=self)
+
+Cancelled tasks (e.g. after the user navigates away) never call back; a
+read-only task submitted with interruptible=True also has its running query
+interrupted. Writes are left to finish so an attempt is never half-saved.
+"""
+import queue
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+from database.connection import db
+from config import UI_WORKERS, UI_POLL_INTERVAL_MS
+
+PROGRESS_CHECK_STEPS = 10000
+
+
+class TaskHandle:
+    """A submitted task; cancel() drops its result"""
+
+    def __init__(self, owner=None, interruptible=False):
+        self.owner = owner
+        self.interruptible = interruptible
+        self.cancelled = False
+        self.done = False
+
+    def cancel(self):
+        """Drop the result (an interruptible task also aborts its running query)"""
+        self.cancelled = True
+
+
+class TaskExecutor:
+    """Thread pool whose results are delivered on the Tk thread through a queue"""
+
+    def __init__(self, workers=UI_WORKERS, poll_interval=UI_POLL_INTERVAL_MS):
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.root = None
+        self._pool = None
+        self._results = queue.Queue()
+        self._pending = set()
+        self._polling = False
+
+    def attach(self, root):
+        """Deliver results through this Tk root's event loop"""
+        self.root = root
+
+    def submit(self, func, *args, on_success=None, on_error=None, owner=None, operation=None,
+               interruptible=False, **kwargs):
+        """
+        Run func(*args, **kwargs) on a worker thread
+
+        on_success(result) / on_error(exception) are called on the UI thread.
+        owner: object the task belongs to (usually the view), for cancel_all(owner)
+        operation: optional instrumentation scope name (see db.operation)
+        interruptible: True for read-only tasks whose query may be aborted on cancel
+        """
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='ui-task')
+
+        handle = TaskHandle(owner, interruptible)
+        self._pending.add(handle)
+        self._pool.submit(self._run, handle, func, args, kwargs, on_success, on_error, operation)
+        self._schedule_poll()
+        return handle
+
+    def cancel_all(self, owner=None):
+        """Cancel every pending task, or only those of one owner"""
+        for handle in list(self._pending):
+            if owner is None or handle.owner is owner:
+                handle.cancel()
+
+    def _run(self, handle, func, args, kwargs, on_success, on_error, operation):
+        if handle.cancelled:
+            self._results.put((handle, None, None, None))
+            return
+
+        conn = None
+        try:
+            if handle.interruptible:
+                # SQLite calls this every few thousand VM steps; non-zero aborts the query
+                conn = db.get_connection()
+                conn.set_progress_handler(lambda: handle.cancelled, PROGRESS_CHECK_STEPS)
+            with db.operation(operation) if operation else nullcontext():
+                result = func(*args, **kwargs)
+            outcome = (handle, on_success, result, None)
+        except Exception as e:
+            outcome = (handle, on_error, None, e)
+        finally:
+            if conn is not None:
+                conn.set_progress_handler(None, 0)
+        self._results.put(outcome)
+
+    def process_results(self):
+        """Run the callbacks of finished tasks (called on the UI thread)"""
+        while True:
+            try:
+                handle, callback, result, error = self._results.get_nowait()
+            except queue.Empty:
+                break
+
+            handle.done = True
+            self._pending.discard(handle)
+            if handle.cancelled:
+                continue
+            if error is not None:
+                if callback:
+                    callback(error)
+                else:
+                    print(f"⚠️ Background task failed: {error}")
+            elif callback:
+                callback(result)
+
+    def _schedule_poll(self):
+        # Poll only while tasks are outstanding
+        if self._polling or self.root is None:
+            return
+        self._polling = True
+        self.root.after(self.poll_interval, self._poll)
+
+    def _poll(self):
+        self._polling = False
+        self.process_results()
+        if self._pending:
+            self._schedule_poll()
+
+    def shutdown(self):
+        """Cancel outstanding tasks and stop the worker threads"""
+        self.cancel_all()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
+
+
+# Create global executor instance (attached to the Tk root in main.py)
+task_executor = TaskExecutor()
@@ -4,10 +4,110 @@ from tkinter import messagebox, simpledialog
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 from controllers.question_bank_controller import QuestionBankController
-from models.question import Question
+from utils.task_executor import task_executor
 from config import FONT_FAMILY
 
 
+MIN_ROW_HEIGHT = 100  # lower bound of a row's height, sizes the pool of row widgets
+PAGE_SIZE = 50        # questions fetched per database page
+MAX_CACHED_PAGES = 6  # pages kept in memory while scrolling
+
+
+class QuestionRow:
+    """Reusable widget for one question row of the virtualized list"""
+
+    difficulty_text = {1: "Dễ", 2: "Trung bình", 3: "Khó"}
+    difficulty_style = {1: "success", 2: "warning", 3: "danger"}
+
+    def __init__(self, parent, view):
+        self.view = view
+        self.question = None
+        self.visible = False
+
+        # Card grows with its content; the list measures rows after binding them
+        self.card = ttk.Frame(parent, bootstyle="light")
+
+        inner = ttk.Frame(self.card, relief=tk.SOLID, borderwidth=1)
+        inner.pack(fill=tk.BOTH, expand=True, pady=4, padx=5)
+
+        # Question header with badges
+        header = ttk.Frame(inner)
+        header.pack(fill=tk.X, padx=15, pady=(8, 4))
+
+        self.id_label = ttk.Label(header, font=(FONT_FAMILY, 10, 'bold'), bootstyle="secondary")
+        self.id_label.pack(side=tk.LEFT, padx=(0, 10))
+
+        self.difficulty_label = ttk.Label(header, font=(FONT_FAMILY, 9))
+        self.difficulty_label.pack(side=tk.LEFT, padx=5)
+
+        self.category_label = ttk.Label(header, font=(FONT_FAMILY, 9), bootstyle="info")
+        self.category_label.pack(side=tk.LEFT, padx=5)
+
+        # Action buttons
+        btn_frame = ttk.Frame(header)
+        btn_frame.pack(side=tk.RIGHT)
+
+        ttk.Button(btn_frame, text="Sửa",
+                  command=lambda: self.view.edit_question(self.question),
+                  bootstyle="info-outline",
+                  width=10).pack(side=tk.LEFT, padx=3)
+
+        ttk.Button(btn_frame, text="Xóa",
+                  command=lambda: self.view.delete_question(self.question),
+                  bootstyle="danger-outline",
+                  width=10).pack(side=tk.LEFT, padx=3)
+
+        # Question text
+        self.text_label = ttk.Label(inner, font=(FONT_FAMILY, 11), wraplength=800)
+        self.text_label.pack(anchor=tk.W, padx=15, pady=4)
+
+        # Option labels are created on demand and reused
+        self.options_frame = ttk.Frame(inner)
+        self.options_frame.pack(fill=tk.X, padx=15)
+        self.option_labels = []
+
+    def show(self, data):
+        """Bind the row to a question and display it"""
+        question = data['question']
+        self.question = question
+
+        self.id_label.config(text=f"#{question.id}")
+        self.difficulty_label.config(text=self.difficulty_text.get(question.difficulty, ""),
+                                     bootstyle=self.difficulty_style.get(question.difficulty, "secondary"))
+        self.category_label.config(text=f"📁 {question.category}")
+        text = question.question_text
+        self.text_label.config(text=text[:200] + "..." if len(text) > 200 else text)
+
+        options = data['options']
+        while len(self.option_labels) < len(options):
+            self.option_labels.append(ttk.Label(self.options_frame, wraplength=760, justify=tk.LEFT))
+
+        for i, label in enumerate(self.option_labels):
+            if i >= len(options):
+                label.pack_forget()
+                continue
+            option = options[i]
+            if option.is_correct:
+                label.config(text=f"{chr(65+i)}. ✓ {option.option_text}",
+                             font=(FONT_FAMILY, 10, 'bold'), bootstyle="success")
+            else:
+                label.config(text=f"{chr(65+i)}. {option.option_text}",
+                             font=(FONT_FAMILY, 10), bootstyle="secondary")
+            label.pack(anchor=tk.W, padx=20)
+
+        # Hidden rows are always at the end of the pool, so packing keeps the order
+        if not self.visible:
+            self.card.pack(fill=tk.X)
+            self.visible = True
+
+    def hide(self):
+        """Hide the row (it stays available for reuse)"""
+        self.question = None
+        if self.visible:
+            self.card.pack_forget()
+            self.visible = False
+
+
 class QuestionBankView:
     """View for managing question bank"""
 
@@ -60,144 +160,185 @@ class QuestionBankView:
         self.questions_container = ttk.Frame(container)
         self.questions_container.pack(fill=tk.BOTH, expand=True)
         
+        self.create_virtual_list()
         self.display_questions()
 
     def filter_questions(self):
         """Filter questions by difficulty"""
         self.display_questions()
 
-    def display_questions(self):
-        """Display filtered questions"""
-        for widget in self.questions_container.winfo_children():
-            widget.destroy()
-        
-        # Get questions
-        difficulty = self.difficulty_var.get()
-        if difficulty == "all":
-            questions_data = QuestionBankController.get_all_questions_with_options()
-        else:
-            questions = Question.get_by_difficulty(int(difficulty))
-            questions_data = []
-            for q in questions:
-                from models.option import Option
-                options = Option.get_by_question(q.id)
-                questions_data.append({'question': q, 'options': options})
-        
-        if not questions_data:
-            empty_frame = ttk.Frame(self.questions_container)
-            empty_frame.pack(expand=True)
-            
-            ttk.Label(empty_frame, text="📋",
-                     font=(FONT_FAMILY, 48)).pack(pady=20)
-            ttk.Label(empty_frame,
-                     text="Không có câu hỏi nào",
-                     font=(FONT_FAMILY, 14)).pack(pady=10)
-            return
-        
-        # Create scrollable frame
-        canvas = tk.Canvas(self.questions_container)
-        scrollbar = ttk.Scrollbar(self.questions_container, orient=tk.VERTICAL, command=canvas.yview)
-        scrollable_frame = ttk.Frame(canvas)
-        
-        scrollable_frame.bind(
-            "<Configure>",
-            lambda e: canvas.configure(scrollregion=canvas.bbox("all"))
-        )
-        
-        canvas.create_window((0, 0), window=scrollable_frame, anchor=tk.NW)
-        canvas.configure(yscrollcommand=scrollbar.set)
-        
-        # Enable mousewheel scrolling only when hovering over canvas
+    def create_virtual_list(self):
+        """Create the viewport, scrollbar and empty-state widgets of the question list
+
+        Only as many rows as fit in the viewport are created; scrolling rebinds
+        them to other questions instead of creating new widgets.
+        """
+        self.rows = []
+        self.first_index = 0
+        self.fitting_rows = 1
+        self.total_count = 0
+        self.page_cache = {}
+        self.page_last_ids = {}
+        self.loading_pages = set()
+
+        self.scrollbar = ttk.Scrollbar(self.questions_container, orient=tk.VERTICAL,
+                                       command=self.on_scrollbar)
+        self.viewport = ttk.Frame(self.questions_container)
+        self.viewport.pack_propagate(False)
+
+        self.empty_frame = ttk.Frame(self.questions_container)
+        ttk.Label(self.empty_frame, text="📋",
+                 font=(FONT_FAMILY, 48)).pack(pady=20)
+        ttk.Label(self.empty_frame,
+                 text="Không có câu hỏi nào",
+                 font=(FONT_FAMILY, 14)).pack(pady=10)
+
+        self.viewport.bind("<Configure>", lambda e: self.render_rows())
+
+        # Enable mousewheel scrolling only when hovering over the list
         def _on_mousewheel(event):
-            canvas.yview_scroll(int(-1*(event.delta/120)), "units")
-        
+            self.scroll_to(self.first_index + int(-1*(event.delta/120)))
+
         def _bind_mousewheel(event):
-            canvas.bind_all("<MouseWheel>", _on_mousewheel)
-        
+            self.viewport.bind_all("<MouseWheel>", _on_mousewheel)
+
         def _unbind_mousewheel(event):
-            canvas.unbind_all("<MouseWheel>")
-        
-        canvas.bind("<Enter>", _bind_mousewheel)
-        canvas.bind("<Leave>", _unbind_mousewheel)
-        
-        # Display each question
-        for data in questions_data:
-            self.create_question_card(scrollable_frame, data)
-        
-        canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+            self.viewport.unbind_all("<MouseWheel>")
 
-    def create_question_card(self, parent, data):
-        """Create card for a question"""
-        question = data['question']
-        options = data['options']
-        
-        # Card with better styling
-        card = ttk.Frame(parent, bootstyle="light")
-        card.pack(fill=tk.X, pady=8, padx=5)
-        
-        inner = ttk.Frame(card, relief=tk.SOLID, borderwidth=1)
-        inner.pack(fill=tk.BOTH, expand=True)
-        
-        # Question header with badges
-        header = ttk.Frame(inner)
-        header.pack(fill=tk.X, padx=15, pady=10)
-        
-        # ID badge
-        ttk.Label(header, text=f"#{question.id}",
-                 font=(FONT_FAMILY, 10, 'bold'),
-                 bootstyle="secondary").pack(side=tk.LEFT, padx=(0, 10))
-        
-        # Difficulty badge
-        difficulty_text = {1: "Dễ", 2: "Trung bình", 3: "Khó"}
-        difficulty_style = {1: "success", 2: "warning", 3: "danger"}
-        ttk.Label(header, text=difficulty_text.get(question.difficulty, ""),
-                 font=(FONT_FAMILY, 9),
-                 bootstyle=difficulty_style.get(question.difficulty, "secondary")).pack(side=tk.LEFT, padx=5)
-        
-        # Category badge
-        ttk.Label(header, text=f"📁 {question.category}",
-                 font=(FONT_FAMILY, 9),
-                 bootstyle="info").pack(side=tk.LEFT, padx=5)
-        
-        # Action buttons
-        btn_frame = ttk.Frame(header)
-        btn_frame.pack(side=tk.RIGHT)
-        
-        ttk.Button(btn_frame, text="Sửa",
-                  command=lambda q=question: self.edit_question(q),
-                  bootstyle="info-outline",
-                  width=10).pack(side=tk.LEFT, padx=3)
-        
-        ttk.Button(btn_frame, text="Xóa",
-                  command=lambda q=question: self.delete_question(q),
-                  bootstyle="danger-outline",
-                  width=10).pack(side=tk.LEFT, padx=3)
-        
-        # Question text
-        text_frame = ttk.Frame(inner)
-        text_frame.pack(fill=tk.X, padx=15, pady=10)
-        
-        ttk.Label(text_frame, text=question.question_text,
-                 font=(FONT_FAMILY, 11),
-                 wraplength=800).pack(anchor=tk.W)
-        
-        # Options with better display
-        options_frame = ttk.Frame(inner)
-        options_frame.pack(fill=tk.X, padx=15, pady=(0, 10))
-        
-        for i, option in enumerate(options, 1):
-            opt_frame = ttk.Frame(options_frame)
-            opt_frame.pack(fill=tk.X, pady=2)
-            
-            if option.is_correct:
-                ttk.Label(opt_frame, text=f"{chr(64+i)}. ✓ {option.option_text}",
-                         font=(FONT_FAMILY, 10, 'bold'),
-                         bootstyle="success").pack(anchor=tk.W, padx=20)
+        self.viewport.bind("<Enter>", _bind_mousewheel)
+        self.viewport.bind("<Leave>", _unbind_mousewheel)
+
+    def current_difficulty(self):
+        """Selected difficulty filter (None means all)"""
+        difficulty = self.difficulty_var.get()
+        return None if difficulty == "all" else int(difficulty)
+
+    def display_questions(self):
+        """Display filtered questions (only the visible page is loaded)"""
+        # Results still on their way for the previous filter are dropped
+        task_executor.cancel_all(owner=self)
+        self.page_cache = {}
+        self.page_last_ids = {}
+        self.loading_pages = set()
+        self.first_index = 0
+        task_executor.submit(QuestionBankController.count_questions, self.current_difficulty(),
+                             on_success=self.on_count_loaded, owner=self,
+                             operation="open question bank")
+
+    def on_count_loaded(self, total_count):
+        """Show the list (or the empty state) once the number of questions is known"""
+        self.total_count = total_count
+
+        if self.total_count == 0:
+            self.viewport.pack_forget()
+            self.scrollbar.pack_forget()
+            self.empty_frame.pack(expand=True)
+            return
+
+        self.empty_frame.pack_forget()
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.viewport.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.render_rows()
+
+    def load_page(self, page):
+        """Fetch one page of questions in the background, then re-render"""
+        if page in self.loading_pages:
+            return
+        self.loading_pages.add(page)
+
+        def on_loaded(items):
+            self.loading_pages.discard(page)
+            if len(self.page_cache) >= MAX_CACHED_PAGES:
+                # Evict the cached page farthest from the loaded one
+                farthest = max(self.page_cache, key=lambda p: abs(p - page))
+                del self.page_cache[farthest]
+            self.page_cache[page] = items
+            if items:
+                self.page_last_ids[page] = items[-1]['question'].id
+            self.render_rows()
+
+        # Seek from the previous page's last id when known (scrolling); a jump
+        # with the scrollbar to an unvisited page falls back to the offset
+        task_executor.submit(QuestionBankController.get_questions_page,
+                             page * PAGE_SIZE, PAGE_SIZE, self.current_difficulty(),
+                             self.page_last_ids.get(page - 1),
+                             on_success=on_loaded, owner=self, interruptible=True)
+
+    def get_question_data(self, index):
+        """Get {'question', 'options'} for a list position from the loaded pages"""
+        page = index // PAGE_SIZE
+        items = self.page_cache.get(page, [])
+        offset = index - page * PAGE_SIZE
+        return items[offset] if offset < len(items) else None
+
+    def visible_row_count(self):
+        """Most rows that can be (partly) visible in the viewport"""
+        height = self.viewport.winfo_height()
+        return max(1, height // MIN_ROW_HEIGHT + 1)
+
+    def measure_fitting_rows(self):
+        """Count the bound rows that fit entirely in the viewport (at least one)"""
+        self.viewport.update_idletasks()
+        height = self.viewport.winfo_height()
+        used = 0
+        fitting = 0
+        for row in self.rows:
+            if not row.visible:
+                break
+            used += row.card.winfo_reqheight()
+            if used > height:
+                break
+            fitting += 1
+        return max(1, fitting)
+
+    def render_rows(self):
+        """Bind the pooled row widgets to the questions at the current scroll position"""
+        if self.total_count == 0:
+            return
+
+        visible = self.visible_row_count()
+
+        # Keep showing the previous rows until every page in view has arrived
+        last_index = min(self.first_index + visible, self.total_count) - 1
+        missing = [page for page in range(self.first_index // PAGE_SIZE, last_index // PAGE_SIZE + 1)
+                   if page not in self.page_cache]
+        if missing:
+            for page in missing:
+                self.load_page(page)
+            return
+
+        while len(self.rows) < visible:
+            self.rows.append(QuestionRow(self.viewport, self))
+
+        for offset, row in enumerate(self.rows):
+            index = self.first_index + offset
+            data = self.get_question_data(index) if offset < visible and index < self.total_count else None
+            if data:
+                row.show(data)
             else:
-                ttk.Label(opt_frame, text=f"{chr(64+i)}. {option.option_text}",
-                         font=(FONT_FAMILY, 10),
-                         bootstyle="secondary").pack(anchor=tk.W, padx=20)
+                row.hide()
+
+        # Rows take the height of their text, so see how many actually fit
+        self.fitting_rows = self.measure_fitting_rows()
+        first = self.first_index / self.total_count
+        last = min(1.0, (self.first_index + self.fitting_rows) / self.total_count)
+        self.scrollbar.set(first, last)
+
+    def scroll_to(self, index):
+        """Scroll so that the question at `index` is the first visible row"""
+        max_first = max(0, self.total_count - self.fitting_rows)
+        index = max(0, min(index, max_first))
+        if index != self.first_index:
+            self.first_index = index
+            self.render_rows()
+
+    def on_scrollbar(self, action, amount, unit=None):
+        """Handle scrollbar drags ('moveto') and clicks ('scroll')"""
+        if action == 'moveto':
+            self.scroll_to(int(float(amount) * self.total_count))
+        elif action == 'scroll':
+            step = self.fitting_rows if unit == 'pages' else 1
+            self.scroll_to(self.first_index + int(amount) * step)
 
     def add_question(self):
         """Open dialog to add new question"""
@@ -3,9 +3,10 @@ import tkinter as tk
 from tkinter import messagebox
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
-import time
 from controllers.quiz_controller import QuizController
 from models.quiz import Quiz
+from utils.task_executor import task_executor
+from utils.exam_timer import ExamTimer
 from config import FONT_FAMILY, COLOR_SUCCESS, COLOR_DANGER, COLOR_PRIMARY
 
 
@@ -18,9 +19,11 @@ class QuizView:
         self.current_attempt = None
         self.current_question_index = 0
         self.answers = {}
-        self.start_time = None
+        self.timer = None
         self.timer_running = False
-        self.time_remaining = 0
+        self.tick_job = None
+        self.deadline_job = None
+        self.submitting = False
         
         self.show_quiz_list()
 
@@ -209,20 +212,36 @@ class QuizView:
         """Initialize quiz session"""
         # Get quiz data with randomly selected questions
         difficulty_matrix = {'easy': 10, 'medium': 10, 'hard': 10}
-        quiz_data = QuizController.get_quiz_with_questions(quiz.id, difficulty_matrix)
-        if not quiz_data:
+
+        def load():
+            quiz_data = QuizController.get_quiz_with_questions(quiz.id, difficulty_matrix)
+            if not quiz_data:
+                return None
+            # Start attempt
+            return quiz_data, QuizController.start_attempt(quiz.id, student_name)
+
+        task_executor.submit(load,
+                             on_success=lambda loaded: self.on_quiz_loaded(quiz, loaded),
+                             on_error=self.on_task_error,
+                             owner=self, operation="start exam")
+
+    def on_quiz_loaded(self, quiz, loaded):
+        """Start the exam once its questions are loaded (UI thread)"""
+        if not loaded:
             messagebox.showerror("Lỗi", "Không thể tải bài thi!")
             return
-        
-        # Start attempt
-        attempt_id = QuizController.start_attempt(quiz.id, student_name)
-        
+
+        quiz_data, attempt_id = loaded
+        if quiz_data['missing']:
+            # Shown before the timer starts, so reading it does not cost exam time
+            messagebox.showwarning("Cảnh báo",
+                                   f"⚠️ Ngân hàng thiếu {quiz_data['missing']} câu hỏi, "
+                                   f"bài thi chỉ có {len(quiz_data['questions'])} câu.")
         self.current_quiz = quiz_data
         self.current_attempt = attempt_id
         self.current_question_index = 0
         self.answers = {}
-        self.start_time = time.time()
-        self.time_remaining = quiz.time_limit
+        self.timer = ExamTimer(quiz.time_limit)
         
         self.show_quiz_interface()
 
@@ -278,8 +297,9 @@ class QuizView:
         # Show first question
         self.show_question()
         
-        # Start timer
+        # Start timer; the deadline job submits on time even if ticks run late
         self.timer_running = True
+        self.deadline_job = self.parent.after(self.timer.remaining_ms(), self.on_time_up)
         self.update_timer()
 
     def show_question(self):
@@ -365,67 +385,103 @@ class QuizView:
             self.show_question()
 
     def update_timer(self):
-        """Update countdown timer"""
+        """Redraw the countdown and schedule the next redraw on the next second"""
+        self.tick_job = None
         if not self.timer_running:
             return
         
         # Check if timer_label still exists
         if not hasattr(self, 'timer_label') or not self.timer_label.winfo_exists():
-            self.timer_running = False
+            self.stop_timer()
             return
         
-        self.time_remaining -= 1
-        
-        if self.time_remaining <= 0:
-            self.timer_running = False
-            messagebox.showinfo("Hết giờ", "Đã hết thời gian làm bài!")
-            self.submit_quiz()
+        if self.timer.expired():
+            self.on_time_up()
             return
         
-        minutes = self.time_remaining // 60
-        seconds = self.time_remaining % 60
+        time_remaining = self.timer.remaining_seconds()
+        minutes = time_remaining // 60
+        seconds = time_remaining % 60
         
         try:
             self.timer_label.config(text=f"⏱ {minutes:02d}:{seconds:02d}")
             
             # Change color when time is running out
-            if self.time_remaining < 60:
+            if time_remaining < 60:
                 self.timer_label.config(foreground=COLOR_DANGER)
-            elif self.time_remaining < 300:
+            elif time_remaining < 300:
                 self.timer_label.config(foreground='orange')
             
-            self.parent.after(1000, self.update_timer)
+            self.tick_job = self.parent.after(self.timer.next_tick_delay_ms(), self.update_timer)
         except tk.TclError:
             # Widget was destroyed, stop timer
-            self.timer_running = False
+            self.stop_timer()
+
+    def on_time_up(self):
+        """Submit automatically at the deadline"""
+        self.deadline_job = None
+        if not self.timer_running:
+            return
+        if not hasattr(self, 'timer_label') or not self.timer_label.winfo_exists():
+            self.stop_timer()
+            return
+        
+        self.submit_quiz(force=True)
+        messagebox.showinfo("Hết giờ", "Đã hết thời gian làm bài!")
 
-    def submit_quiz(self):
-        """Submit quiz answers"""
-        if len(self.answers) < len(self.current_quiz['questions']):
+    def stop_timer(self):
+        """Stop the countdown and cancel its scheduled callbacks"""
+        self.timer_running = False
+        if self.timer:
+            self.timer.stop()
+        for job in (self.tick_job, self.deadline_job):
+            if job is not None:
+                try:
+                    self.parent.after_cancel(job)
+                except tk.TclError:
+                    pass
+        self.tick_job = None
+        self.deadline_job = None
+
+    def on_task_error(self, error):
+        """Report a failed background task"""
+        self.submitting = False
+        messagebox.showerror("Lỗi", f"Đã xảy ra lỗi: {error}")
+
+    def submit_quiz(self, force=False):
+        """Submit quiz answers (force skips the confirmation, used when time is up)"""
+        if self.submitting:
+            return
+        if not force and len(self.answers) < len(self.current_quiz['questions']):
             unanswered = len(self.current_quiz['questions']) - len(self.answers)
             if not messagebox.askyesno("Xác nhận",
                                        f"Bạn còn {unanswered} câu chưa trả lời.\nBạn có chắc muốn nộp bài?"):
                 return
+            if self.submitting:
+                # Time ran out (and the exam was submitted) while the dialog was open
+                return
         
-        self.timer_running = False
+        self.stop_timer()
+        self.submitting = True
         
-        # Submit all answers
+        # Collect all answers (unanswered questions are saved as None)
+        answers = {}
         for question_data in self.current_quiz['questions']:
             question_id = question_data['question'].id
-            selected_option = self.answers.get(question_id)
-            QuizController.submit_answer(self.current_attempt, question_id, selected_option)
-        
-        # Calculate time taken
-        time_taken = int(time.time() - self.start_time)
-        
-        # Complete attempt
-        result = QuizController.complete_attempt(self.current_attempt, time_taken)
-        
-        # Show results
-        self.show_results(result)
+            answers[question_id] = self.answers.get(question_id)
+
+        # Time taken comes from the same monotonic clock as the countdown
+        time_taken = self.timer.elapsed_seconds()
+
+        # Save answers and complete attempt in one transaction, then show results
+        task_executor.submit(QuizController.submit_answers_bulk, self.current_attempt, answers, time_taken,
+                             on_success=self.show_results,
+                             on_error=self.on_task_error,
+                             owner=self, operation="submit exam")
 
     def show_results(self, result):
         """Show quiz results"""
+        self.submitting = False
         for widget in self.parent.winfo_children():
             widget.destroy()
         
@@ -488,8 +544,13 @@ class QuizView:
 
     def show_review(self):
         """Show detailed answer review"""
-        review_data = QuizController.get_attempt_review(self.current_attempt)
-        
+        task_executor.submit(QuizController.get_attempt_review, self.current_attempt,
+                             on_success=self.display_review,
+                             on_error=self.on_task_error,
+                             owner=self, operation="review exam", interruptible=True)
+
+    def display_review(self, review_data):
+        """Render the answer review (UI thread)"""
         for widget in self.parent.winfo_children():
             widget.destroy()
         
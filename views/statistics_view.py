@@ -3,16 +3,26 @@ import tkinter as tk
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 from controllers.quiz_controller import QuizController
-from models.quiz import Quiz
 from models.attempt import Attempt
-from config import FONT_FAMILY
+from models.question import Question
+from database.connection import db
+from utils.task_executor import task_executor
+from config import FONT_FAMILY, DISTRACTOR_MIN_RATE
+
+ATTEMPT_PAGE_SIZE = 100  # attempts listed per page in the details dialog
+QUIZ_PAGE_SIZE = 20      # quiz cards loaded per page in the statistics tab
 
 
 class StatisticsView:
     """View for statistics and analysis"""
 
+    # Loaded tab data shared across visits: {key: (db.data_version, data)}
+    cache = {}
+
     def __init__(self, parent):
         self.parent = parent
+        self.tab_loaders = {}
+        self.loaded_tabs = set()
         self.show_statistics()
 
     def show_statistics(self):
@@ -28,28 +38,73 @@ class StatisticsView:
                  font=(FONT_FAMILY, 20, 'bold'),
                  bootstyle="primary").pack(side=tk.LEFT)
         
-        # Tabs with better styling
-        notebook = ttk.Notebook(self.parent, bootstyle="primary")
-        notebook.pack(fill=tk.BOTH, expand=True, padx=30, pady=(0, 20))
-        
-        # Quiz statistics tab
-        quiz_tab = ttk.Frame(notebook)
-        notebook.add(quiz_tab, text="📝 Thống kê bài thi")
-        self.show_quiz_statistics(quiz_tab)
+        # Tabs with better styling; each tab is filled the first time it is shown
+        self.notebook = ttk.Notebook(self.parent, bootstyle="primary")
+        self.notebook.pack(fill=tk.BOTH, expand=True, padx=30, pady=(0, 20))
         
-        # Question analysis tab
-        question_tab = ttk.Frame(notebook)
-        notebook.add(question_tab, text="🔍 Phân tích câu hỏi")
-        self.show_question_analysis(question_tab)
+        tabs = [
+            ("📝 Thống kê bài thi", self.show_quiz_statistics),
+            ("🔍 Phân tích câu hỏi", self.show_question_analysis),
+            ("🎯 Phân tích độ khó", self.show_difficulty_analysis)
+        ]
+        for text, show in tabs:
+            tab = ttk.Frame(self.notebook)
+            self.notebook.add(tab, text=text)
+            self.tab_loaders[str(tab)] = show
         
-        # Difficulty analysis tab
-        difficulty_tab = ttk.Frame(notebook)
-        notebook.add(difficulty_tab, text="🎯 Phân tích độ khó")
-        self.show_difficulty_analysis(difficulty_tab)
+        self.notebook.bind("<<NotebookTabChanged>>", self.on_tab_changed)
+        self.on_tab_changed()
+
+    def on_tab_changed(self, event=None):
+        """Fill the selected tab on its first visit"""
+        tab = self.notebook.select()
+        if not tab or tab in self.loaded_tabs:
+            return
+        self.loaded_tabs.add(tab)
+        self.tab_loaders[tab](self.notebook.nametowidget(tab))
+
+    def load_in_background(self, parent, key, loader, render):
+        """Render cached data for key, or run loader on a worker thread and cache its result
+
+        The cache entry is reused until db.data_version changes (attempts
+        completed, questions or quizzes edited).
+        """
+        version = db.data_version
+        cached = StatisticsView.cache.get(key)
+        if cached is not None and cached[0] == version:
+            render(parent, cached[1])
+            return
+
+        loading = ttk.Label(parent, text="⏳ Đang tải...",
+                            font=(FONT_FAMILY, 11),
+                            bootstyle="secondary")
+        loading.pack(pady=20)
+
+        def on_loaded(data):
+            # Keyed by the version seen before the query, so a write made meanwhile forces a reload
+            StatisticsView.cache[key] = (version, data)
+            # The tab may have been destroyed while the query ran
+            if not parent.winfo_exists():
+                return
+            loading.destroy()
+            render(parent, data)
+
+        task_executor.submit(loader, on_success=on_loaded, owner=self,
+                             operation="open statistics", interruptible=True)
 
     def show_quiz_statistics(self, parent):
         """Show quiz statistics"""
-        quizzes = Quiz.get_all()
+        self.load_in_background(parent, 'quiz_statistics', self.load_quiz_statistics,
+                                self.render_quiz_statistics)
+
+    @staticmethod
+    def load_quiz_statistics(before=None):
+        """One page of quizzes with their aggregates (runs on a worker thread)"""
+        return QuizController.get_quizzes_page(before, QUIZ_PAGE_SIZE)
+
+    def render_quiz_statistics(self, parent, data):
+        """Render quiz statistics cards"""
+        quizzes, stats_by_quiz, next_key = data
         
         if not quizzes:
             empty_frame = ttk.Frame(parent)
@@ -88,18 +143,47 @@ class StatisticsView:
         canvas.bind("<Leave>", _unbind_mousewheel)
         
         for quiz in quizzes:
-            self.create_quiz_stats_card(scrollable_frame, quiz)
+            self.create_quiz_stats_card(scrollable_frame, quiz, stats_by_quiz.get(quiz.id))
+        
+        # Older quizzes are fetched one keyset page at a time
+        more_btn = ttk.Button(scrollable_frame, text="⬇ Tải thêm",
+                              bootstyle="info-outline",
+                              width=15)
+        state = {'next_key': next_key}
+        
+        def on_page_loaded(page):
+            if not more_btn.winfo_exists():
+                return
+            quizzes, stats_by_quiz, state['next_key'] = page
+            more_btn.pack_forget()
+            for quiz in quizzes:
+                self.create_quiz_stats_card(scrollable_frame, quiz, stats_by_quiz.get(quiz.id))
+            if state['next_key'] is not None:
+                more_btn.config(state=tk.NORMAL)
+                more_btn.pack(pady=10)
+        
+        def on_page_failed(error):
+            if more_btn.winfo_exists():
+                more_btn.config(state=tk.NORMAL)
+        
+        def load_more():
+            more_btn.config(state=tk.DISABLED)
+            task_executor.submit(self.load_quiz_statistics, state['next_key'],
+                                 on_success=on_page_loaded, on_error=on_page_failed,
+                                 owner=self, interruptible=True)
+        
+        more_btn.config(command=load_more)
+        if next_key is not None:
+            more_btn.pack(pady=10)
         
         canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=10, pady=10)
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
 
-    def create_quiz_stats_card(self, parent, quiz):
+    def create_quiz_stats_card(self, parent, quiz, stats):
         """Create statistics card for a quiz"""
         card = ttk.Labelframe(parent, text=quiz.title, padding=10, bootstyle="info")
         card.pack(fill=tk.X, pady=10, padx=10)
         
-        stats = Attempt.get_statistics(quiz.id)
-        
         if not stats or stats['total_attempts'] == 0:
             ttk.Label(card, text="📭 Chưa có lượt thi nào",
                      font=(FONT_FAMILY, 11),
@@ -169,7 +253,7 @@ class StatisticsView:
                  font=(FONT_FAMILY, 10),
                  bootstyle="secondary").pack(anchor=tk.W, pady=5)
         
-        attempts = Attempt.get_by_quiz(quiz.id)
+        attempts, next_key = QuizController.get_attempts_page(quiz.id, limit=ATTEMPT_PAGE_SIZE)
         
         # Statistics summary
         if attempts:
@@ -233,31 +317,7 @@ class StatisticsView:
         scrollbar = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=tree.yview)
         tree.configure(yscrollcommand=scrollbar.set)
         
-        for idx, attempt in enumerate(attempts):
-            time_str = ""
-            if attempt.time_taken:
-                minutes = attempt.time_taken // 60
-                seconds = attempt.time_taken % 60
-                time_str = f"{minutes}:{seconds:02d}"
-            
-            # Determine row color based on score
-            score_tag = ''
-            if attempt.score >= 8:
-                score_tag = 'high'
-            elif attempt.score >= 5:
-                score_tag = 'medium'
-            else:
-                score_tag = 'low'
-            
-            row_tag = 'evenrow' if idx % 2 == 0 else 'oddrow'
-            
-            tree.insert('', tk.END, values=(
-                attempt.student_name,
-                f"{attempt.score:.1f}/10",
-                f"{attempt.correct_answers}/{attempt.total_questions}",
-                time_str,
-                attempt.completed_at or "Chưa hoàn thành"
-            ), tags=(score_tag, row_tag))
+        self.insert_attempt_rows(tree, attempts, 0)
         
         tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
@@ -284,12 +344,80 @@ class StatisticsView:
                   command=dialog.destroy,
                   bootstyle="secondary",
                   width=15).pack(side=tk.RIGHT, pady=10)
+        
+        # Older attempts are fetched one keyset page at a time
+        more_btn = ttk.Button(footer, text="⬇ Tải thêm",
+                              bootstyle="info-outline",
+                              width=15)
+        state = {'next_key': next_key, 'count': len(attempts)}
+        
+        def on_page_loaded(result):
+            if not tree.winfo_exists():
+                return
+            page, state['next_key'] = result
+            self.insert_attempt_rows(tree, page, state['count'])
+            state['count'] += len(page)
+            if state['next_key'] is None:
+                more_btn.pack_forget()
+            else:
+                more_btn.config(state=tk.NORMAL)
+        
+        def on_page_failed(error):
+            if more_btn.winfo_exists():
+                more_btn.config(state=tk.NORMAL)
+        
+        def load_more():
+            more_btn.config(state=tk.DISABLED)
+            task_executor.submit(QuizController.get_attempts_page, quiz.id, state['next_key'], ATTEMPT_PAGE_SIZE,
+                                 on_success=on_page_loaded, on_error=on_page_failed,
+                                 owner=self, interruptible=True)
+        
+        more_btn.config(command=load_more)
+        if next_key is not None:
+            more_btn.pack(side=tk.RIGHT, padx=10, pady=10)
+
+    def insert_attempt_rows(self, tree, attempts, start_index):
+        """Append attempts to the details tree (start_index keeps the row stripes alternating)"""
+        for idx, attempt in enumerate(attempts, start=start_index):
+            time_str = ""
+            if attempt.time_taken:
+                minutes = attempt.time_taken // 60
+                seconds = attempt.time_taken % 60
+                time_str = f"{minutes}:{seconds:02d}"
+            
+            # Determine row color based on score
+            score_tag = ''
+            if attempt.score >= 8:
+                score_tag = 'high'
+            elif attempt.score >= 5:
+                score_tag = 'medium'
+            else:
+                score_tag = 'low'
+            
+            row_tag = 'evenrow' if idx % 2 == 0 else 'oddrow'
+            
+            tree.insert('', tk.END, values=(
+                attempt.student_name,
+                f"{attempt.score:.1f}/10",
+                f"{attempt.correct_answers}/{attempt.total_questions}",
+                time_str,
+                attempt.completed_at or "Chưa hoàn thành"
+            ), tags=(score_tag, row_tag))
 
     def show_question_analysis(self, parent):
         """Show question-level analysis"""
-        from models.question import Question
-        
-        questions = Question.get_all()
+        self.load_in_background(parent, 'question_analysis', self.load_question_analysis,
+                                self.render_question_analysis)
+
+    @staticmethod
+    def load_question_analysis():
+        """First questions and their precomputed counters (runs on a worker thread)"""
+        questions = Question.get_page(0, 50)
+        return questions, QuizController.get_question_statistics_bulk(q.id for q in questions)
+
+    def render_question_analysis(self, parent, data):
+        """Render question analysis cards"""
+        questions, stats_by_question = data
         
         if not questions:
             ttk.Label(parent, text="Chưa có câu hỏi nào",
@@ -329,10 +457,9 @@ class StatisticsView:
         ttk.Label(header_frame, text="Phân tích tỷ lệ chọn đáp án",
                  font=(FONT_FAMILY, 12, 'bold')).pack()
         
-        # Analyze each question
-        for question in questions[:50]:  # Limit to first 20 for performance
-            stats = QuizController.get_question_statistics(question.id)
-            
+        for question in questions:
+            stats = stats_by_question[question.id]
+
             if stats['total_answers'] > 0:
                 self.create_question_analysis_card(scrollable_frame, question, stats)
         
@@ -383,12 +510,16 @@ class StatisticsView:
                  font=(FONT_FAMILY, 16, 'bold'),
                  bootstyle="primary").pack(anchor=tk.W)
         
-        ttk.Label(header_frame, text="So sánh độ khó được gán với tỷ lệ trả lời đúng thực tế",
+        ttk.Label(header_frame, text="So sánh độ khó được gán với tỷ lệ trả lời đúng, độ phân biệt và phương án nhiễu",
                  font=(FONT_FAMILY, 10),
                  bootstyle="secondary").pack(anchor=tk.W, pady=5)
         
-        difficulty_data = QuizController.analyze_difficulty()
-        
+        self.load_in_background(parent, 'difficulty_analysis', QuizController.analyze_items,
+                                self.render_difficulty_analysis)
+
+    def render_difficulty_analysis(self, parent, analysis):
+        """Render the item analysis table"""
+        difficulty_data = analysis['questions']
         if not difficulty_data:
             empty_frame = ttk.Frame(parent)
             empty_frame.pack(expand=True)
@@ -403,18 +534,28 @@ class StatisticsView:
         main_container = ttk.Frame(parent)
         main_container.pack(fill=tk.BOTH, expand=True, padx=20, pady=10)
         
+        # Reliability of each quiz (Cronbach's alpha)
+        reliability = [f"{quiz['title']}: α = {quiz['alpha']:.2f}"
+                       for quiz in analysis['quizzes'].values() if quiz['alpha'] is not None]
+        if reliability:
+            ttk.Label(main_container, text="📐 Độ tin cậy  " + "   •   ".join(reliability),
+                     font=(FONT_FAMILY, 10),
+                     bootstyle="info").pack(anchor=tk.W, pady=(0, 10))
+
         # Create frame for treeview
         tree_frame = ttk.Frame(main_container)
         tree_frame.pack(fill=tk.BOTH, expand=True)
         
         # Create treeview with larger font
-        columns = ('id', 'labeled', 'success_rate', 'total', 'question')
+        columns = ('id', 'labeled', 'success_rate', 'discrimination', 'distractors', 'total', 'question')
         tree = ttk.Treeview(tree_frame, columns=columns, show='headings', height=25)
         
         # Configure headings with better styling
         tree.heading('id', text='ID', anchor=tk.CENTER)
         tree.heading('labeled', text='Độ khó gán', anchor=tk.CENTER)
         tree.heading('success_rate', text='Tỷ lệ đúng', anchor=tk.CENTER)
+        tree.heading('discrimination', text='Độ phân biệt', anchor=tk.CENTER)
+        tree.heading('distractors', text='PA nhiễu hiệu quả', anchor=tk.CENTER)
         tree.heading('total', text='Tổng câu TL', anchor=tk.CENTER)
         tree.heading('question', text='Câu hỏi', anchor=tk.W)
         
@@ -422,6 +563,8 @@ class StatisticsView:
         tree.column('id', width=80, anchor=tk.CENTER)
         tree.column('labeled', width=150, anchor=tk.CENTER)
         tree.column('success_rate', width=120, anchor=tk.CENTER)
+        tree.column('discrimination', width=120, anchor=tk.CENTER)
+        tree.column('distractors', width=140, anchor=tk.CENTER)
         tree.column('total', width=120, anchor=tk.CENTER)
         tree.column('question', width=600, anchor=tk.W)
         
@@ -454,6 +597,8 @@ class StatisticsView:
                 data['id'],
                 difficulty_names.get(data['labeled_difficulty'], 'N/A'),
                 f"{data['success_rate']:.1f}%",
+                f"{data['discrimination']:.2f}" if data['discrimination'] is not None else '-',
+                f"{data['distractor_efficiency'] * 100:.0f}%" if data['distractor_efficiency'] is not None else '-',
                 data['total_answers'],
                 q_text
             ), tags=(difficulty_tag, row_tag))
@@ -506,3 +651,10 @@ class StatisticsView:
                               font=(FONT_FAMILY, 9, 'italic'),
                               bootstyle="secondary")
         note_label.pack(anchor=tk.W, pady=5)
+
+        ttk.Label(legend,
+                  text="💡 Độ phân biệt < 0.2: câu hỏi không phân biệt được học sinh giỏi và yếu; "
+                       f"PA nhiễu hiệu quả: tỷ lệ đáp án sai được chọn bởi ít nhất "
+                       f"{DISTRACTOR_MIN_RATE * 100:g}% thí sinh",
+                  font=(FONT_FAMILY, 9, 'italic'),
+                  bootstyle="secondary").pack(anchor=tk.W, pady=5)